@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import PositiveFloat
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,8 +13,54 @@ class Settings(BaseSettings):
     AccountKey: str | None = None
     EndpointSuffix: str | None = None
     image_path: str = "images"
+    page_default_limit: int = 50
+    page_max_limit: int = 200
+    # who audits, signs and archives the next document: "least_loaded", "round_robin" or "weighted",
+    # which divides the pending items of each user by their weight below, keyed by username
+    assignment_strategy: Literal["least_loaded", "round_robin", "weighted"] = "least_loaded"
+    assignment_weights: dict[str, PositiveFloat] = {}
+    upload_max_bytes: int = 25 * 2 ** 20
+    upload_chunk_size: int = 2 ** 20
+    # "jpeg" or "webp" store a master of the deskewed page, "original" stores uploads as they are
+    image_master_format: Literal["jpeg", "webp", "original"] = "jpeg"
+    image_master_max_side: int = 2480
+    image_master_quality: int = 80
+    image_master_grayscale: bool = False
+    image_keep_original: bool = True
+    # longest side of the previews selected by the size of GET /documents/image/{image_id}
+    image_thumbnail_max_side: int = 256
+    image_medium_max_side: int = 1024
+    image_preview_quality: int = 75
+    blob_chunk_size: int = 4 * 2 ** 20
+    blob_max_concurrency: int = 4
+    # bytes of blob storage images kept in memory for repeat views, 0 turns the cache off
+    image_cache_max_bytes: int = 256 * 2 ** 20
+    image_cache_max_entry_bytes: int = 16 * 2 ** 20
     vision_key: str | None = None
     vision_endpoint: str | None = None
+    vision_max_connections: int = 10
+    vision_timeout: float = 15
+    vision_failure_threshold: int = 3
+    vision_reset_timeout: float = 30
+    vision_page_max_side: int = 2048
+    vision_page_max_bytes: int = 4 * 2 ** 20
+    vision_jpeg_quality: int = 85
+    ocr_languages: list[str] = ["hr", "en"]
+    ocr_warm_up: bool = True
+    ocr_workers: int = 2
+    ocr_queue_size: int = 8
+    ocr_timeout: float = 120
+    # seconds after which a running document job is taken as abandoned and run again at startup
+    document_job_lease: float = 600
+    ocr_cache_enabled: bool = True
+    ocr_cache_max_entries: int = 10000
+    ocr_debug_timings: bool = False
+    # longest side of the deskewed page, easyocr shrinks its input to 2560 pixels anyway
+    ocr_page_max_side: int = 2560
+    # "eager" reads the whole page before answering, "lazy" classifies from the regions below
+    # and reads the rest of the page in the background
+    ocr_summary_mode: Literal["eager", "lazy"] = "eager"
+    ocr_classification_regions: list[tuple[float, float]] = [(0.0, 0.2), (0.85, 1.0)]
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,20 +1,45 @@
 from fastapi import FastAPI
+
+from app.config.base import settings
+
 from app.utils.exceptions.app_exceptions import AppExceptionCase, app_exception_handler
-from app.utils.startup import create_tables, add_roles
+from app.utils.blob_storage import blob_storage
+from app.utils.ocr.azure import azure_vision
+from app.utils.ocr.executor import ocr_executor
+from app.utils.startup import migrate_database, add_roles, resume_document_jobs
+from app.utils.uploads import RequestSizeLimitMiddleware, MULTIPART_OVERHEAD
 
 import app.routers.users as users
 import app.routers.documents as documents
 import app.routers.signatures as signatures
 import app.routers.audit as audit
 import app.routers.archives as archives
+import app.routers.metrics as metrics
 
 app = FastAPI()
+# uploads are bounded while they are received, not only once they were parsed
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=settings.upload_max_bytes + MULTIPART_OVERHEAD)
 
 
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    migrate_database()
     add_roles()
+    # workers load (and warm) their OCR models in the background, the server answers right away
+    ocr_executor.start()
+    resume_document_jobs()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    ocr_executor.shutdown()
+    await azure_vision.close()
+    blob_storage.close()
+
+
+@app.get("/health")
+async def health() -> dict:
+    return {"status": "ok", "ocr_ready": ocr_executor.ready}
 
 
 @app.exception_handler(AppExceptionCase)
@@ -26,3 +51,4 @@ app.include_router(documents.router)
 app.include_router(audit.router)
 app.include_router(signatures.router)
 app.include_router(archives.router)
+app.include_router(metrics.router)
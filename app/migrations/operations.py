@@ -0,0 +1,46 @@
+from sqlalchemy import Connection, Index, Table, inspect, text
+
+
+def add_columns(connection: Connection, table: Table, names: list[str]):
+    """Adds the named columns of the model table that the database table does not have yet."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+
+    for name in names:
+        if name in existing:
+            continue
+        column_type = table.c[name].type.compile(dialect=connection.dialect)
+        # nullable columns without a server default are added without rewriting the table
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+
+    connection.commit()
+
+
+def create_indexes(connection: Connection, table: Table, names: list[str]):
+    """Creates the named indexes of the model table that the database does not have yet."""
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        create_index(connection, indexes[name])
+
+
+def create_index(connection: Connection, index: Index):
+    """Creates the index unless it exists, on PostgreSQL without blocking writes to the table."""
+    if connection.dialect.name != "postgresql":
+        index.create(connection, checkfirst=True)
+        connection.commit()
+        return
+
+    columns = ", ".join(column.name for column in index.columns)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    connection.commit()
+    with connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+        # a concurrent build that failed leaves an invalid index behind, which is built again
+        invalid = autocommit.scalar(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {"name": index.name})
+        if invalid:
+            autocommit.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+
+        autocommit.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table.name} ({columns})"))
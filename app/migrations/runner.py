@@ -0,0 +1,84 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, MetaData, Table, Column, Integer, String, DateTime, select, text
+
+logger = logging.getLogger(__name__)
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+# any number, as long as every process migrating the database uses the same one
+MIGRATION_LOCK_ID = 4_720_021
+# seconds between attempts to take the lock while another process migrates
+MIGRATION_LOCK_POLL = 1.0
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    # gets a connection without an open transaction and may commit in between, the version is
+    # recorded once it returns, so every upgrade has to be safe to run again after a failure
+    upgrade: Callable[[Connection], None]
+
+
+def migrate(engine: Engine, migrations: list[Migration]) -> list[int]:
+    """Applies the migrations that were not applied to the database yet, in version order.
+
+    Returns the versions that were applied. On PostgreSQL an advisory lock keeps processes
+    that start at the same time from migrating at once.
+    """
+    applied_now = []
+
+    with engine.connect() as connection:
+        _lock(connection)
+        try:
+            schema_migrations.create(connection, checkfirst=True)
+            applied = set(connection.scalars(select(schema_migrations.c.version)))
+            connection.commit()
+
+            for migration in sorted(migrations, key=lambda migration: migration.version):
+                if migration.version in applied:
+                    continue
+
+                logger.info("Applying migration %s: %s", migration.version, migration.description)
+                migration.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(),
+                ))
+                connection.commit()
+                applied_now.append(migration.version)
+        finally:
+            _unlock(connection)
+
+    return applied_now
+
+
+def _lock(connection: Connection):
+    # waiting in pg_advisory_lock would keep a snapshot open, which CREATE INDEX CONCURRENTLY of the
+    # process holding the lock waits for, so the lock is polled with no transaction open in between
+    if connection.dialect.name == "postgresql":
+        while True:
+            locked = connection.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+            if locked:
+                return
+            time.sleep(MIGRATION_LOCK_POLL)
+
+
+def _unlock(connection: Connection):
+    if connection.dialect.name == "postgresql":
+        connection.rollback()
+        connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
@@ -0,0 +1,65 @@
+from sqlalchemy import Connection
+
+from app.config.database import Base
+from app.migrations.operations import add_columns, create_indexes
+from app.migrations.runner import Migration
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.documents import DocumentDB, ImageDB, OCRResultDB
+from app.models.signatures import SignatureDB
+# every model has to be imported for its table to be created
+import app.models.users  # noqa: F401 (registers the user tables)
+
+
+def create_tables(connection: Connection):
+    # databases created before migrations only get the tables they are missing, the later
+    # migrations bring the existing ones up to date
+    Base.metadata.create_all(connection)
+    connection.commit()
+
+
+def add_image_columns(connection: Connection):
+    add_columns(connection, ImageDB.__table__,
+                ["filename", "content_hash", "content_type", "size", "original_path", "original_size"])
+    add_columns(connection, OCRResultDB.__table__, ["summary_complete"])
+
+
+# the queue queries of the audit, archive, signature and document CRUDs
+WORKFLOW_INDEXES = {
+    AuditDB.__table__: ["ix_audits_audited_by_status", "ix_audits_document_id"],
+    ArchiveDB.__table__: ["ix_archives_archive_by_status", "ix_archives_document_id"],
+    SignatureDB.__table__: ["ix_signatures_sign_by_status", "ix_signatures_document_id"],
+    DocumentDB.__table__: ["ix_documents_owner_id", "ix_documents_document_type_document_status",
+                           "ix_documents_document_status"],
+}
+
+
+def add_document_columns(connection: Connection):
+    add_columns(connection, DocumentDB.__table__, ["summary_complete"])
+
+
+def add_workflow_indexes(connection: Connection):
+    for table, names in WORKFLOW_INDEXES.items():
+        create_indexes(connection, table, names)
+
+
+# the keyset page query of DocumentCRUD, for each combination of filters
+PAGE_INDEXES = {
+    DocumentDB.__table__: ["ix_documents_scan_time_id", "ix_documents_owner_id_scan_time_id",
+                           "ix_documents_document_status_scan_time_id", "ix_documents_document_type_scan_time_id",
+                           "ix_documents_document_type_document_status_scan_time_id"],
+}
+
+
+def add_page_indexes(connection: Connection):
+    for table, names in PAGE_INDEXES.items():
+        create_indexes(connection, table, names)
+
+
+MIGRATIONS = [
+    Migration(1, "Create tables", create_tables),
+    Migration(2, "Add the image and OCR result columns added since the tables were created", add_image_columns),
+    Migration(3, "Index the workflow queue columns", add_workflow_indexes),
+    Migration(4, "Index the document pages in scan order", add_page_indexes),
+    Migration(5, "Record which document summaries are still partial", add_document_columns),
+]
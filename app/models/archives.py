@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.config.database import Base
@@ -6,6 +6,10 @@ from app.config.database import Base
 
 class ArchiveDB(Base):
     __tablename__ = "archives"
+    __table_args__ = (
+        Index("ix_archives_archive_by_status", "archive_by", "status"),
+        Index("ix_archives_document_id", "document_id"),
+    )
 
     archive_number = Column(Integer, primary_key=True, index=True)
     status = Column(String)
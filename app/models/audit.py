@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.config.database import Base
@@ -6,6 +6,10 @@ from app.config.database import Base
 
 class AuditDB(Base):
     __tablename__ = "audits"
+    __table_args__ = (
+        Index("ix_audits_audited_by_status", "audited_by", "status"),
+        Index("ix_audits_document_id", "document_id"),
+    )
 
     audit_id = Column(Integer, primary_key=True, index=True)
     audited_at = Column(DateTime, nullable=True)
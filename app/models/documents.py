@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, LargeBinary, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, LargeBinary, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.models.archives import ArchiveDB
@@ -7,6 +7,19 @@ from app.config.database import Base
 
 class DocumentDB(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_owner_id", "owner_id"),
+        Index("ix_documents_document_type_document_status", "document_type", "document_status"),
+        # the status filter on its own cannot use the index above
+        Index("ix_documents_document_status", "document_status"),
+        # keyset pages are read in (scan_time, id) order, after the filters of the list endpoints
+        Index("ix_documents_scan_time_id", "scan_time", "id"),
+        Index("ix_documents_owner_id_scan_time_id", "owner_id", "scan_time", "id"),
+        Index("ix_documents_document_status_scan_time_id", "document_status", "scan_time", "id"),
+        Index("ix_documents_document_type_scan_time_id", "document_type", "scan_time", "id"),
+        Index("ix_documents_document_type_document_status_scan_time_id",
+              "document_type", "document_status", "scan_time", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     image_id = Column(Integer, ForeignKey('images.id'))
@@ -15,6 +28,8 @@ class DocumentDB(Base):
     summary = Column(String)
     document_status = Column(String)
     scan_time = Column(DateTime)
+    # False while only the classification regions of the page are in the summary
+    summary_complete = Column(Boolean, default=True)
     image = relationship("ImageDB", back_populates="document", single_parent=True)
     owner = relationship("UserDB", back_populates="documents", single_parent=True)
     audit = relationship("AuditDB", back_populates="document", single_parent=True)
@@ -26,5 +41,54 @@ class ImageDB(Base):
     __tablename__ = "images"
 
     id = Column(Integer, primary_key=True, index=True)
+    # where the bytes are stored, shared by all images with the same content
     image_path = Column(String)
+    # name of the uploaded file
+    filename = Column(String, nullable=True)
+    # sha256 of the stored bytes, used as the ETag, missing for images stored before it was recorded
+    content_hash = Column(String, nullable=True)
+    content_type = Column(String, nullable=True)
+    size = Column(Integer, nullable=True)
+    # the upload, when a master of the page is stored in its place and the upload is kept
+    original_path = Column(String, nullable=True)
+    # size of the upload, set when a master of the page is stored in its place
+    original_size = Column(Integer, nullable=True)
     document = relationship("DocumentDB", back_populates="image", single_parent=True)
+
+
+class ImageObjectDB(Base):
+    """A stored image file or blob, with how many images point at it."""
+    __tablename__ = "image_objects"
+
+    image_path = Column(String, primary_key=True)
+    content_hash = Column(String, index=True)
+    size = Column(Integer)
+    ref_count = Column(Integer, default=1)
+
+
+class DocumentJobDB(Base):
+    __tablename__ = "document_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey('users.id'))
+    image_id = Column(Integer, ForeignKey('images.id'))
+    document_id = Column(Integer, ForeignKey('documents.id'), nullable=True)
+    status = Column(String)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    image = relationship("ImageDB", single_parent=True)
+    document = relationship("DocumentDB", single_parent=True)
+
+
+class OCRResultDB(Base):
+    __tablename__ = "ocr_results"
+
+    content_hash = Column(String, primary_key=True)
+    summary = Column(String)
+    corners = Column(String)
+    summary_complete = Column(Boolean, default=True)
+    document_type = Column(String, nullable=True)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    last_used_at = Column(DateTime, index=True)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
 
 class SignatureDB(Base):
     __tablename__ = "signatures"
+    __table_args__ = (
+        Index("ix_signatures_sign_by_status", "sign_by", "status"),
+        Index("ix_signatures_document_id", "document_id"),
+    )
 
     signature_id = Column(Integer, primary_key=True, index=True)
     status = Column(String)
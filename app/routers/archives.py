@@ -7,6 +7,8 @@ from app.decorators.authenticate import authenticate
 from app.services.archives import ArchiveService
 from app.utils.enums import RolesEnum, ArchiveStatus
 from app.schemas.archives import ArchiveCreate, Archive
+from app.schemas.pagination import Page
+from app.utils.pagination import PageParams, page_params
 
 router = APIRouter(
     prefix="/archives",
@@ -19,20 +21,10 @@ router = APIRouter(
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
 async def get_archives(user_id: int | None = None,
                        status: ArchiveStatus | None = None,
+                       page: PageParams = Depends(page_params),
                        db: get_db = Depends(),
-                       credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Archive]:
-    if user_id is None and status is None:
-        result = ArchiveService(db).get_all_archives()
-
-    elif user_id is None and status is not None:
-        result = ArchiveService(db).get_archives_by_status(status)
-
-    elif user_id is not None and status is None:
-        result = ArchiveService(db).get_all_archives_for_user_by_id(user_id)
-
-    elif user_id is not None and status is not None:
-        result = ArchiveService(db).get_archives_by_user_and_status(user_id, status)
-
+                       credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Archive]:
+    result = ArchiveService(db).get_archives_page(page, user_id, status)
     return result
 
 
@@ -45,17 +37,10 @@ async def create_archive(archive: ArchiveCreate, db: get_db = Depends(),
 
 @router.get("/me")
 @authenticate()
-async def me(status: ArchiveStatus | None = None, db: get_db = Depends(),
-             credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Archive]:
+async def me(status: ArchiveStatus | None = None, page: PageParams = Depends(page_params), db: get_db = Depends(),
+             credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Archive]:
     username = credentials["username"]
-    if status is None:
-        result = ArchiveService(db).get_all_archives_for_user_by_username(username)
-    elif status == ArchiveStatus.PENDING or status == ArchiveStatus.SIGNED_PENDING:
-        result = ArchiveService(db).get_pending_archives_by_username(username)
-    elif status == ArchiveStatus.DONE:
-        result = ArchiveService(db).get_archived_documents_by_username(username)
-    elif status == ArchiveStatus.AWAITING_SIGNATURE:
-        result = ArchiveService(db).get_archives_awaiting_signature_by_username(username)
+    result = ArchiveService(db).get_archives_page_by_username(username, page, status)
     return result
 
 
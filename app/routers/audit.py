@@ -5,8 +5,10 @@ from app.config.database import get_db
 from app.config.jwt import access_security
 from app.decorators.authenticate import authenticate
 from app.schemas.audit import Audit, AuditCreate, DocumentSummary
+from app.schemas.pagination import Page
 from app.services.audit import AuditService
 from app.utils.enums import ActionStatus, RolesEnum
+from app.utils.pagination import PageParams, page_params
 
 router = APIRouter(
     prefix="/audits",
@@ -17,41 +19,19 @@ router = APIRouter(
 
 @router.get("/")
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
-async def get_audits(user_id: int | None = None, status: ActionStatus | None = None, db: get_db = Depends(),
-                     credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Audit]:
-    if user_id is None and status is None:
-        result = AuditService(db).get_all_audits()
-
-    if user_id is None and status is not None:
-        if status == ActionStatus.PENDING:
-            result = AuditService(db).get_all_pending_audits()
-        else:
-            result = AuditService(db).get_all_audited_documents()
-
-    if user_id is not None and status is None:
-        result = AuditService(db).get_all_audits_for_user(user_id)
-
-    if user_id is not None and status is not None:
-        if status == ActionStatus.PENDING:
-            result = AuditService(db).get_pending_audits(user_id)
-        else:
-            result = AuditService(db).get_audited_documents(user_id)
-
+async def get_audits(user_id: int | None = None, status: ActionStatus | None = None,
+                     page: PageParams = Depends(page_params), db: get_db = Depends(),
+                     credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Audit]:
+    result = AuditService(db).get_audits_page(page, user_id, status)
     return result
 
 
 @router.get("/me")
 @authenticate()
-async def me(status: ActionStatus | None = None, db: get_db = Depends(),
-             credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Audit]:
+async def me(status: ActionStatus | None = None, page: PageParams = Depends(page_params), db: get_db = Depends(),
+             credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Audit]:
     username = credentials["username"]
-    if status is None:
-        result = AuditService(db).get_all_audits_for_user_by_username(username)
-    elif status == ActionStatus.PENDING:
-        result = AuditService(db).get_pending_audits_by_username(username)
-    else:
-        result = AuditService(db).get_audited_documents_by_username(username)
-
+    result = AuditService(db).get_audits_page_by_username(username, page, status)
     return result
 
 
@@ -1,15 +1,19 @@
 import io
 
-from fastapi import APIRouter, Depends, Security, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Security, UploadFile, BackgroundTasks, Request, Response
 from fastapi_jwt import JwtAuthorizationCredentials
 
+from app.config.base import settings
 from app.config.database import get_db
 from app.config.jwt import access_security
 from app.decorators.authenticate import authenticate
-from app.schemas.documents import Document
-from app.services.documents import DocumentService, ImageService
-from app.utils.enums import RolesEnum, DocumentTypeEnum, DocumentStatusEnum
+from app.schemas.documents import Document, DocumentJob
+from app.schemas.pagination import Page
+from app.services.documents import DocumentService, ImageService, DocumentJobService, run_document_job
+from app.utils.enums import RolesEnum, DocumentTypeEnum, DocumentStatusEnum, ImageSizeEnum
+from app.utils.ocr.instrumentation import server_timing_header
+from app.utils.pagination import PageParams, page_params
+from app.utils.responses import image_response
 
 router = APIRouter(
     prefix="/documents",
@@ -22,27 +26,51 @@ router = APIRouter(
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
 async def get_all_documents(document_type: DocumentTypeEnum | None = None,
                             document_status: DocumentStatusEnum | None = None,
+                            page: PageParams = Depends(page_params),
                             db: get_db = Depends(),
-                            credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Document]:
-    result = DocumentService(db).get_all_documents(document_type, document_status)
+                            credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Document]:
+    result = DocumentService(db).get_documents_page(page, document_type, document_status)
     return result
 
 
 @router.get("/me")
 @authenticate()
-async def me(db: get_db = Depends(),
-             credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Document]:
+async def me(page: PageParams = Depends(page_params), db: get_db = Depends(),
+             credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Document]:
     username = credentials["username"]
-    result = DocumentService(db).get_documents(username)
+    result = DocumentService(db).get_documents_page_by_username(username, page)
     return result
 
 
 @router.post("/create")
 @authenticate()
-async def create_document(image: UploadFile, db: get_db = Depends(),
+async def create_document(image: UploadFile, response: Response, db: get_db = Depends(),
                           credentials: JwtAuthorizationCredentials = Security(access_security)) -> Document:
     username = credentials["username"]
-    result = DocumentService(db).create_document(image, username)
+    document_service = DocumentService(db)
+    result = await document_service.create_document(image, username)
+
+    if settings.ocr_debug_timings and document_service.pipeline_timings:
+        response.headers["Server-Timing"] = server_timing_header(document_service.pipeline_timings)
+
+    return result
+
+
+@router.post("/jobs", status_code=202)
+@authenticate()
+async def create_document_job(image: UploadFile, background_tasks: BackgroundTasks, db: get_db = Depends(),
+                              credentials: JwtAuthorizationCredentials = Security(access_security)) -> DocumentJob:
+    username = credentials["username"]
+    result = await DocumentJobService(db).create_job(image, username)
+    background_tasks.add_task(run_document_job, result.id)
+    return result
+
+
+@router.get("/jobs/{job_id}")
+@authenticate()
+async def get_document_job(job_id: int, db: get_db = Depends(),
+                           credentials: JwtAuthorizationCredentials = Security(access_security)) -> DocumentJob:
+    result = DocumentJobService(db).get_job(job_id)
     return result
 
 
@@ -50,17 +78,17 @@ async def create_document(image: UploadFile, db: get_db = Depends(),
 @authenticate()
 async def get_document(document_id: int, db: get_db = Depends(),
                        credentials: JwtAuthorizationCredentials = Security(access_security)) -> Document:
-    result = DocumentService(db).get_document(document_id)
+    result = DocumentService(db).get_document(document_id, with_owner=True)
     return result
 
 
 @router.get("/image/{image_id}")
 @authenticate()
-async def get_image(image_id: int, db: get_db = Depends(),
-                    credentials: JwtAuthorizationCredentials = Security(access_security)):
-    image = ImageService(db).get_image(image_id)
+async def get_image(image_id: int, request: Request, size: ImageSizeEnum = ImageSizeEnum.FULL,
+                    db: get_db = Depends(), credentials: JwtAuthorizationCredentials = Security(access_security)):
+    image = await ImageService(db).get_image_file(image_id, size)
 
-    return StreamingResponse(image.file, media_type="image/jpeg")
+    return image_response(request, image)
 
 
 @router.post("/update/{document_id}")
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Security
+from fastapi_jwt import JwtAuthorizationCredentials
+
+from app.config.jwt import access_security
+from app.decorators.authenticate import authenticate
+from app.utils.blob_storage import blob_storage
+from app.utils.enums import RolesEnum
+from app.utils.metrics import ocr_cache_metrics, ocr_pipeline_metrics, transcode_metrics, image_cache_metrics
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/ocr-cache")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_ocr_cache_metrics(credentials: JwtAuthorizationCredentials = Security(access_security)) -> dict:
+    return ocr_cache_metrics.to_dict()
+
+
+@router.get("/ocr-pipeline")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_ocr_pipeline_metrics(credentials: JwtAuthorizationCredentials = Security(access_security)) -> dict:
+    return ocr_pipeline_metrics.to_dict()
+
+
+@router.get("/blob-storage")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_blob_storage_metrics(credentials: JwtAuthorizationCredentials = Security(access_security)) -> dict:
+    return blob_storage.metrics.to_dict()
+
+
+@router.get("/image-transcoding")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_image_transcoding_metrics(credentials: JwtAuthorizationCredentials = Security(access_security)) -> dict:
+    return transcode_metrics.to_dict()
+
+
+@router.get("/image-cache")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_image_cache_metrics(credentials: JwtAuthorizationCredentials = Security(access_security)) -> dict:
+    return image_cache_metrics.to_dict()
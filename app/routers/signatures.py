@@ -1,9 +1,11 @@
 from app.config.database import get_db
 from app.config.jwt import access_security
 from app.decorators.authenticate import authenticate
+from app.schemas.pagination import Page
 from app.schemas.signatures import SignatureCreate, Signature
 from app.services.signatures import SignatureService
 from app.utils.enums import RolesEnum, ActionStatus
+from app.utils.pagination import PageParams, page_params
 from fastapi import APIRouter, Depends, Security
 from fastapi_jwt import JwtAuthorizationCredentials
 
@@ -18,26 +20,10 @@ router = APIRouter(
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
 async def get_signatures(user_id: int | None = None,
                          status: ActionStatus | None = None,
+                         page: PageParams = Depends(page_params),
                          db: get_db = Depends(),
-             credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Signature]:
-    if user_id is None and status is None:
-        result = SignatureService(db).get_all_signatures()
-
-    elif user_id is None and status is not None:
-        if status == ActionStatus.PENDING:
-            result = SignatureService(db).get_all_pending_signatures()
-        elif status == ActionStatus.DONE:
-            result = SignatureService(db).get_all_signed_documents()
-
-    elif user_id is not None and status is None:
-        result = SignatureService(db).get_all_signatures_for_user_by_id(user_id)
-
-    elif user_id is not None and status is not None:
-        if status == ActionStatus.PENDING:
-            result = SignatureService(db).get_pending_signatures_by_id(user_id)
-        elif status == ActionStatus.DONE:
-            result = SignatureService(db).get_signed_documents_by_id(user_id)
-
+             credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Signature]:
+    result = SignatureService(db).get_signatures_page(page, user_id, status)
     return result
 
 
@@ -50,15 +36,10 @@ async def create_signature(signature: SignatureCreate, db: get_db = Depends(),
 
 @router.get("/me")
 @authenticate()
-async def me(status: ActionStatus | None = None, db: get_db = Depends(),
-             credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[Signature]:
+async def me(status: ActionStatus | None = None, page: PageParams = Depends(page_params), db: get_db = Depends(),
+             credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[Signature]:
     username = credentials["username"]
-    if status is None:
-        result = SignatureService(db).get_all_signatures_for_user_by_username(username)
-    elif status == ActionStatus.PENDING:
-        result = SignatureService(db).get_pending_signatures_by_username(username)
-    elif status == ActionStatus.DONE:
-        result = SignatureService(db).get_signed_documents_by_username(username)
+    result = SignatureService(db).get_signatures_page_by_username(username, page, status)
     return result
 
 
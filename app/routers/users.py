@@ -4,8 +4,11 @@ from fastapi_jwt import JwtAuthorizationCredentials
 from app.config.database import get_db
 from app.config.jwt import access_security
 from app.decorators.authenticate import authenticate
+from app.schemas.pagination import Page
+from app.schemas.statistics import OrganizationStatistics
 from app.schemas.users import UserLogin, UserCreate, User, AccessToken, NewPassword, UserUpdate
 from app.utils.enums import RolesEnum
+from app.utils.pagination import PageParams, undated_page_params
 
 import app.services.statistics as statistics
 from app.services.users import UserService
@@ -20,8 +23,9 @@ router = APIRouter(
 @router.get("/")
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
 async def get_users(db: get_db = Depends(), roles: list[RolesEnum] | None = None,
-                    credentials: JwtAuthorizationCredentials = Security(access_security)) -> list[User]:
-    result = UserService(db).get_users(roles)
+                    page: PageParams = Depends(undated_page_params),
+                    credentials: JwtAuthorizationCredentials = Security(access_security)) -> Page[User]:
+    result = UserService(db).get_users_page(page, roles)
     return result
 
 
@@ -92,6 +96,15 @@ async def update_user_password(username: str, password: NewPassword, db: get_db
     return result
 
 
+@router.get("/statistics")
+@authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
+async def get_organization_statistics(db: get_db = Depends(),
+                                      credentials: JwtAuthorizationCredentials = Security(access_security)
+                                      ) -> OrganizationStatistics:
+    result = statistics.StatisticsService(db).get_organization_statistics()
+    return result
+
+
 @router.get("/statistics/{username}")
 @authenticate([RolesEnum.ADMIN, RolesEnum.DIRECTOR])
 async def get_user_statistics(username: str, db: get_db = Depends(),
@@ -1,10 +1,10 @@
 from datetime import datetime
 
 from fastapi import UploadFile
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, field_serializer, field_validator
 
 from app.schemas.users import User
-from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum
+from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, JobStatusEnum
 
 
 class Image(BaseModel):
@@ -21,9 +21,16 @@ class Document(BaseModel):
     owner: User
     document_type: DocumentTypeEnum
     summary: str
+    # False while the summary only covers the regions read first in lazy mode
+    summary_complete: bool = True
     document_status: DocumentStatusEnum
     scan_time: datetime
 
+    @field_validator('summary_complete', mode='before')
+    def validate_summary_complete(cls, summary_complete: bool | None):
+        # documents scanned before the column was added have a NULL and a full summary
+        return summary_complete is not False
+
     @field_serializer('scan_time')
     def serialize_dt(self, scan_time: datetime, _info):
         return scan_time.strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -38,5 +45,23 @@ class Document(BaseModel):
                 'owner': self.owner,
                 'document_type': self.document_type.name,
                 'summary': self.summary,
+                'summary_complete': self.summary_complete,
                 'document_status': self.document_status.name,
                 'scan_time': self.scan_time}
+
+
+class DocumentJob(BaseModel):
+    id: int
+    status: JobStatusEnum
+    document: Document | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_serializer('created_at', 'updated_at')
+    def serialize_dt(self, value: datetime, _info):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    class Config:
+        from_attributes = True
+        use_enum_values = True
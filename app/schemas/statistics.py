@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class StatisticsCount(BaseModel):
+    username: str
+    document_type: str | None
+    # status of the document, audit, signature or archive
+    status: str | None
+    count: int
+
+
+class OrganizationStatistics(BaseModel):
+    documents: list[StatisticsCount] = []
+    audits: list[StatisticsCount] = []
+    signatures: list[StatisticsCount] = []
+    archives: list[StatisticsCount] = []
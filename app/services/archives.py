@@ -1,7 +1,12 @@
+from sqlalchemy.orm import joinedload
+
 from app.models.archives import ArchiveDB
+from app.models.documents import DocumentDB
+from app.models.users import UserDB
 from app.schemas.archives import Archive, ArchiveCreate
-from app.services.documents import DocumentService
-from app.services.main import AppService
+from app.schemas.pagination import Page
+from app.services.assignments import AssignmentService
+from app.services.main import AppService, AppCRUD
 from typing import Type
 from datetime import datetime
 
@@ -9,11 +14,19 @@ from app.services.users import UserService
 from app.utils.enums import DocumentTypeEnum, RolesEnum, ArchiveStatus, DocumentStatusEnum
 from app.utils.exceptions.archive_exceptions import ArchiveException
 from app.utils.exceptions.user_exceptions import UserException
+from app.utils.pagination import PageParams
 
+import app.services.documents as documents
 import app.services.signatures as signatures
 
 
-class ArchiveCRUD(AppService):
+class ArchiveCRUD(AppCRUD):
+    # both the archived user and the document with its owner are returned, each user with their roles
+    LOAD_USERS = (
+        joinedload(ArchiveDB.archived).selectinload(UserDB.roles),
+        joinedload(ArchiveDB.document).joinedload(DocumentDB.owner).selectinload(UserDB.roles),
+    )
+
     def get_all_archives(self) -> list[Type[ArchiveDB]]:
         return self.db.query(ArchiveDB).all()
 
@@ -26,6 +39,18 @@ class ArchiveCRUD(AppService):
     def get_archives_by_user_and_status(self, user_id: int, status: ArchiveStatus) -> list[Type[ArchiveDB]]:
         return self.db.query(ArchiveDB).filter(user_id == ArchiveDB.archive_by, status == ArchiveDB.status).all()
 
+    def get_archives_page(self, page: PageParams, user_id: int | None = None,
+                          statuses: list[ArchiveStatus] | None = None) -> Page:
+        query = self.db.query(ArchiveDB).options(*self.LOAD_USERS)
+        if user_id is not None:
+            query = query.filter(ArchiveDB.archive_by == user_id)
+        if statuses:
+            query = query.filter(ArchiveDB.status.in_(statuses))
+
+        # archive_at is only set once the document is archived, so pages follow the order of the requests
+        # and a date filter leaves out the pending ones
+        return self.paginate(query, page, [ArchiveDB.archive_number], ArchiveDB.archive_at)
+
     def create_archive(self, archive: ArchiveCreate) -> ArchiveDB:
         archive_db = self.db.query(ArchiveDB).filter(ArchiveDB.document_id == archive.document_id).first()
         if archive_db:
@@ -43,7 +68,7 @@ class ArchiveCRUD(AppService):
         return archiveDB
 
     def get_archived_by_document_id(self, document_id: int) -> ArchiveDB:
-        return self.db.query(ArchiveDB).filter(document_id == ArchiveDB.document_id).first()
+        return self.db.query(ArchiveDB).options(*self.LOAD_USERS).filter(document_id == ArchiveDB.document_id).first()
 
     def update_archive(self, archive: ArchiveDB) -> ArchiveDB:
         self.db.commit()
@@ -55,6 +80,24 @@ class ArchiveService(AppService):
     def get_all_archives(self) -> list[Type[ArchiveDB]]:
         return ArchiveCRUD(self.db).get_all_archives()
 
+    def get_archives_page(self, page: PageParams, user_id: int | None = None,
+                          status: ArchiveStatus | None = None) -> Page:
+        return ArchiveCRUD(self.db).get_archives_page(page, user_id=user_id, statuses=[status] if status else None)
+
+    def get_archives_page_by_username(self, username: str, page: PageParams,
+                                      status: ArchiveStatus | None = None) -> Page:
+        user = UserService(self.db).get_user(username)
+
+        if not user:
+            raise UserException.UserNotFound({"username": username})
+
+        statuses = [status] if status else None
+        if status in (ArchiveStatus.PENDING, ArchiveStatus.SIGNED_PENDING):
+            # pending includes both pending and signed_pending
+            statuses = [ArchiveStatus.PENDING, ArchiveStatus.SIGNED_PENDING]
+
+        return ArchiveCRUD(self.db).get_archives_page(page, user_id=user.id, statuses=statuses)
+
     def get_archives_by_status(self, status: ArchiveStatus) -> list[Type[ArchiveDB]]:
         return ArchiveCRUD(self.db).get_archives_by_status(status)
 
@@ -134,9 +177,9 @@ class ArchiveService(AppService):
             archive.archive_at = datetime.now()
 
             if archive.status == ArchiveStatus.SIGNED_PENDING:
-                DocumentService(self.db).update_document(document_id, DocumentStatusEnum.SIGNED_AND_ARCHIVED, None)
+                documents.DocumentService(self.db).update_document(document_id, DocumentStatusEnum.SIGNED_AND_ARCHIVED, None)
             else:
-                DocumentService(self.db).update_document(document_id, DocumentStatusEnum.ARCHIVED, None)
+                documents.DocumentService(self.db).update_document(document_id, DocumentStatusEnum.ARCHIVED, None)
 
         elif status == ArchiveStatus.AWAITING_SIGNATURE:
             if archive.status != ArchiveStatus.PENDING:
@@ -159,27 +202,12 @@ class ArchiveService(AppService):
         else:
             raise ArchiveException.DocumentTypeNotProvided({"document_type": document_type})
 
-        accountants = UserService(self.db).get_users([accountant_type])
-
-        if not accountants:
-            raise UserException.NoUsersWithRole({"role": accountant_type})
-
-        # Find accountant with the least amount of pending archives
-        accountants_with_pending_archives = []
-
-        for accountant in accountants:
-            pending_archives = (self.get_archives_by_user_and_status(accountant.id, ArchiveStatus.PENDING)
-                                + self.get_archives_by_user_and_status(accountant.id, ArchiveStatus.SIGNED_PENDING))
-            if pending_archives:
-                accountants_with_pending_archives.append((accountant, len(pending_archives)))
-            else:
-                accountants_with_pending_archives.append((accountant, 0))
-
-        accountant = min(accountants_with_pending_archives, key=lambda x: x[1])[0]
+        accountant_id = AssignmentService(self.db).assign(accountant_type, ArchiveDB.archive_by, ArchiveDB.status,
+                                                          [ArchiveStatus.PENDING, ArchiveStatus.SIGNED_PENDING])
 
         archiveCreate = ArchiveCreate(
             document_id=document_id,
-            archive_by=accountant.id
+            archive_by=accountant_id
         )
 
         return self.create_archive_request(archiveCreate)
@@ -0,0 +1,124 @@
+import zlib
+from dataclasses import dataclass
+
+from sqlalchemy import and_, case, func, inspect, text
+
+from app.config.base import settings
+from app.models.users import UserDB, RoleDB
+from app.services.main import AppService, AppCRUD
+from app.utils.enums import RolesEnum
+from app.utils.exceptions.user_exceptions import UserException
+
+
+@dataclass(frozen=True)
+class Workload:
+    user_id: int
+    username: str
+    pending: int
+    # primary key of the latest item assigned to the user, None if they were never assigned one
+    last_assigned: int | None
+
+
+class LeastLoaded:
+    """Assigns to the user with the fewest pending items."""
+    history = False
+
+    def choose(self, workloads: list[Workload]) -> Workload:
+        return min(workloads, key=lambda workload: (workload.pending, workload.user_id))
+
+
+class RoundRobin:
+    """Assigns to the user who was assigned an item longest ago, users who never were come first."""
+    history = True
+
+    def choose(self, workloads: list[Workload]) -> Workload:
+        return min(workloads, key=lambda workload: (workload.last_assigned is not None,
+                                                    workload.last_assigned or 0, workload.user_id))
+
+
+class Weighted:
+    """Assigns to the user with the fewest pending items for their weight, a user of weight 2 gets
+    twice the items of a user of weight 1. Users without a weight get the default one."""
+    history = False
+
+    def __init__(self, weights: dict[str, float], default: float = 1.0):
+        if default <= 0 or any(weight <= 0 for weight in weights.values()):
+            raise ValueError(f"Assignment weights must be positive, got {weights!r}")
+        self.weights = weights
+        self.default = default
+
+    def choose(self, workloads: list[Workload]) -> Workload:
+        return min(workloads, key=lambda workload: (
+            workload.pending / self.weights.get(workload.username, self.default), workload.user_id))
+
+
+def create_assignment_strategy(name: str, weights: dict[str, float]):
+    if name == "least_loaded":
+        return LeastLoaded()
+    if name == "round_robin":
+        return RoundRobin()
+    if name == "weighted":
+        return Weighted(weights)
+    raise ValueError(f"Unknown assignment strategy {name!r}")
+
+
+assignment_strategy = create_assignment_strategy(settings.assignment_strategy, settings.assignment_weights)
+
+
+class AssignmentService(AppService):
+    def __init__(self, db, strategy=None):
+        super().__init__(db)
+        self.strategy = strategy or assignment_strategy
+
+    def assign(self, role: RolesEnum, assignee, status, pending_statuses: list) -> int:
+        """Returns the id of the user of the role the next item should be assigned to.
+
+        ``assignee`` and ``status`` are the columns of the item model holding the assigned user
+        and the status, items in one of ``pending_statuses`` count towards a user's workload. The
+        item has to be created in the same transaction, which keeps concurrent assignments for the
+        role from choosing by the same counts.
+        """
+        crud = AssignmentCRUD(self.db)
+        crud.lock(role, assignee)
+
+        workloads = crud.get_workloads(role, assignee, status, pending_statuses, self.strategy.history)
+        if not workloads:
+            raise UserException.NoUsersWithRole({"role": role})
+
+        return self.strategy.choose(workloads).user_id
+
+
+class AssignmentCRUD(AppCRUD):
+    def lock(self, role: RolesEnum, assignee):
+        """Waits for other transactions assigning items of this kind to the role, on PostgreSQL.
+
+        The lock is held until the transaction ends. Other databases serialize writes anyway.
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            key = zlib.crc32(f"{assignee.class_.__tablename__}:{role.value}".encode())
+            self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": key})
+
+    def get_workloads(self, role: RolesEnum, assignee, status, pending_statuses: list,
+                      history: bool = False) -> list[Workload]:
+        """Counts the pending items of every user of the role in one query, users without any count 0.
+
+        Without ``history`` only the pending items are joined, with it every item of the users is,
+        so that the latest assignment of each user is known as well.
+        """
+        model = assignee.class_
+        key = inspect(model).primary_key[0]
+        is_pending = status.in_(pending_statuses)
+
+        if history:
+            on, pending = assignee == UserDB.id, func.count(case((is_pending, key)))
+        else:
+            on, pending = and_(assignee == UserDB.id, is_pending), func.count(key)
+
+        rows = (self.db.query(UserDB.id, UserDB.username, pending, func.max(key))
+                .join(UserDB.roles)
+                .filter(RoleDB.name == role.value)
+                .outerjoin(model, on)
+                .group_by(UserDB.id, UserDB.username)
+                .all())
+
+        return [Workload(*row) for row in rows]
@@ -1,11 +1,18 @@
 from typing import Type
 
+from sqlalchemy.orm import joinedload
+
 from app.models.audit import AuditDB
+from app.models.documents import DocumentDB
+from app.models.users import UserDB
 from app.schemas.audit import AuditCreate, DocumentSummary
-from app.services.main import AppService
+from app.schemas.pagination import Page
+from app.services.assignments import AssignmentService
+from app.services.main import AppService, AppCRUD
 from app.services.users import UserCRUD, UserService
 from app.utils.enums import ActionStatus, DocumentStatusEnum, RolesEnum
 from app.utils.exceptions.audit_exceptions import AuditException
+from app.utils.pagination import PageParams
 from datetime import datetime
 
 import app.services.documents as documents
@@ -20,6 +27,22 @@ class AuditService(AppService):
 
         return audits
 
+    def get_audits_page(self, page: PageParams, user_id: int | None = None,
+                        status: ActionStatus | None = None) -> Page:
+        audits = AuditCRUD(self.db).get_audits_page(page, user_id=user_id, status=status)
+
+        return audits
+
+    def get_audits_page_by_username(self, username: str, page: PageParams,
+                                    status: ActionStatus | None = None) -> Page:
+        user = UserCRUD(self.db).get_user(username)
+        if not user:
+            raise UserException.UserNotFound({"username": username})
+
+        audits = AuditCRUD(self.db).get_audits_page(page, user_id=user.id, status=status)
+
+        return audits
+
     def get_pending_audits(self, user_id: int) -> list[Type[AuditDB]]:
         audits = AuditCRUD(self.db).get_audits_by_user_and_status(user_id, ActionStatus.PENDING)
 
@@ -107,24 +130,11 @@ class AuditService(AppService):
         return audit
 
     def create_audit_for_document(self, document_id: int) -> AuditDB:
-        auditors = UserService(self.db).get_users([RolesEnum.AUDITOR])
-
-        if not auditors:
-            raise UserException.NoUsersWithRole({"role": RolesEnum.AUDITOR})
-
-        auditors_with_pending_audits = []
-
-        for auditor in auditors:
-            pending_audits = self.get_pending_audits(auditor.id)
-            if pending_audits:
-                auditors_with_pending_audits.append((auditor, len(pending_audits)))
-            else:
-                auditors_with_pending_audits.append((auditor, 0))
-
-        auditor = min(auditors_with_pending_audits, key=lambda x: x[1])[0]
+        auditor_id = AssignmentService(self.db).assign(RolesEnum.AUDITOR, AuditDB.audited_by, AuditDB.status,
+                                                       [ActionStatus.PENDING])
 
         audit = AuditCreate(
-            audit_by=auditor.id,
+            audit_by=auditor_id,
             document_id=document_id
         )
 
@@ -165,7 +175,13 @@ class AuditService(AppService):
         return audits
 
 
-class AuditCRUD(AppService):
+class AuditCRUD(AppCRUD):
+    # both the audited user and the document with its owner are returned, each user with their roles
+    LOAD_USERS = (
+        joinedload(AuditDB.audited).selectinload(UserDB.roles),
+        joinedload(AuditDB.document).joinedload(DocumentDB.owner).selectinload(UserDB.roles),
+    )
+
     def create_audit(self, audit: AuditCreate) -> AuditDB:
         audit_db = self.db.query(AuditDB).filter(AuditDB.document_id == audit.document_id).first()
         if audit_db:
@@ -209,8 +225,20 @@ class AuditCRUD(AppService):
 
         return audits
 
+    def get_audits_page(self, page: PageParams, user_id: int | None = None,
+                        status: ActionStatus | None = None) -> Page:
+        query = self.db.query(AuditDB).options(*self.LOAD_USERS)
+        if user_id is not None:
+            query = query.filter(AuditDB.audited_by == user_id)
+        if status is not None:
+            query = query.filter(AuditDB.status == status)
+
+        # audited_at is only set once the audit is done, so pages follow the order of the requests
+        # and a date filter leaves out the pending ones
+        return self.paginate(query, page, [AuditDB.audit_id], AuditDB.audited_at)
+
     def get_audit_by_document_id(self, document_id: int) -> AuditDB | None:
-        audit = self.db.query(AuditDB).filter(AuditDB.document_id == document_id).first()
+        audit = self.db.query(AuditDB).options(*self.LOAD_USERS).filter(AuditDB.document_id == document_id).first()
 
         return audit
 
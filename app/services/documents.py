@@ -1,28 +1,53 @@
+import hashlib
 import io
+import json
+import logging
+import mimetypes
 import os
 import re
-from datetime import datetime
-from random import randint
+import time
+from datetime import datetime, timedelta
 from typing import Type
 
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from app.config.base import settings
-from app.config.database import IMAGE_STORAGE_CONNECTION_STRING
-from app.models.documents import DocumentDB, ImageDB
+from app.config.database import SessionLocal
+from app.models.documents import DocumentDB, ImageDB, DocumentJobDB, OCRResultDB, ImageObjectDB
+from app.models.users import UserDB
 from app.schemas.audit import DocumentSummary
 from app.schemas.documents import Document
+from app.schemas.pagination import Page
 from app.services.main import AppService, AppCRUD
 from app.services.users import UserService
-from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, RolesEnum
+from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, RolesEnum, JobStatusEnum, ImageSizeEnum
+from app.utils.exceptions.app_exceptions import AppExceptionCase
 from app.utils.exceptions.document_exceptions import DocumentException
-from app.utils.ocr.ocr import detect_document
+from app.utils.ocr.executor import ocr_executor
+from app.utils.pagination import PageParams
+from app.utils.metrics import ocr_cache_metrics, ocr_pipeline_metrics, transcode_metrics
+from app.utils.background import run_in_background
+from app.utils.responses import StoredImage
+from app.utils.storage import StorageBackend, image_storage
+from app.utils.uploads import spool_upload, SpooledUpload, IMAGE_EXTENSIONS
+from app.utils.ocr.azure import azure_vision, AzureVisionUnavailable
+from app.utils.ocr.instrumentation import StageTiming
+from app.utils.ocr.ocr import detect_document, extract_page, read_page_text, transcode_page, create_preview, \
+    DetectedDocument
 
 import app.services.audit as audit
-from app.utils.util import COMPATIBLE_STATUSES
+from app.utils.util import COMPATIBLE_STATUSES, DOCUMENT_NUMBER_PATTERNS
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentService(AppService):
+    # stage timings of the last OCR run of this service, None when the result came from the cache
+    pipeline_timings = None
+
     def get_all_documents(self, document_type: str, document_status: str) -> list[Type[DocumentDB]]:
         documents = DocumentCRUD(self.db).get_all_documents(document_type, document_status)
         return documents
@@ -35,45 +60,147 @@ class DocumentService(AppService):
         documents = DocumentCRUD(self.db).get_documents(owner_id)
         return documents
 
-    def create_document(self, image: UploadFile, owner_username: str) -> Document:
+    def get_documents_page(self, page: PageParams, document_type: DocumentTypeEnum | None = None,
+                           document_status: DocumentStatusEnum | None = None) -> Page:
+        documents = DocumentCRUD(self.db).get_documents_page(page, document_type=document_type,
+                                                             document_status=document_status)
+        return documents
+
+    def get_documents_page_by_username(self, owner_username: str, page: PageParams) -> Page:
         owner = UserService(self.db).get_user(owner_username)
-        document_status = DocumentStatusEnum.SCANNED
+        documents = DocumentCRUD(self.db).get_documents_page(page, owner_id=owner.id)
+        return documents
 
-        image_data = image.file.read()
-        image_filename = image.filename
+    async def create_document(self, image: UploadFile, owner_username: str) -> Document:
+        owner = UserService(self.db).get_user(owner_username)
 
+        upload = await spool_upload(image, image_storage.spool_directory(), settings.upload_max_bytes,
+                                    settings.upload_chunk_size)
         try:
-            summary = detect_document(image_data)
+            detected, document_type = await self.analyze_image(upload.path, upload.content_hash)
+            image_service = ImageService(self.db)
+            master = await image_service.transcode(upload.path, detected.corners)
+            image_db = await image_service.create_image(upload, image.filename, master)
+        finally:
+            upload.discard()
+
+        return self.create_scanned_document(image_db, owner.id, detected, document_type, upload.content_hash)
+
+    def create_scanned_document(self, image: ImageDB, owner_id: int, detected: DetectedDocument,
+                                document_type: DocumentTypeEnum, content_hash: str | None = None) -> Document:
+        document = DocumentCRUD(self.db).create_document(image, owner_id, document_type, detected.text,
+                                                         DocumentStatusEnum.SCANNED, detected.complete)
+
+        if not detected.complete:
+            # only the classification regions were read, the rest of the page is read after the response
+            run_in_background(complete_document_summary(document.id, detected, content_hash))
+
+        return document
+
+    async def analyze_image(self, image: bytes | str, content_hash: str | None = None
+                            ) -> tuple[DetectedDocument, DocumentTypeEnum]:
+        """Reads and classifies an image, given as bytes or as the path of a spooled upload."""
+        content_hash = content_hash or hashlib.sha256(image).hexdigest()
+
+        cached = OCRResultCRUD(self.db).get_result(content_hash) if settings.ocr_cache_enabled else None
+        # results without a type are rejections cached by earlier versions, the scan is read again
+        if cached and cached.document_type is not None:
+            ocr_cache_metrics.hit()
+            detected = DetectedDocument(text=cached.summary, corners=json.loads(cached.corners),
+                                        complete=cached.summary_complete is not False)
+            return detected, DocumentTypeEnum(cached.document_type)
+
+        ocr_cache_metrics.miss()
+
+        regions = settings.ocr_classification_regions if settings.ocr_summary_mode == "lazy" else None
+
+        try:
+            if azure_vision.enabled:
+                detected = await self.read_with_azure(image)
+            else:
+                detected = await ocr_executor.submit(detect_document, image, regions)
+        except AppExceptionCase:
+            raise
         except Exception as e:
             raise DocumentException.DocumentNotDetected()
 
-        receipt_regex = r"\bR\d{6}\b"
-        offer_regex = r"\bP\d{9}\b"
-        internal_regex = r"\bINT\d{4}\b"
+        self.pipeline_timings = detected.timings
+        ocr_pipeline_metrics.observe(detected.timings)
+        logger.debug("OCR stages: %s", ", ".join(f"{t.name}={t.wall_ms:.1f}ms" for t in detected.timings))
+
+        # rejected scans are not cached, they are read again once OCR or the document number patterns change
+        document_type = self.classify_document(detected.text)
+        if settings.ocr_cache_enabled:
+            OCRResultCRUD(self.db).create_result(content_hash, detected, document_type)
 
-        if re.search(receipt_regex, summary):
-            document_type = DocumentTypeEnum.RECEIPT
+        return detected, document_type
 
-        elif re.search(offer_regex, summary):
-            document_type = DocumentTypeEnum.OFFER
+    @staticmethod
+    async def read_with_azure(image: bytes | str) -> DetectedDocument:
+        extracted = await ocr_executor.submit(extract_page, image)
 
-        elif re.search(internal_regex, summary):
-            document_type = DocumentTypeEnum.INTERNAL
+        start = time.perf_counter()
+        try:
+            text = await azure_vision.read(extracted.page)
+        except AzureVisionUnavailable as e:
+            logger.warning("Azure Vision unavailable, reading the page locally: %s", e)
+            detected = await ocr_executor.submit(read_page_text, image, extracted.corners)
+            detected.timings = extracted.timings + detected.timings
+            return detected
+
+        timing = StageTiming("AzureOCR", (time.perf_counter() - start) * 1000, 0, len(text))
+        return DetectedDocument(text=text, corners=extracted.corners, timings=extracted.timings + [timing])
+
+    async def complete_summary(self, document_id: int, partial: DetectedDocument,
+                               content_hash: str | None = None) -> Document:
+        document = self.get_document(document_id)
+        image_data, is_page = await ImageService(self.db).get_ocr_source(document.image_id)
 
+        if is_page or partial.corners is not None:
+            # a stored master already is the deskewed page
+            detected = await ocr_executor.submit(read_page_text, image_data, None if is_page else partial.corners)
         else:
-            raise DocumentException.DocumentTypeNotRecognized()
+            # resumed after a restart, the page is found in the upload again
+            detected = await ocr_executor.submit(detect_document, image_data)
+        ocr_pipeline_metrics.observe(detected.timings)
+
+        if settings.ocr_cache_enabled:
+            content_hash = content_hash or hashlib.sha256(image_data).hexdigest()
+            OCRResultCRUD(self.db).complete_result(content_hash, detected.text)
+
+        # the OCR took a while, pick up changes made in the meantime
+        self.db.refresh(document)
 
-        image_db = ImageService(self.db).create_image(image_data, image_filename)
+        # keep the summary if someone already edited it
+        if document.summary == partial.text:
+            document.summary = detected.text
+        document.summary_complete = True
+        document = DocumentCRUD(self.db).update_document(document)
 
-        document = DocumentCRUD(self.db).create_document(image_db, owner.id, document_type, summary, document_status)
         return document
 
-    def get_document(self, document_id: int) -> Document:
-        document = DocumentCRUD(self.db).get_document(document_id)
+    @staticmethod
+    def classify_document(summary: str) -> DocumentTypeEnum:
+        for document_type, pattern in DOCUMENT_NUMBER_PATTERNS.items():
+            if re.search(pattern, summary):
+                return document_type
+
+        raise DocumentException.DocumentTypeNotRecognized()
+
+    def get_document(self, document_id: int, with_owner: bool = False) -> Document:
+        document = DocumentCRUD(self.db).get_document(document_id, with_owner)
         if not document:
             raise DocumentException.DocumentNotFound({"document_id": document_id})
         return document
 
+    def get_partial_summaries(self) -> list[tuple[int, DetectedDocument]]:
+        """Returns the documents whose full page has not been read yet, with what was read of it.
+
+        The page corners are not kept, they are found again when the page is read.
+        """
+        return [(document.id, DetectedDocument(text=document.summary, corners=None, complete=False))
+                for document in DocumentCRUD(self.db).get_documents_with_partial_summary()]
+
     def update_document(self, document_id: int, new_status: DocumentStatusEnum, document_summary: DocumentSummary | None) -> Document:
         if new_status is None:
             raise DocumentException.DocumentStatusNotProvided()
@@ -91,6 +218,8 @@ class DocumentService(AppService):
 
         if document_summary is not None:
             document.summary = document_summary.summary
+            # an edited summary is not replaced by the full page anymore
+            document.summary_complete = True
 
         document = DocumentCRUD(self.db).update_document(document)
         return document
@@ -115,13 +244,18 @@ class DocumentService(AppService):
 
 
 class DocumentCRUD(AppCRUD):
+    # a document is returned with its owner and the owner's roles, loaded with the documents
+    # instead of one query per document
+    LOAD_OWNER = (joinedload(DocumentDB.owner).selectinload(UserDB.roles),)
+
     def create_document(self, image: ImageDB, owner_id: int, document_type: DocumentTypeEnum, summary: str,
-                        document_status: DocumentStatusEnum) -> Document:
+                        document_status: DocumentStatusEnum, summary_complete: bool = True) -> Document:
         documentdb = DocumentDB(
             image_id=image.id,
             owner_id=owner_id,
             document_type=document_type,
             summary=summary,
+            summary_complete=summary_complete,
             document_status=document_status,
             scan_time=datetime.now()
         )
@@ -130,6 +264,9 @@ class DocumentCRUD(AppCRUD):
         self.db.refresh(documentdb)
         return documentdb
 
+    def get_documents_with_partial_summary(self) -> list[Type[DocumentDB]]:
+        return self.db.query(DocumentDB).filter(DocumentDB.summary_complete.is_(False)).all()
+
     def get_documents(self, owner_id: int) -> list[Type[DocumentDB]]:
         return self.db.query(DocumentDB).filter(DocumentDB.owner_id == owner_id).all()
 
@@ -145,8 +282,25 @@ class DocumentCRUD(AppCRUD):
         else:
             return self.db.query(DocumentDB).all()
 
-    def get_document(self, document_id: int) -> Type[DocumentDB]:
-        return self.db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    def get_documents_page(self, page: PageParams, owner_id: int | None = None,
+                           document_type: DocumentTypeEnum | None = None,
+                           document_status: DocumentStatusEnum | None = None) -> Page:
+        query = self.db.query(DocumentDB).options(*self.LOAD_OWNER)
+        if owner_id is not None:
+            query = query.filter(DocumentDB.owner_id == owner_id)
+        if document_type is not None:
+            query = query.filter(DocumentDB.document_type == document_type)
+        if document_status is not None:
+            query = query.filter(DocumentDB.document_status == document_status)
+
+        return self.paginate(query, page, [DocumentDB.scan_time, DocumentDB.id], DocumentDB.scan_time)
+
+    def get_document(self, document_id: int, with_owner: bool = False) -> Type[DocumentDB]:
+        """Returns the document, with its owner and their roles loaded along if it is to be returned."""
+        query = self.db.query(DocumentDB)
+        if with_owner:
+            query = query.options(*self.LOAD_OWNER)
+        return query.filter(DocumentDB.id == document_id).first()
 
     def update_document(self, document: Document) -> Document:
         self.db.commit()
@@ -154,81 +308,434 @@ class DocumentCRUD(AppCRUD):
         return document
 
 
+class DocumentJobService(AppService):
+    async def create_job(self, image: UploadFile, owner_username: str) -> DocumentJobDB:
+        owner = UserService(self.db).get_user(owner_username)
+
+        upload = await spool_upload(image, image_storage.spool_directory(), settings.upload_max_bytes,
+                                    settings.upload_chunk_size)
+        try:
+            image_db = await ImageService(self.db).create_image(upload, image.filename)
+        finally:
+            upload.discard()
+
+        return DocumentJobCRUD(self.db).create_job(owner.id, image_db.id)
+
+    def get_job(self, job_id: int) -> DocumentJobDB:
+        job = DocumentJobCRUD(self.db).get_job(job_id)
+        if not job:
+            raise DocumentException.DocumentJobNotFound({"job_id": job_id})
+        return job
+
+    async def run_job(self, job_id: int) -> DocumentJobDB:
+        # several processes may try to run the same job, only the one that claims it does
+        if not DocumentJobCRUD(self.db).claim_job(job_id):
+            return self.get_job(job_id)
+        job = self.get_job(job_id)
+
+        try:
+            image_service = ImageService(self.db)
+            image_data, _ = await image_service.get_ocr_source(job.image_id)
+            content_hash = hashlib.sha256(image_data).hexdigest()
+            document_service = DocumentService(self.db)
+            detected, document_type = await document_service.analyze_image(image_data, content_hash)
+
+            master = await image_service.transcode(image_data, detected.corners)
+            if master is not None:
+                await image_service.store_master(job.image_id, master)
+
+            document = document_service.create_scanned_document(job.image, job.owner_id, detected, document_type,
+                                                                content_hash)
+        except AppExceptionCase as e:
+            return await self._fail_job(job, e.exception_case)
+        except Exception:
+            logger.exception("Document job %s failed", job_id)
+            self.db.rollback()
+            return await self._fail_job(job, "InternalError")
+
+        return DocumentJobCRUD(self.db).update_job(job, JobStatusEnum.DONE, document_id=document.id)
+
+    async def _fail_job(self, job: DocumentJobDB, error: str) -> DocumentJobDB:
+        # the job is the only owner of its upload, which goes with the failure
+        image_id, job.image_id = job.image_id, None
+        job = DocumentJobCRUD(self.db).update_job(job, JobStatusEnum.FAILED, error=error)
+        try:
+            await ImageService(self.db).delete_image(image_id)
+        except Exception:
+            logger.exception("Releasing the image of failed document job %s failed", job.id)
+            self.db.rollback()
+        return job
+
+    def get_unfinished_jobs(self) -> list[Type[DocumentJobDB]]:
+        """Returns the queued jobs, after queueing again the running jobs whose process has not touched
+        them within the lease, which is taken as that process having stopped."""
+        job_crud = DocumentJobCRUD(self.db)
+        job_crud.requeue_stale_jobs(datetime.now() - timedelta(seconds=settings.document_job_lease))
+        return job_crud.get_jobs_by_status([JobStatusEnum.QUEUED])
+
+
+async def complete_document_summary(document_id: int, partial: DetectedDocument, content_hash: str | None = None):
+    db = SessionLocal()
+    try:
+        await DocumentService(db).complete_summary(document_id, partial, content_hash)
+    except Exception:
+        # the summary stays partial and is read again at the next startup
+        logger.exception("Reading the full page of document %s failed", document_id)
+    finally:
+        db.close()
+
+
+async def run_document_job(job_id: int):
+    # background tasks outlive the request, so they need their own session
+    db = SessionLocal()
+    try:
+        await DocumentJobService(db).run_job(job_id)
+    finally:
+        db.close()
+
+
+class DocumentJobCRUD(AppCRUD):
+    def create_job(self, owner_id: int, image_id: int) -> DocumentJobDB:
+        now = datetime.now()
+        job_db = DocumentJobDB(
+            owner_id=owner_id,
+            image_id=image_id,
+            status=JobStatusEnum.QUEUED,
+            created_at=now,
+            updated_at=now
+        )
+        self.db.add(job_db)
+        self.db.commit()
+        self.db.refresh(job_db)
+        return job_db
+
+    def get_job(self, job_id: int) -> Type[DocumentJobDB] | None:
+        return self.db.query(DocumentJobDB).filter(DocumentJobDB.id == job_id).first()
+
+    def get_jobs_by_status(self, statuses: list[JobStatusEnum]) -> list[Type[DocumentJobDB]]:
+        return self.db.query(DocumentJobDB).filter(DocumentJobDB.status.in_(statuses)).all()
+
+    def claim_job(self, job_id: int) -> bool:
+        """Moves a queued job to running, returns False if it was not queued (anymore)."""
+        claimed = (self.db.query(DocumentJobDB)
+                   .filter(DocumentJobDB.id == job_id, DocumentJobDB.status == JobStatusEnum.QUEUED)
+                   .update({DocumentJobDB.status: JobStatusEnum.RUNNING, DocumentJobDB.updated_at: datetime.now()},
+                           synchronize_session=False))
+        self.db.commit()
+        return claimed == 1
+
+    def requeue_stale_jobs(self, running_before: datetime) -> int:
+        requeued = (self.db.query(DocumentJobDB)
+                    .filter(DocumentJobDB.status == JobStatusEnum.RUNNING, DocumentJobDB.updated_at < running_before)
+                    .update({DocumentJobDB.status: JobStatusEnum.QUEUED, DocumentJobDB.updated_at: datetime.now()},
+                            synchronize_session=False))
+        self.db.commit()
+        return requeued
+
+    def update_job(self, job: DocumentJobDB, status: JobStatusEnum, document_id: int | None = None,
+                   error: str | None = None) -> DocumentJobDB:
+        job.status = status
+        job.document_id = document_id
+        job.error = error
+        job.updated_at = datetime.now()
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+
+class OCRResultCRUD(AppCRUD):
+    def get_result(self, content_hash: str) -> OCRResultDB | None:
+        result = self.db.query(OCRResultDB).filter(OCRResultDB.content_hash == content_hash).first()
+        if result:
+            result.hits += 1
+            result.last_used_at = datetime.now()
+            self.db.commit()
+        return result
+
+    def create_result(self, content_hash: str, detected: DetectedDocument,
+                      document_type: DocumentTypeEnum) -> OCRResultDB:
+        now = datetime.now()
+        result = self.db.merge(OCRResultDB(
+            content_hash=content_hash,
+            summary=detected.text,
+            corners=json.dumps(detected.corners),
+            summary_complete=detected.complete,
+            document_type=document_type,
+            hits=0,
+            created_at=now,
+            last_used_at=now
+        ))
+        self.db.commit()
+        self.evict(settings.ocr_cache_max_entries)
+        return result
+
+    def complete_result(self, content_hash: str, summary: str) -> OCRResultDB | None:
+        result = self.db.query(OCRResultDB).filter(OCRResultDB.content_hash == content_hash).first()
+        if result:
+            result.summary = summary
+            result.summary_complete = True
+            self.db.commit()
+        return result
+
+    def evict(self, max_entries: int) -> int:
+        # drop the least recently used results above the limit
+        stale = (self.db.query(OCRResultDB.content_hash)
+                 .order_by(OCRResultDB.last_used_at.desc())
+                 .offset(max_entries)
+                 .subquery())
+        evicted = (self.db.query(OCRResultDB)
+                   .filter(OCRResultDB.content_hash.in_(stale.select()))
+                   .delete(synchronize_session=False))
+        self.db.commit()
+        if evicted:
+            ocr_cache_metrics.evicted(evicted)
+        return evicted
+
+
 class ImageService(AppService):
-    def get_image(self, image_id: int) -> UploadFile:
-        image = ImageCRUD(self.db).get_image(image_id)
+    async def get_image(self, image_id: int) -> UploadFile:
+        image = await ImageCRUD(self.db).get_image(image_id)
         return image
 
-    def create_image(self, image_data: bytes, image_filename: str) -> ImageDB:
-        image = ImageCRUD(self.db).create_image(image_data, image_filename)
+    async def get_image_file(self, image_id: int, size: ImageSizeEnum = ImageSizeEnum.FULL) -> StoredImage:
+        image = await ImageCRUD(self.db).get_image_file(image_id, size)
         return image
 
+    async def get_ocr_source(self, image_id: int) -> tuple[bytes, bool]:
+        source = await ImageCRUD(self.db).get_ocr_source(image_id)
+        return source
+
+    async def create_image(self, upload: SpooledUpload, image_filename: str, master: bytes | None = None) -> ImageDB:
+        image = await ImageCRUD(self.db).create_image(upload, image_filename, master)
+        return image
+
+    async def store_master(self, image_id: int, master: bytes) -> ImageDB:
+        image = await ImageCRUD(self.db).store_master(image_id, master)
+        return image
+
+    @staticmethod
+    async def transcode(image: bytes | str, corners) -> bytes | None:
+        """Encodes the master of the page at the corners, None when uploads are stored as they are."""
+        if settings.image_master_format == "original" or not corners:
+            return None
+
+        try:
+            return await ocr_executor.submit(transcode_page, image, corners, settings.image_master_format,
+                                             settings.image_master_max_side, settings.image_master_quality,
+                                             settings.image_master_grayscale)
+        except Exception:
+            logger.exception("Transcoding the page failed, the upload is stored as it is")
+            return None
+
+    async def delete_image(self, image_id: int):
+        await ImageCRUD(self.db).delete_image(image_id)
 
-class ImageCRUD(AppCRUD):
-    IMAGE_PATH = settings.image_path
-    IMAGE_CONNECTION_STRING = IMAGE_STORAGE_CONNECTION_STRING if "None" not in IMAGE_STORAGE_CONNECTION_STRING else None
 
-    def __init__(self, db):
+class ImageCRUD(AppCRUD):
+    def __init__(self, db, storage: StorageBackend | None = None):
         super().__init__(db)
-        if self.IMAGE_CONNECTION_STRING:
-            from azure.storage.blob import BlobServiceClient
-            self.blob_service_client = BlobServiceClient.from_connection_string(self.IMAGE_CONNECTION_STRING)
-            self.container_client = self.blob_service_client.get_container_client(self.IMAGE_PATH)
+        self.storage = storage if storage is not None else image_storage
 
-    def get_image(self, image_id: int) -> UploadFile:
-        image_path = self.db.query(ImageDB).filter(ImageDB.id == image_id).first().image_path
+    def _get_image_db(self, image_id: int) -> ImageDB:
+        image_db = self.db.query(ImageDB).filter(ImageDB.id == image_id).first()
+        if not image_db:
+            raise DocumentException.ImageNotFound({"image_id": image_id})
+        return image_db
 
-        if self.IMAGE_CONNECTION_STRING:
-            # get image from blob storage
-            try:
-                image_data = self.container_client.download_blob(image_path)
-                f = io.BytesIO(image_data.readall())
-                image_file = UploadFile(filename=image_path, file=f)
-            except FileNotFoundError:
-                raise DocumentException.ImageNotFound({"image_id": image_id})
-        else:
-            # get image from disk
-            try:
-                file = open(image_path, "rb")
-                f = io.BytesIO(file.read())
-                image_file = UploadFile(filename=image_path, file=f)
-            except FileNotFoundError:
-                raise DocumentException.ImageNotFound({"image_id": image_id})
+    async def get_image(self, image_id: int) -> UploadFile:
+        image_path = self._get_image_db(image_id).image_path
+
+        try:
+            image_data = await self.storage.get(image_path)
+        except FileNotFoundError:
+            raise DocumentException.ImageNotFound({"image_id": image_id})
 
-        return image_file
+        return UploadFile(filename=image_path, file=io.BytesIO(image_data))
 
-    def create_image(self, image_data: bytes, image_filename: str) -> ImageDB:
-        image_path_split = image_filename.split(".")
-        image_name = ".".join(image_path_split[:-1])
-        image_extension = image_path_split[-1]
+    async def get_ocr_source(self, image_id: int) -> tuple[bytes, bool]:
+        """Returns the bytes to read the page from and whether they are the deskewed page itself."""
+        image_db = self._get_image_db(image_id)
+        # the upload gives the best text when it is kept, the master is read otherwise
+        image_path = image_db.original_path or image_db.image_path
 
-        if self.IMAGE_CONNECTION_STRING:
-            # upload image to blob storage
-            image_path = f"{image_name}"
-            blob = self.container_client.get_blob_client(image_path)
+        try:
+            image_data = await self.storage.get(image_path)
+        except FileNotFoundError:
+            raise DocumentException.ImageNotFound({"image_id": image_id})
 
-            while blob.exists():
-                image_path = f"{image_name}_{randint(0, 1000000)}"
-                blob = self.container_client.get_blob_client(image_path)
+        return image_data, image_db.original_size is not None and not image_db.original_path
 
-            blob.upload_blob(image_data)
+    async def get_image_file(self, image_id: int, size: ImageSizeEnum = ImageSizeEnum.FULL) -> StoredImage:
+        image_db = self._get_image_db(image_id)
 
-        else:
-            # save image to disk
-            image_path = f"{self.IMAGE_PATH}/{image_filename}"
+        if size is not ImageSizeEnum.FULL and image_db.content_hash:
+            return await self._get_preview(image_db, size)
+
+        image_path = image_db.image_path
+        content_type = image_db.content_type or mimetypes.guess_type(image_path)[0] or "application/octet-stream"
 
-            while os.path.exists(image_path):
-                image_path = f"{self.IMAGE_PATH}/{image_name}_{randint(0, 1000000)}.{image_extension}"
+        try:
+            image_size = await self.storage.size(image_path)
+        except FileNotFoundError:
+            raise DocumentException.ImageNotFound({"image_id": image_id})
+
+        read_range = lambda offset, length: self.storage.stream(image_path, offset, length)
+
+        if not image_db.content_hash:
+            # images stored before hashes were recorded are hashed once, on their first view
+            content_hash = hashlib.sha256()
+            async for chunk in read_range(0, None):
+                content_hash.update(chunk)
+            image_db.content_hash = content_hash.hexdigest()
+            self.db.commit()
+
+            if size is not ImageSizeEnum.FULL:
+                return await self._get_preview(image_db, size)
 
-            with open(image_path, "wb") as buffer:
-                buffer.write(image_data)
+        return StoredImage(content_type=content_type, size=image_size, content_hash=image_db.content_hash,
+                           read_range=read_range, local_path=self.storage.local_path(image_path))
+
+    async def _get_preview(self, image_db: ImageDB, size: ImageSizeEnum) -> StoredImage:
+        preview_path = self.preview_path(image_db.image_path, size)
+
+        try:
+            preview_size = await self.storage.size(preview_path)
+        except FileNotFoundError:
+            # previews are made on their first view and kept next to the image
+            try:
+                image_data = await self.storage.get(image_db.image_path)
+            except FileNotFoundError:
+                raise DocumentException.ImageNotFound({"image_id": image_db.id})
+
+            max_side = (settings.image_thumbnail_max_side if size is ImageSizeEnum.THUMBNAIL
+                        else settings.image_medium_max_side)
+            preview = await run_in_threadpool(create_preview, image_data, max_side, settings.image_preview_quality)
+            await self.storage.put(preview_path, preview)
+            preview_size = len(preview)
+
+        read_range = lambda offset, length: self.storage.stream(preview_path, offset, length)
+        return StoredImage(content_type="image/jpeg", size=preview_size,
+                           content_hash=f"{image_db.content_hash}-{size.value}", read_range=read_range,
+                           local_path=self.storage.local_path(preview_path))
+
+    @staticmethod
+    def preview_path(image_path: str, size: ImageSizeEnum) -> str:
+        return f"{os.path.splitext(image_path)[0]}.{size.value}.jpg"
+
+    def object_path(self, content_hash: str, image_format: str) -> str:
+        # two levels of 256 directories keep every directory small
+        return self.storage.object_key(
+            f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.{IMAGE_EXTENSIONS[image_format]}")
+
+    async def create_image(self, upload: SpooledUpload, image_filename: str, master: bytes | None = None) -> ImageDB:
+        if master is not None and len(master) >= upload.size:
+            # the upload already is smaller than its master would be
+            master = None
+
+        image_path = None
+        if master is None or settings.image_keep_original:
+            image_path = await self._add_object(
+                upload.content_hash, upload.image_format, upload.size,
+                lambda path: self.storage.put_file(path, upload.path, upload.size))
 
         image_db = ImageDB(
             image_path=image_path,
+            filename=image_filename,
+            content_hash=upload.content_hash,
+            content_type=f"image/{upload.image_format}",
+            size=upload.size,
         )
+        if master is not None:
+            await self._set_master(image_db, master)
 
         self.db.add(image_db)
         self.db.commit()
         self.db.refresh(image_db)
 
         return image_db
+
+    async def store_master(self, image_id: int, master: bytes) -> ImageDB:
+        """Stores the master of an image stored as it was uploaded."""
+        image_db = self._get_image_db(image_id)
+
+        if image_db.original_size is None and image_db.size is not None and len(master) < image_db.size:
+            await self._set_master(image_db, master)
+            self.db.commit()
+            self.db.refresh(image_db)
+
+        return image_db
+
+    async def _set_master(self, image_db: ImageDB, master: bytes):
+        original_path = image_db.image_path
+        content_hash = hashlib.sha256(master).hexdigest()
+        image_format = settings.image_master_format
+
+        image_db.image_path = await self._add_object(content_hash, image_format, len(master),
+                                                     lambda path: self.storage.put(path, master))
+        if settings.image_keep_original:
+            image_db.original_path = original_path
+        elif original_path:
+            await self._release(original_path)
+
+        transcode_metrics.observe(image_db.size, len(master))
+        image_db.original_size = image_db.size
+        image_db.size = len(master)
+        image_db.content_hash = content_hash
+        image_db.content_type = f"image/{image_format}"
+
+    async def _add_object(self, content_hash: str, image_format: str, size: int, write) -> str:
+        """Adds a reference to the object with this content, writing it with write(path) if it is new."""
+        image_path = self.object_path(content_hash, image_format)
+
+        if not self._add_reference(image_path):
+            # writing is idempotent, the path is derived from the content
+            await write(image_path)
+
+            self.db.add(ImageObjectDB(image_path=image_path, content_hash=content_hash, size=size, ref_count=1))
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # the same scan was stored by a concurrent upload in the meantime
+                self.db.rollback()
+                self._add_reference(image_path)
+
+        return image_path
+
+    def _add_reference(self, image_path: str) -> bool:
+        updated = (self.db.query(ImageObjectDB)
+                   .filter(ImageObjectDB.image_path == image_path)
+                   .update({ImageObjectDB.ref_count: ImageObjectDB.ref_count + 1}, synchronize_session=False))
+        self.db.commit()
+        return updated > 0
+
+    async def delete_image(self, image_id: int):
+        image_db = self._get_image_db(image_id)
+
+        image_paths = [path for path in (image_db.image_path, image_db.original_path) if path]
+        self.db.delete(image_db)
+        self.db.commit()
+
+        for image_path in image_paths:
+            await self._release(image_path)
+
+    async def _release(self, image_path: str):
+        # the update locks the object row until the commit, so an upload of the same scan waits in
+        # _add_reference until the bytes are gone, then finds no row and writes the object again
+        referenced = (self.db.query(ImageObjectDB)
+                      .filter(ImageObjectDB.image_path == image_path)
+                      .update({ImageObjectDB.ref_count: ImageObjectDB.ref_count - 1}, synchronize_session=False))
+        unused = (self.db.query(ImageObjectDB)
+                  .filter(ImageObjectDB.image_path == image_path, ImageObjectDB.ref_count <= 0)
+                  .delete(synchronize_session=False))
+
+        try:
+            # images stored before reference counting have no object row and are never shared
+            if unused or not referenced:
+                await self.storage.delete(image_path)
+                for size in (ImageSizeEnum.THUMBNAIL, ImageSizeEnum.MEDIUM):
+                    await self.storage.delete(self.preview_path(image_path, size))
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.commit()
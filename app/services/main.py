@@ -1,4 +1,9 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, Query
+
+from app.schemas.pagination import Page
+from app.utils.enums import SortOrderEnum
+from app.utils.pagination import PageParams, encode_cursor, decode_cursor
 
 
 class DBSessionMixin:
@@ -11,4 +16,30 @@ class AppService(DBSessionMixin):
 
 
 class AppCRUD(DBSessionMixin):
-    pass
+    def paginate(self, query: Query, page: PageParams, keys: list, date_column=None) -> Page:
+        """Returns one page of the query, ordered by the key columns, which together identify a row.
+
+        Pages are found by the keys of the last row of the previous page (keyset pagination), so
+        later pages cost as much as the first one however large the table grows.
+        """
+        if date_column is not None and page.date_from is not None:
+            query = query.filter(date_column >= page.date_from)
+        if date_column is not None and page.date_to is not None:
+            query = query.filter(date_column <= page.date_to)
+
+        descending = page.order == SortOrderEnum.DESC
+        if page.cursor:
+            values = decode_cursor(page.cursor, [key.type.python_type for key in keys])
+            row_key, cursor_key = tuple_(*keys), tuple_(*values)
+            query = query.filter(row_key < cursor_key if descending else row_key > cursor_key)
+
+        query = query.order_by(*(key.desc() if descending else key.asc() for key in keys))
+        # one more row tells whether there is a next page
+        rows = query.limit(page.limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > page.limit:
+            rows = rows[:page.limit]
+            next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+        return Page(items=rows, next_cursor=next_cursor)
@@ -1,7 +1,12 @@
 from app.schemas.signatures import SignatureCreate
-from app.services.main import AppService
+from app.schemas.pagination import Page
+from app.services.assignments import AssignmentService
+from app.services.main import AppService, AppCRUD
 from typing import Type
+from sqlalchemy.orm import joinedload
 from app.models.signatures import SignatureDB
+from app.models.documents import DocumentDB
+from app.models.users import UserDB
 from app.services.users import UserService
 from app.utils.enums import ActionStatus, DocumentStatusEnum, RolesEnum
 from datetime import datetime
@@ -12,9 +17,16 @@ import app.services.archives as archives
 
 from app.utils.exceptions.signature_exceptions import SignatureException
 from app.utils.exceptions.user_exceptions import UserException
+from app.utils.pagination import PageParams
 
 
-class SignatureCRUD(AppService):
+class SignatureCRUD(AppCRUD):
+    # both the signed user and the document with its owner are returned, each user with their roles
+    LOAD_USERS = (
+        joinedload(SignatureDB.signed).selectinload(UserDB.roles),
+        joinedload(SignatureDB.document).joinedload(DocumentDB.owner).selectinload(UserDB.roles),
+    )
+
     def get_all_signatures(self) -> list[Type[SignatureDB]]:
         return self.db.query(SignatureDB).all()
 
@@ -27,6 +39,18 @@ class SignatureCRUD(AppService):
     def get_signatures_by_user_and_status(self, user_id: int, status: ActionStatus) -> list[Type[SignatureDB]]:
         return self.db.query(SignatureDB).filter(user_id == SignatureDB.sign_by, status == SignatureDB.status).all()
 
+    def get_signatures_page(self, page: PageParams, user_id: int | None = None,
+                            status: ActionStatus | None = None) -> Page:
+        query = self.db.query(SignatureDB).options(*self.LOAD_USERS)
+        if user_id is not None:
+            query = query.filter(SignatureDB.sign_by == user_id)
+        if status is not None:
+            query = query.filter(SignatureDB.status == status)
+
+        # signed_at is only set once the document is signed, so pages follow the order of the requests
+        # and a date filter leaves out the pending ones
+        return self.paginate(query, page, [SignatureDB.signature_id], SignatureDB.signed_at)
+
     def create_signature(self, signature: SignatureCreate) -> SignatureDB:
         signature_db = self.db.query(SignatureDB).filter(SignatureDB.document_id == signature.document_id).first()
         if signature_db:
@@ -45,7 +69,7 @@ class SignatureCRUD(AppService):
         return signatureDB
 
     def get_signed_by_document_id(self, document_id: int) -> SignatureDB | None:
-        return self.db.query(SignatureDB).filter(document_id == SignatureDB.document_id).first()
+        return self.db.query(SignatureDB).options(*self.LOAD_USERS).filter(document_id == SignatureDB.document_id).first()
 
     def update_signature(self, signature: SignatureDB) -> Signature:
         self.db.commit()
@@ -57,6 +81,19 @@ class SignatureService(AppService):
     def get_all_signatures(self) -> list[Type[SignatureDB]]:
         return SignatureCRUD(self.db).get_all_signatures()
 
+    def get_signatures_page(self, page: PageParams, user_id: int | None = None,
+                            status: ActionStatus | None = None) -> Page:
+        return SignatureCRUD(self.db).get_signatures_page(page, user_id=user_id, status=status)
+
+    def get_signatures_page_by_username(self, username: str, page: PageParams,
+                                        status: ActionStatus | None = None) -> Page:
+        user = UserService(self.db).get_user(username)
+
+        if not user:
+            raise UserException.UserNotFound({"username": username})
+
+        return SignatureCRUD(self.db).get_signatures_page(page, user_id=user.id, status=status)
+
     def get_all_pending_signatures(self) -> list[Type[SignatureDB]]:
         return SignatureCRUD(self.db).get_signatures_by_status(ActionStatus.PENDING)
 
@@ -154,24 +191,11 @@ class SignatureService(AppService):
         return SignatureCRUD(self.db).create_signature(signature)
 
     def create_signature_for_document(self, document_id: int) -> SignatureDB:
-        directors = UserService(self.db).get_users([RolesEnum.DIRECTOR])
-
-        if not directors:
-            raise UserException.NoUsersWithRole({"role": RolesEnum.DIRECTOR})
-
-        signs_with_pending_signatures = []
-
-        for director in directors:
-            pending_signatures = self.get_pending_signatures_by_id(director.id)
-            if pending_signatures:
-                signs_with_pending_signatures.append((director, len(pending_signatures)))
-            else:
-                signs_with_pending_signatures.append((director, 0))
-
-        director = min(signs_with_pending_signatures, key=lambda x: x[1])[0]
+        director_id = AssignmentService(self.db).assign(RolesEnum.DIRECTOR, SignatureDB.sign_by, SignatureDB.status,
+                                                        [ActionStatus.PENDING])
 
         signature = SignatureCreate(
-            sign_by=director.id,
+            sign_by=director_id,
             document_id=document_id
         )
 
@@ -1,49 +1,100 @@
-from app.services.archives import ArchiveService
-from app.services.audit import AuditService
-from app.services.documents import DocumentService
-from app.services.main import AppService
-from app.services.signatures import SignatureService
+from sqlalchemy import func, literal, select, union_all
+
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.documents import DocumentDB
+from app.models.signatures import SignatureDB
+from app.models.users import UserDB
+from app.schemas.statistics import OrganizationStatistics, StatisticsCount
+from app.services.main import AppService, AppCRUD
 from app.services.users import UserService
-from app.utils.enums import RolesEnum, DocumentTypeEnum, ArchiveStatus
+from app.utils.enums import RolesEnum, DocumentTypeEnum, ArchiveStatus, ActionStatus
+from app.utils.exceptions.user_exceptions import UserException
 
 
 class StatisticsService(AppService):
     def get_user_statistics(self, username: str) -> dict:
         user = UserService(self.db).get_user(username)
+        if not user:
+            raise UserException.UserNotFound({"username": username})
+
+        counts = StatisticsCRUD(self.db).get_counts(user.id)
 
-        user_id = user.id
+        def count(kind: str, status: str | None = None, document_type: DocumentTypeEnum | None = None) -> int:
+            return sum(row.count for row in counts if row.kind == kind
+                       and (status is None or row.status == status)
+                       and (document_type is None or row.document_type == document_type))
 
         statistics = dict()
 
         roles = [RolesEnum(role.name) for role in user.roles]
 
-        scanned_documents = DocumentService(self.db).get_documents_by_user_id(user_id)
-        statistics["scanned_documents"] = len(scanned_documents)
+        statistics["scanned_documents"] = count("documents")
 
         if RolesEnum.AUDITOR in roles:
-            audited_documents = AuditService(self.db).get_audited_documents(user_id)
-            statistics["audited_documents"] = len(audited_documents)
+            statistics["audited_documents"] = count("audits", ActionStatus.DONE)
 
         if RolesEnum.DIRECTOR in roles:
-            signed_documents = SignatureService(self.db).get_signed_documents_by_id(user_id)
-            statistics["signed_documents"] = len(signed_documents)
+            statistics["signed_documents"] = count("signatures", ActionStatus.DONE)
+
+        if RolesEnum.ACCOUNTANT_OFFER in roles:
+            statistics["archived_offers"] = count("archives", ArchiveStatus.DONE, DocumentTypeEnum.OFFER)
 
-        if {RolesEnum.ACCOUNTANT_OFFER, RolesEnum.ACCOUNTANT_RECEIPT, RolesEnum.ACCOUNTANT_INTERNAL} & set(roles):
-            archived_documents = ArchiveService(self.db).get_archives_by_user_and_status(user_id, ArchiveStatus.DONE)
+        if RolesEnum.ACCOUNTANT_RECEIPT in roles:
+            statistics["archived_receipts"] = count("archives", ArchiveStatus.DONE, DocumentTypeEnum.RECEIPT)
 
-            if RolesEnum.ACCOUNTANT_OFFER in roles:
-                offers = [document for document in archived_documents if
-                          document.document.document_type == DocumentTypeEnum.OFFER]
-                statistics["archived_offers"] = len(offers)
+        if RolesEnum.ACCOUNTANT_INTERNAL in roles:
+            statistics["archived_internals"] = count("archives", ArchiveStatus.DONE, DocumentTypeEnum.INTERNAL)
 
-            if RolesEnum.ACCOUNTANT_RECEIPT in roles:
-                receipts = [document for document in archived_documents if
-                            document.document.document_type == DocumentTypeEnum.RECEIPT]
-                statistics["archived_receipts"] = len(receipts)
+        return statistics
+
+    def get_organization_statistics(self) -> OrganizationStatistics:
+        statistics = OrganizationStatistics()
 
-            if RolesEnum.ACCOUNTANT_INTERNAL in roles:
-                internals = [document for document in archived_documents if
-                             document.document.document_type == DocumentTypeEnum.INTERNAL]
-                statistics["archived_internals"] = len(internals)
+        for row in StatisticsCRUD(self.db).get_counts():
+            getattr(statistics, row.kind).append(StatisticsCount(
+                username=row.username,
+                document_type=row.document_type,
+                status=row.status,
+                count=row.count,
+            ))
 
         return statistics
+
+
+class StatisticsCRUD(AppCRUD):
+    # what is counted, who it belongs to and its status
+    COUNTED = (
+        ("documents", DocumentDB, DocumentDB.owner_id, DocumentDB.document_status),
+        ("audits", AuditDB, AuditDB.audited_by, AuditDB.status),
+        ("signatures", SignatureDB, SignatureDB.sign_by, SignatureDB.status),
+        ("archives", ArchiveDB, ArchiveDB.archive_by, ArchiveDB.status),
+    )
+
+    def get_counts(self, user_id: int | None = None) -> list:
+        """Counts the documents, audits, signatures and archives of each user by document type and status.
+
+        Every kind is grouped on its own and the groups are combined with UNION ALL, so the counts
+        of the whole organisation (or of one user) take a single query. Rows have the kind, the
+        username, the document type, the status and the count.
+        """
+        groups = []
+        for kind, model, user_column, status in self.COUNTED:
+            group = select(literal(kind).label("kind"), user_column.label("user_id"),
+                           DocumentDB.document_type.label("document_type"), status.label("status"),
+                           func.count().label("count"))
+            if model is DocumentDB:
+                group = group.select_from(DocumentDB)
+            else:
+                group = group.join_from(model, DocumentDB, model.document_id == DocumentDB.id)
+            if user_id is not None:
+                group = group.where(user_column == user_id)
+
+            groups.append(group.group_by(user_column, DocumentDB.document_type, status))
+
+        counts = union_all(*groups).subquery()
+        query = (select(counts.c.kind, UserDB.username, counts.c.document_type, counts.c.status, counts.c.count)
+                 .join_from(counts, UserDB, UserDB.id == counts.c.user_id)
+                 .order_by(counts.c.kind, UserDB.username, counts.c.document_type, counts.c.status))
+
+        return self.db.execute(query).all()
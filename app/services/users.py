@@ -1,11 +1,15 @@
 from typing import Type
 
+from sqlalchemy.orm import selectinload
+
 from app.config.jwt import access_security
 from app.models.users import UserDB, RoleDB
+from app.schemas.pagination import Page
 from app.schemas.users import UserCreate, User, AccessToken
 from app.services.main import AppService, AppCRUD
 from app.utils.enums import RolesEnum
 from app.utils.exceptions.user_exceptions import UserException
+from app.utils.pagination import PageParams
 from app.utils.password_hash import verify_password, hash_password
 
 
@@ -55,6 +59,9 @@ class UserService(AppService):
 
         return users_db
 
+    def get_users_page(self, page: PageParams, roles: list[RolesEnum] | None = None) -> Page:
+        return UserCRUD(self.db).get_users_page(page, roles)
+
     def register_admin(self, user: UserCreate) -> User:
         if RolesEnum.ADMIN not in user.roles:
             user.roles.append(RolesEnum.ADMIN)
@@ -128,6 +135,13 @@ class UserCRUD(AppCRUD):
     def get_users_by_role(self, role: str) -> list[Type[UserDB]]:
         return self.db.query(UserDB).filter(UserDB.roles.any(name=role)).all()
 
+    def get_users_page(self, page: PageParams, roles: list[RolesEnum] | None = None) -> Page:
+        query = self.db.query(UserDB).options(selectinload(UserDB.roles))
+        if roles:
+            query = query.filter(UserDB.roles.any(RoleDB.name.in_([role.value for role in roles])))
+
+        return self.paginate(query, page, [UserDB.id])
+
     def delete_user(self, username: str) -> UserDB:
         user = self.db.query(UserDB).filter(UserDB.username == username).first()
         if not user:
@@ -0,0 +1,11 @@
+import asyncio
+
+# the event loop only keeps weak references to tasks, so running ones are kept here
+_tasks = set()
+
+
+def run_in_background(coroutine) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coroutine)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.config.base import settings
+from app.config.database import IMAGE_STORAGE_CONNECTION_STRING
+from app.utils.metrics import ConnectionMetrics
+
+
+def _download_range(blob, offset: int, length: int) -> bytes:
+    return blob.download_blob(offset=offset, length=length).readall()
+
+
+# downloads the chunks of every parallel stream, so that all streams together never run more
+# than blob_max_concurrency downloads at once; threads are only started when first needed
+download_pool = ThreadPoolExecutor(max_workers=max(settings.blob_max_concurrency, 1),
+                                   thread_name_prefix="blob-download")
+
+
+def stream_blob_range(blob, offset: int, length: int, chunk_size: int, max_concurrency: int = 1,
+                      pool: ThreadPoolExecutor | None = None):
+    """Yields the bytes in [offset, offset + length) of a blob, chunk_size bytes at a time.
+
+    With max_concurrency above 1, up to that many of the following chunks are downloaded on
+    ``pool`` (the shared download_pool by default) while the current one is sent, so at most
+    max_concurrency chunks of the blob are held in memory at once, however large the blob is.
+    """
+    if max_concurrency <= 1 or length <= chunk_size:
+        yield from blob.download_blob(offset=offset, length=length).chunks()
+        return
+
+    pool = pool or download_pool
+    ranges = deque((start, min(chunk_size, offset + length - start))
+                   for start in range(offset, offset + length, chunk_size))
+
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < max_concurrency:
+                pending.append(pool.submit(_download_range, blob, *ranges.popleft()))
+            yield pending.popleft().result()
+    finally:
+        # the client went away, drop the chunks that were not started yet
+        for future in pending:
+            future.cancel()
+
+
+class BlobStorage:
+    """The blob container client shared by the whole process.
+
+    It is created on first use, so the API starts without a storage account, and all requests
+    go through one requests session whose connection pool keeps connections alive between
+    requests. Every HTTP response is timed until its headers arrive and counted in ``metrics``
+    by method, next to how many connections the pool had to open.
+    """
+
+    def __init__(self, connection_string: str | None, container_name: str, chunk_size: int, pool_size: int = 10):
+        self.connection_string = connection_string
+        self.container_name = container_name
+        self.chunk_size = chunk_size
+        self.pool_size = pool_size
+        self.metrics = ConnectionMetrics(self._connections_opened)
+        self._session = None
+        self._service_client = None
+        self._container_client = None
+        self._lock = threading.Lock()
+
+    @property
+    def container_client(self):
+        with self._lock:
+            if self._container_client is None:
+                self._create()
+            return self._container_client
+
+    def _create(self):
+        from azure.core.pipeline.transport import RequestsTransport
+        from azure.storage.blob import BlobServiceClient
+
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # the first request of a download only fetches one chunk, so large blobs start streaming right away
+        self._service_client = BlobServiceClient.from_connection_string(
+            self.connection_string,
+            transport=RequestsTransport(session=self._session, session_owner=False),
+            **_metrics_hooks(self.metrics),
+            max_single_get_size=self.chunk_size,
+            max_chunk_get_size=self.chunk_size,
+        )
+        self._container_client = self._service_client.get_container_client(self.container_name)
+
+    def _connections_opened(self) -> int:
+        session = self._session
+        if session is None:
+            return 0
+        total = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            total += sum(pools[key].num_connections for key in pools.keys())
+        return total
+
+    def close(self):
+        with self._lock:
+            if self._service_client is not None:
+                self._service_client.close()
+                self._session.close()
+            self._session = self._service_client = self._container_client = None
+
+
+def _metrics_hooks(metrics: ConnectionMetrics) -> dict:
+    """Request and response hooks of the storage pipeline, which run once per HTTP attempt."""
+    def on_request(request):
+        request.context["metrics_start"] = time.perf_counter()
+
+    def on_response(response):
+        wall_ms = (time.perf_counter() - response.context["metrics_start"]) * 1000
+        metrics.observe(response.http_request.method, wall_ms,
+                        failed=response.http_response.status_code >= 500)
+
+    return {"raw_request_hook": on_request, "raw_response_hook": on_response}
+
+
+blob_storage = BlobStorage(
+    IMAGE_STORAGE_CONNECTION_STRING if "None" not in IMAGE_STORAGE_CONNECTION_STRING else None,
+    settings.image_path,
+    settings.blob_chunk_size,
+)
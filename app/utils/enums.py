@@ -37,3 +37,21 @@ class DocumentStatusEnum(str, Enum):
     AUDITED = 'audited'
     SIGNED_AND_ARCHIVED = 'signed_and_archived'
     ARCHIVED = 'archived'
+
+
+class JobStatusEnum(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class SortOrderEnum(str, Enum):
+    ASC = 'asc'
+    DESC = 'desc'
+
+
+class ImageSizeEnum(str, Enum):
+    THUMBNAIL = 'thumbnail'
+    MEDIUM = 'medium'
+    FULL = 'full'
@@ -41,3 +41,11 @@ class AppException:
             """
             status_code = 401
             AppExceptionCase.__init__(self, status_code, context)
+
+    class InvalidCursor(AppExceptionCase):
+        def __init__(self, context: dict):
+            """
+            Page cursor is malformed
+            """
+            status_code = 400
+            AppExceptionCase.__init__(self, status_code, context)
@@ -36,6 +36,33 @@ class DocumentException:
             context = {"detail": "Document not detected"}
             AppExceptionCase.__init__(self, status_code, context)
 
+    class OCRQueueFull(AppExceptionCase):
+        def __init__(self):
+            """
+            Too many documents are waiting for OCR
+            """
+            status_code = 503
+            context = {"detail": "Too many documents are being processed, try again later"}
+            AppExceptionCase.__init__(self, status_code, context)
+
+    class OCRUnavailable(AppExceptionCase):
+        def __init__(self):
+            """
+            The OCR workers keep failing
+            """
+            status_code = 503
+            context = {"detail": "Document processing is unavailable, try again later"}
+            AppExceptionCase.__init__(self, status_code, context)
+
+    class OCRTimeout(AppExceptionCase):
+        def __init__(self):
+            """
+            OCR took too long
+            """
+            status_code = 504
+            context = {"detail": "Document processing timed out"}
+            AppExceptionCase.__init__(self, status_code, context)
+
     class ImageNotFound(AppExceptionCase):
         def __init__(self, context: dict):
             """
@@ -69,3 +96,37 @@ class DocumentException:
             """
             status_code = 403
             AppExceptionCase.__init__(self, status_code, context)
+
+    class DocumentJobNotFound(AppExceptionCase):
+        def __init__(self, context: dict):
+            """
+            Document job not found
+            """
+            status_code = 404
+            AppExceptionCase.__init__(self, status_code, context)
+
+    class UnsupportedImageFormat(AppExceptionCase):
+        def __init__(self):
+            """
+            Uploaded file is not a supported image
+            """
+            status_code = 415
+            context = {"detail": "Uploaded file is not a JPEG, PNG, WebP, BMP or TIFF image"}
+            AppExceptionCase.__init__(self, status_code, context)
+
+    class ImageTooLarge(AppExceptionCase):
+        def __init__(self, context: dict):
+            """
+            Uploaded image is larger than allowed
+            """
+            status_code = 413
+            AppExceptionCase.__init__(self, status_code, context)
+
+    class ImageNotDecodable(AppExceptionCase):
+        def __init__(self):
+            """
+            Stored image can not be decoded
+            """
+            status_code = 422
+            context = {"detail": "Image could not be decoded"}
+            AppExceptionCase.__init__(self, status_code, context)
@@ -0,0 +1,162 @@
+import bisect
+import threading
+
+from app.utils.ocr.instrumentation import StageTiming
+
+
+class CacheMetrics:
+    """Thread-safe hit, miss and eviction counters of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def evicted(self, count: int = 1):
+        with self._lock:
+            self.evictions += count
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+ocr_cache_metrics = CacheMetrics()
+
+
+class ByteCacheMetrics(CacheMetrics):
+    """Cache counters that also count the bytes served without going to the backing store."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_saved = 0
+
+    def hit(self, size: int = 0):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "bytes_saved": self.bytes_saved}
+
+
+image_cache_metrics = ByteCacheMetrics()
+
+
+class StageHistograms:
+    """Aggregates the per-stage timings of OCR runs into fixed-bucket wall time histograms."""
+
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timings):
+        with self._lock:
+            for timing in timings:
+                stage = self._stages.setdefault(timing.name, {
+                    "count": 0,
+                    "wall_ms_sum": 0.0,
+                    "cpu_ms_sum": 0.0,
+                    "max_output_size": 0,
+                    "buckets": [0] * (len(self.BUCKETS_MS) + 1),
+                })
+                stage["count"] += 1
+                stage["wall_ms_sum"] += timing.wall_ms
+                stage["cpu_ms_sum"] += timing.cpu_ms
+                stage["max_output_size"] = max(stage["max_output_size"], timing.output_size)
+                stage["buckets"][bisect.bisect_left(self.BUCKETS_MS, timing.wall_ms)] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            labels = [f"le_{bound}" for bound in self.BUCKETS_MS] + ["le_inf"]
+            return {
+                name: {
+                    "count": stage["count"],
+                    "wall_ms_sum": stage["wall_ms_sum"],
+                    "cpu_ms_sum": stage["cpu_ms_sum"],
+                    "wall_ms_mean": stage["wall_ms_sum"] / stage["count"],
+                    "max_output_size": stage["max_output_size"],
+                    "buckets": dict(zip(labels, stage["buckets"])),
+                }
+                for name, stage in self._stages.items()
+            }
+
+
+ocr_pipeline_metrics = StageHistograms()
+
+
+class ConnectionMetrics:
+    """Thread-safe request and error counters of an HTTP client, with how often it reused a connection.
+
+    ``connections`` reports how many connections the client has opened so far, it is called
+    when the metrics are read.
+    """
+
+    def __init__(self, connections=lambda: 0):
+        self.requests = 0
+        self.errors = 0
+        # one histogram stage per request method
+        self.latency = StageHistograms()
+        self._connections = connections
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, wall_ms: float, failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+        self.latency.observe([StageTiming(method, wall_ms, 0.0, 0)])
+
+    def to_dict(self) -> dict:
+        connections = self._connections()
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_opened": connections,
+            "connection_reuse_ratio": max(0.0, 1 - connections / self.requests) if self.requests else 0.0,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class TranscodeMetrics:
+    """Thread-safe totals of the bytes uploaded and the bytes stored in their place."""
+
+    def __init__(self):
+        self.images = 0
+        self.original_bytes = 0
+        self.stored_bytes = 0
+        self._lock = threading.Lock()
+
+    def observe(self, original_size: int, stored_size: int):
+        with self._lock:
+            self.images += 1
+            self.original_bytes += original_size
+            self.stored_bytes += stored_size
+
+    def to_dict(self) -> dict:
+        return {
+            "images": self.images,
+            "original_bytes": self.original_bytes,
+            "stored_bytes": self.stored_bytes,
+            "saved_bytes": self.original_bytes - self.stored_bytes,
+            "compression_ratio": self.stored_bytes / self.original_bytes if self.original_bytes else 1.0,
+        }
+
+
+transcode_metrics = TranscodeMetrics()
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from app.config.base import settings
+
+
+class AzureVisionUnavailable(Exception):
+    """The Azure Vision endpoint failed, timed out or is skipped by the open circuit breaker."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and ``allow`` returns
+    False for ``reset_timeout`` seconds. Then a single trial call is let through, which closes
+    the breaker again when it succeeds or keeps it open for another ``reset_timeout`` when it
+    fails.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed, e.g. a cancelled one, without counting it."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+def parse_read_result(analysis: dict) -> str:
+    text = ""
+    for block in analysis["readResult"]["blocks"]:
+        text += "\n".join([line["text"] for line in block["lines"]]) + "\n\n"
+    return text
+
+
+class AzureVisionClient:
+    """Reads text with the Azure Vision image analysis API.
+
+    All requests share one HTTP connection pool, so connections (and their TLS sessions) are
+    kept alive between documents, and at most ``max_connections`` requests are in flight, the
+    rest wait for a free connection. Failed and timed out requests are counted by a circuit
+    breaker, and while it is open ``read`` fails right away without calling Azure.
+    """
+
+    API_PATH = "computervision/imageanalysis:analyze"
+
+    def __init__(self, endpoint: str | None, key: str | None, max_connections: int = 10, timeout: float = 15,
+                 failure_threshold: int = 3, reset_timeout: float = 30, transport=None):
+        self.endpoint = endpoint
+        self.key = key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # lets tests and local development point the client at a stub server
+        self._transport = transport
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.endpoint is not None and self.key is not None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                headers={'Ocp-Apim-Subscription-Key': self.key},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def read(self, image: bytes, content_type: str = "image/jpeg") -> str:
+        if not self.breaker.allow():
+            raise AzureVisionUnavailable("circuit breaker is open")
+
+        try:
+            response = await self._get_client().post(
+                self.API_PATH,
+                params={"features": "read", "language": "hr", "api-version": "2023-10-01"},
+                headers={'Content-Type': content_type},
+                content=image,
+            )
+            response.raise_for_status()
+            text = parse_read_result(response.json())
+        except (httpx.HTTPError, KeyError, TypeError, ValueError) as e:
+            self.breaker.record_failure()
+            raise AzureVisionUnavailable(str(e)) from e
+        except asyncio.CancelledError:
+            # the client went away or the server is stopping, which says nothing about Azure, but a
+            # cancelled trial must not leave a half-open breaker waiting for it
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        return text
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+azure_vision = AzureVisionClient(
+    endpoint=settings.vision_endpoint,
+    key=settings.vision_key,
+    max_connections=settings.vision_max_connections,
+    timeout=settings.vision_timeout,
+    failure_threshold=settings.vision_failure_threshold,
+    reset_timeout=settings.vision_reset_timeout,
+)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config.base import settings
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.ocr.readers import readers
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(languages, warm_up, started):
+    if warm_up:
+        try:
+            readers.warm_up(languages)
+        except Exception:
+            # an initializer that raises breaks the whole pool, the reader is loaded on first use instead
+            logger.exception("Warming up the OCR reader failed")
+
+    # every worker checks in once its reader is warm, so readiness counts workers, not jobs
+    with started.get_lock():
+        started.value += 1
+
+
+def _worker_started():
+    return True
+
+
+class OCRExecutor:
+    """Runs OCR jobs outside the event loop.
+
+    Jobs go to a pool of ``max_workers`` processes, each with its own warmed easyocr reader.
+    With ``max_workers`` set to 0 they run on a single background thread of the API process
+    instead, which is handy for development. At most ``max_workers + queue_size`` jobs are
+    accepted at once, further submissions are rejected right away, and each job is awaited
+    for at most ``timeout`` seconds. A pool broken by a dying worker is replaced, and the job
+    is tried once more on the new one.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, timeout: float, languages=("hr", "en"), warm_up=False):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.languages = list(languages)
+        self.warm_up = warm_up
+        self._pool = None
+        self._started = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._started is not None and self._started.value >= max(self.max_workers, 1)
+
+    def start(self):
+        if self._pool is not None:
+            return
+
+        context = multiprocessing.get_context("spawn")
+        self._started = context.Value("i", 0)
+        initargs = (self.languages, self.warm_up, self._started)
+        if self.max_workers == 0:
+            self._pool = ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=initargs)
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=initargs,
+            )
+
+        # the pool only spawns workers for queued jobs, one probe per worker starts them all right away
+        for _ in range(max(self.max_workers, 1)):
+            self._pool.submit(_worker_started)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._started = None
+
+    async def submit(self, fn, *args):
+        for _ in range(2):
+            pool, job = self._submit(fn, *args)
+            if job is None:
+                self._restart(pool)
+                continue
+
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+            except asyncio.TimeoutError:
+                raise DocumentException.OCRTimeout()
+            except BrokenExecutor:
+                self._restart(pool)
+
+        raise DocumentException.OCRUnavailable()
+
+    def _submit(self, fn, *args):
+        """Returns the pool and the job submitted to it, no job if the pool is broken."""
+        with self._lock:
+            if self._pending >= max(self.max_workers, 1) + self.queue_size:
+                raise DocumentException.OCRQueueFull()
+            self._pending += 1
+
+        try:
+            self.start()
+            pool = self._pool
+            try:
+                job = pool.submit(fn, *args)
+            except BrokenExecutor:
+                self._release(None)
+                return pool, None
+        except Exception:
+            self._release(None)
+            raise
+
+        # the slot is freed when the job really finishes, not when the caller stops waiting
+        job.add_done_callback(self._release)
+        return pool, job
+
+    def _restart(self, pool):
+        # concurrent jobs of the same pool fail together, only the first of them replaces it
+        if self._pool is pool:
+            logger.warning("The OCR pool is broken, starting a new one")
+            self.shutdown()
+            self.start()
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+
+ocr_executor = OCRExecutor(
+    max_workers=settings.ocr_workers,
+    queue_size=settings.ocr_queue_size,
+    timeout=settings.ocr_timeout,
+    languages=settings.ocr_languages,
+    warm_up=settings.ocr_warm_up,
+)
@@ -1,17 +1,57 @@
-from math import atan
 import cv2
 import numpy as np
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.ocr.instrumentation import StageRecorder
 from app.utils.ocr.processors import Closer, EdgeDetector
-from sklearn.cluster import KMeans
-from itertools import combinations
+
+
+def cluster_corners(points, image_shape, iterations=10):
+    """Groups intersection points around the four corners of a page.
+
+    Points are first assigned to the image quadrant they fall in, which seeds one cluster
+    per corner, and the centers are then refined with a few Lloyd steps. Centers are the
+    per-axis medians of their clusters, so stray intersections far from the page corners
+    do not drag them inwards.
+
+    Params
+    ------
+    points          (N, 2) array of (x, y) intersection points
+    image_shape     shape of the image the points were found in
+    iterations      maximum number of refinement steps
+
+    Returns
+    -------
+    (4, 2) array of cluster centers, None when a corner has no points
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    height, width = image_shape[:2]
+
+    # quadrants in top-left, top-right, bottom-right, bottom-left order
+    right = points[:, 0] > width / 2
+    bottom = points[:, 1] > height / 2
+    labels = np.select([~right & ~bottom, right & ~bottom, right & bottom], [0, 1, 2], default=3)
+
+    for _ in range(iterations + 1):
+        if np.bincount(labels, minlength=4).min() == 0:
+            return None
+        centers = np.array([np.median(points[labels == label], axis=0) for label in range(4)])
+
+        distances = ((points[:, np.newaxis, :] - centers[np.newaxis, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    return centers
 
 
 class HoughLineCornerDetector:
-    def __init__(self, rho_acc=2, theta_acc=360, thresh=100, output_process=True):
+    def __init__(self, rho_acc=2, theta_acc=360, thresh=100, output_process=True, recorder=None):
         self.rho_acc = rho_acc
         self.theta_acc = theta_acc
         self.thresh = thresh
         self.output_process = output_process
+        self.recorder = recorder if recorder is not None else StageRecorder()
         self._preprocessor = [
             Closer(output_process=output_process),
             EdgeDetector(output_process=output_process)
@@ -21,16 +61,16 @@ class HoughLineCornerDetector:
         # Step 1: Process for edge detection
         self._image = image
         for processor in self._preprocessor:
-            self._image = processor(self._image)
+            self._image = self.recorder(type(processor).__name__, processor, self._image)
 
         # Step 2: Get hough lines
-        self._lines = self._get_hough_lines()
+        self._lines = self.recorder("HoughLines", self._get_hough_lines)
 
         # Step 3: Get intersection points
-        self._intersections = self._get_intersections()
+        self._intersections = self.recorder("Intersections", self._get_intersections)
 
         # Step 4: Get Quadrilaterals
-        return self._find_quadrilaterals()
+        return self.recorder("CornerClustering", self._find_quadrilaterals)
 
     def _get_hough_lines(self):
         lines = cv2.HoughLines(
@@ -67,41 +107,55 @@ class HoughLineCornerDetector:
         cv2.imwrite('output/hough_line.jpg', hough_line_output)
 
     def _get_intersections(self):
-        """Finds the intersections between groups of lines."""
-        lines = self._lines
-        intersections = []
-        group_lines = combinations(range(len(lines)), 2)
-        x_in_range = lambda x: 0 <= x <= self._image.shape[1]
-        y_in_range = lambda y: 0 <= y <= self._image.shape[0]
+        """Finds the intersections between lines that are 80 to 100 degrees apart.
+
+        Every pair of lines (the upper triangle of the n x n pair matrix) is intersected at once
+        with Cramer's rule, whatever the rotation of the page.
+        Returns an (N, 1, 2) array of integer pixel locations inside the image.
+        """
+        intersections = np.empty((0, 1, 2), dtype=int)
+
+        if self._lines is not None:
+            rho, theta = self._lines[:, 0, 0].astype(np.float64), self._lines[:, 0, 1].astype(np.float64)
+            first, second = np.triu_indices(len(rho), k=1)
+            rho_1, theta_1 = rho[first], theta[first]
+            rho_2, theta_2 = rho[second], theta[second]
+
+            difference = np.abs(theta_1 - theta_2) % np.pi
+            angle = np.degrees(np.minimum(difference, np.pi - difference))
 
-        for i, j in group_lines:
-            line_i, line_j = lines[i][0], lines[j][0]
+            # x * cos(theta) + y * sin(theta) = rho for both lines
+            cos_1, sin_1 = np.cos(theta_1), np.sin(theta_1)
+            cos_2, sin_2 = np.cos(theta_2), np.sin(theta_2)
+            determinant = cos_1 * sin_2 - sin_1 * cos_2
 
-            if 80.0 < self._get_angle_between_lines(line_i, line_j) < 100.0:
-                int_point = self._intersection(line_i, line_j)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = (rho_1 * sin_2 - rho_2 * sin_1) / determinant
+                y = (rho_2 * cos_1 - rho_1 * cos_2) / determinant
 
-                if x_in_range(int_point[0][0]) and y_in_range(int_point[0][1]):
-                    intersections.append(int_point)
+            valid = (angle > 80.0) & np.isfinite(x) & np.isfinite(y)
+            x, y = np.round(x[valid]).astype(int), np.round(y[valid]).astype(int)
+
+            in_range = (0 <= x) & (x <= self._image.shape[1]) & (0 <= y) & (y <= self._image.shape[0])
+            intersections = np.stack([x[in_range], y[in_range]], axis=1)[:, np.newaxis, :]
 
         if self.output_process: self._draw_intersections(intersections)
 
         return intersections
 
     def _find_quadrilaterals(self):
-        X = np.array([[point[0][0], point[0][1]] for point in self._intersections])
-        kmeans = KMeans(
-            n_clusters=4,
-            init='k-means++',
-            max_iter=100,
-            n_init=10,
-            random_state=0
-        ).fit(X)
+        if len(self._intersections) < 4:
+            raise DocumentException.DocumentNotDetected()
+
+        centers = cluster_corners(self._intersections, self._image.shape)
+        if centers is None:
+            raise DocumentException.DocumentNotDetected()
 
-        if self.output_process: self._draw_quadrilaterals(self._lines, kmeans)
+        if self.output_process: self._draw_quadrilaterals(self._lines, centers)
 
-        return [[center.tolist()] for center in kmeans.cluster_centers_]
+        return [[center.tolist()] for center in centers]
 
-    def _draw_quadrilaterals(self, lines, kmeans):
+    def _draw_quadrilaterals(self, lines, centers):
         grouped_output = self._get_color_image()
 
         for idx, line in enumerate(lines):
@@ -122,7 +176,7 @@ class HoughLineCornerDetector:
                 2
             )
 
-        for point in kmeans.cluster_centers_:
+        for point in centers:
             x, y = point
 
             cv2.circle(
@@ -135,35 +189,6 @@ class HoughLineCornerDetector:
 
         cv2.imwrite('output/grouped.jpg', grouped_output)
 
-    def _get_angle_between_lines(self, line_1, line_2):
-        rho1, theta1 = line_1
-        rho2, theta2 = line_2
-        # x * cos(theta) + y * sin(theta) = rho
-        # y * sin(theta) = x * (- cos(theta)) + rho
-        # y = x * (-cos(theta) / sin(theta)) + rho
-        m1 = -(np.cos(theta1) / np.sin(theta1))
-        m2 = -(np.cos(theta2) / np.sin(theta2))
-        return abs(atan(abs(m2 - m1) / (1 + m2 * m1))) * (180 / np.pi)
-
-    def _intersection(self, line1, line2):
-        """Finds the intersection of two lines given in Hesse normal form.
-
-        Returns closest integer pixel locations.
-        See https://stackoverflow.com/a/383527/5087436
-        """
-        rho1, theta1 = line1
-        rho2, theta2 = line2
-
-        A = np.array([
-            [np.cos(theta1), np.sin(theta1)],
-            [np.cos(theta2), np.sin(theta2)]
-        ])
-
-        b = np.array([[rho1], [rho2]])
-        x0, y0 = np.linalg.solve(A, b)
-        x0, y0 = int(np.round(x0)), int(np.round(y0))
-        return [[x0, y0]]
-
     def _draw_intersections(self, intersections):
         intersection_point_output = self._get_color_image()
 
@@ -192,7 +217,7 @@ class HoughLineCornerDetector:
 
             cv2.circle(
                 intersection_point_output,
-                (x, y),
+                (int(x), int(y)),
                 5,
                 (255, 255, 127),
                 5
@@ -0,0 +1,55 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class StageTiming:
+    name: str
+    wall_ms: float
+    cpu_ms: float
+    # size of the stage output, nbytes for arrays and len() for everything else
+    output_size: int
+    output_shape: tuple | None = None
+
+
+class StageRecorder:
+    """Runs the steps of the page extraction pipeline and records how long each one took.
+
+    Every finished step is passed to the hooks as a StageTiming, and all of them are kept
+    in ``timings`` in the order they ran. CPU time is process-wide, so it also includes the
+    worker threads OpenCV spawns for a step.
+    """
+
+    def __init__(self, hooks=()):
+        self.timings = []
+        self._hooks = list(hooks)
+
+    def __call__(self, name, fn, *args, **kwargs):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        output = fn(*args, **kwargs)
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+        cpu_ms = (time.process_time() - cpu_start) * 1000
+
+        timing = StageTiming(name, wall_ms, cpu_ms, *_output_size(output))
+        self.timings.append(timing)
+        for hook in self._hooks:
+            hook(timing)
+
+        return output
+
+
+def _output_size(output):
+    if isinstance(output, np.ndarray):
+        return output.nbytes, output.shape
+    if output is None:
+        return 0, None
+    try:
+        return len(output), None
+    except TypeError:
+        return 0, None
+
+
+def server_timing_header(timings: list[StageTiming]) -> str:
+    return ", ".join(f"{timing.name};dur={timing.wall_ms:.1f}" for timing in timings)
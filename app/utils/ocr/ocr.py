@@ -1,36 +1,106 @@
+from dataclasses import dataclass, field
+
+import re
+import struct
+
 import cv2
 import numpy as np
-import requests
-from easyocr import easyocr
 
 from app.config.base import settings
 from app.utils.exceptions.document_exceptions import DocumentException
 from app.utils.ocr.processors import Resizer, FastDenoiser, OtsuThresholder
 from app.utils.ocr.hough_line_corner_detector import HoughLineCornerDetector
+from app.utils.ocr.instrumentation import StageRecorder, StageTiming
+from app.utils.ocr.readers import readers
+from app.utils.util import DOCUMENT_NUMBER_PATTERNS
+
+
+# JPEG scale denominators OpenCV can decode at, from the cheapest
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    1: cv2.IMREAD_COLOR,
+}
+
+
+def read_image_size(data: bytes) -> tuple[int, int] | None:
+    """Returns the (height, width) stored in a PNG or JPEG header, None for other formats."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return height, width
+
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                return None
+            marker = data[i + 1]
+            if marker == 0xFF:
+                # fill byte
+                i += 1
+                continue
+            if 0xD0 <= marker <= 0xD8 or marker == 0x01:
+                # markers without a payload
+                i += 2
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                # start of frame, the precision byte is followed by height and width
+                return struct.unpack(">HH", data[i + 5:i + 9])
+            i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+
+    return None
+
+
+def reduction_factor(size: tuple[int, int] | None, min_side: int) -> int:
+    """Largest JPEG scale denominator that keeps both sides of the image at least min_side pixels."""
+    if size is None:
+        return 1
+    return next(factor for factor in REDUCED_DECODE_FLAGS if factor == 1 or min(size) // factor >= min_side)
 
 
 class PageExtractor:
-    def __init__(self, preprocessors, corner_detector, output_process=False):
+    """Finds the page in a photo and returns it deskewed.
+
+    Corners are searched on an image decoded at a reduced scale (JPEG DCT scaling) that is
+    still at least ``detection_height`` pixels high, so the full-resolution photo is never
+    decoded for detection. The page is warped from the smallest decode that still gives
+    ``max_page_side`` pixels on its longest side, which often is the reduced image itself.
+    Without ``detection_height`` and ``max_page_side`` the photo is decoded and the page
+    warped at full resolution.
+    """
+
+    def __init__(self, preprocessors, corner_detector, output_process=False, recorder=None, detection_height=None,
+                 max_page_side=None):
         assert isinstance(preprocessors, list), "List of processors expected"
         self._preprocessors = preprocessors
         self._corner_detector = corner_detector
         self.output_process = output_process
+        self.recorder = recorder if recorder is not None else StageRecorder()
+        self.detection_height = detection_height
+        self.max_page_side = max_page_side
+
+    def __call__(self, image_bytes, corners=None):
+        self._image_bytes = image_bytes
+        self._image, self._scale = None, None
+
+        if corners is not None:
+            # corners found by an earlier run, in top-left, top-right, bottom-right, bottom-left order
+            return self._extract_page(np.array(corners, dtype="float32"))
 
-    def __call__(self, image_bytes):
-        # Step 1: Read image from file
-        self._image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        # Step 1: Read image from file, reduced to what the detection needs
+        size = read_image_size(image_bytes) if self.detection_height else None
+        self._scale = reduction_factor(size, self.detection_height)
+        self._image = self._decode("Decode", self._scale)
 
         # Step 2: Preprocess image
         self._processed = self._image
         for preprocessor in self._preprocessors:
-            self._processed = preprocessor(self._processed)
+            self._processed = self.recorder(type(preprocessor).__name__, preprocessor, self._processed)
 
         self._intersections = self._corner_detector(self._processed)
 
         # Step 3: Deskew and extract page
-        return self._extract_page()
-
-    def _extract_page(self):
         # obtain a consistent order of the points and unpack them
         # individually
         pts = np.array([
@@ -44,11 +114,23 @@ class PageExtractor:
 
         area = (tl[0] - br[0]) * (tl[1] - br[1])
 
-        area_threshold = self._image.shape[0] * self._image.shape[1] * 0.2
+        area_threshold = self._image.shape[0] * self._image.shape[1] * self._scale ** 2 * 0.2
 
         if area < area_threshold:
             raise DocumentException.DocumentNotDetected()
 
+        return self._extract_page(rect)
+
+    def _decode(self, stage, factor):
+        return self.recorder(stage, cv2.imdecode, np.frombuffer(self._image_bytes, np.uint8),
+                             REDUCED_DECODE_FLAGS[factor])
+
+    def _extract_page(self, rect):
+        """Warps the page with the given corners, in full-resolution coordinates, to a rectangle."""
+        self.corners = rect.tolist()
+
+        (tl, tr, br, bl) = rect
+
         # compute the width of the new image, which will be the
         # maximum distance between bottom-right and bottom-left
         # x-coordiates or the top-right and top-left x-coordinates
@@ -63,6 +145,21 @@ class PageExtractor:
         heightB = np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))
         maxHeight = max(int(heightA), int(heightB))
 
+        # shrink the page to max_page_side and warp it from the smallest decode
+        # that still has enough pixels for that
+        output_scale = 1.0
+        if self.max_page_side:
+            output_scale = min(1.0, self.max_page_side / max(maxWidth, maxHeight, 1))
+        factor = max(f for f in REDUCED_DECODE_FLAGS if f * output_scale <= 1)
+
+        if self._image is not None and self._scale <= factor:
+            image, factor = self._image, self._scale
+        else:
+            image = self._decode("DecodeFull" if factor == 1 else "DecodeWarp", factor)
+
+        maxWidth = max(int(maxWidth * output_scale), 1)
+        maxHeight = max(int(maxHeight * output_scale), 1)
+
         # now that we have the dimensions of the new image, construct
         # the set of destination points to obtain a "birds eye view",
         # (i.e. top-down view) of the image, again specifying points
@@ -76,8 +173,8 @@ class PageExtractor:
             dtype="float32"  # Date type
         )
 
-        M = cv2.getPerspectiveTransform(rect, dst)
-        warped = cv2.warpPerspective(self._image, M, (maxWidth, maxHeight))
+        M = cv2.getPerspectiveTransform(rect / factor, dst)
+        warped = self.recorder("Warp", cv2.warpPerspective, image, M, (maxWidth, maxHeight))
 
         if self.output_process: cv2.imwrite('output/deskewed.jpg', warped)
 
@@ -103,8 +200,8 @@ class PageExtractor:
         rect = np.zeros((4, 2), dtype="float32")
 
         # transform to size of original image
-        transform = lambda x: (x[0] * self._image.shape[1] / self._processed.shape[1],
-                               x[1] * self._image.shape[0] / self._processed.shape[0])
+        transform = lambda x: (x[0] * self._image.shape[1] * self._scale / self._processed.shape[1],
+                               x[1] * self._image.shape[0] * self._scale / self._processed.shape[0])
 
         # the top-left point will have the smallest sum, whereas
         # the bottom-right point will have the largest sum
@@ -123,53 +220,90 @@ class PageExtractor:
         return rect
 
 
-def extract_text_from_image_azure(image: bytes):
-    key = settings.vision_key
-    endpoint = settings.vision_endpoint
+def encode_page(image, max_side: int, max_bytes: int, quality: int = 85) -> bytes:
+    """Encodes the page as a JPEG of at most max_side pixels per side and roughly max_bytes bytes.
 
-    complete_endpoint = f"{endpoint}computervision/imageanalysis:analyze?features=read&language=hr&api-version=2023-10-01"
+    The quality is lowered in steps until the page fits, down to 40, and below that the page
+    is scaled down further instead.
+    """
+    scale = min(1.0, max_side / max(image.shape[:2]))
+    while True:
+        resized = image if scale == 1.0 else cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        for q in range(quality, 39, -15):
+            _, encoded = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, q])
+            if encoded.nbytes <= max_bytes:
+                return encoded.tobytes()
+        if min(resized.shape[:2]) <= 64:
+            return encoded.tobytes()
+        scale *= 0.75
 
-    headers = {
-        'Content-Type': 'application/octet-stream',
-        'Ocp-Apim-Subscription-Key': key,
-    }
 
-    content = image
+def extract_text_from_image_locally(image):
+    # OCR on the given image, the reader is loaded once per process
+    results = readers.readtext(image, settings.ocr_languages)
 
-    text = ""
+    # Concatenate all the detected text into a single string
+    extracted_text = "\n".join([result[1] for result in results])
 
-    try:
-        response = requests.post(complete_endpoint, headers=headers, data=content)
-        response.raise_for_status()
-        analysis = response.json()
-        blocks = analysis["readResult"]["blocks"]
-        for block in blocks:
-            lines = block["lines"]
-            block_text = "\n".join([line["text"] for line in lines])
+    return extracted_text
 
-            text += block_text + "\n\n"
 
-    except Exception as e:
-        raise DocumentException.DocumentNotDetected()
+def extract_text_from_regions(image, regions):
+    """Reads only the given horizontal bands of the page.
 
-    return text
+    Params
+    ------
+    image       the deskewed page
+    regions     (start, end) pairs of page height fractions, e.g. (0.0, 0.2) for the top fifth
 
+    Returns
+    -------
+    Text of all regions, top to bottom
+    """
+    height = image.shape[0]
+    texts = []
+    for start, end in regions:
+        band = image[int(height * start):int(height * end)]
+        if band.size:
+            texts.append(extract_text_from_image_locally(band))
 
-def extract_text_from_image_locally(image):
-    # Initialize the OCR reader
-    reader = easyocr.Reader(['hr', 'en'])
+    return "\n".join(texts)
 
-    # OCR on the given image
-    results = reader.readtext(image)
 
-    # Concatenate all the detected text into a single string
-    extracted_text = "\n".join([result[1] for result in results])
+def contains_document_number(text: str) -> bool:
+    return any(re.search(pattern, text) for pattern in DOCUMENT_NUMBER_PATTERNS.values())
 
-    return extracted_text
 
+def load_image(image: bytes | str) -> bytes:
+    # spooled uploads are passed by path, so their bytes are read here and not sent to the worker
+    if isinstance(image, str):
+        with open(image, "rb") as file:
+            return file.read()
+    return image
 
-def detect_document(image: bytes):
-    page_extractor = PageExtractor(
+
+@dataclass
+class DetectedDocument:
+    text: str
+    # page corners in the uploaded image, top-left, top-right, bottom-right, bottom-left
+    corners: list[list[float]]
+    timings: list[StageTiming] = field(default_factory=list)
+    # False when only the classification regions of the page were read
+    complete: bool = True
+
+
+@dataclass
+class ExtractedPage:
+    # JPEG of the deskewed page
+    page: bytes
+    corners: list[list[float]]
+    timings: list[StageTiming] = field(default_factory=list)
+
+
+def create_page_extractor(recorder=None, max_page_side=None) -> PageExtractor:
+    recorder = recorder if recorder is not None else StageRecorder()
+    max_page_side = max_page_side if max_page_side is not None else settings.ocr_page_max_side
+    return PageExtractor(
         preprocessors=[
             Resizer(height=1280, output_process=False),
             FastDenoiser(strength=9, output_process=False),
@@ -179,18 +313,106 @@ def detect_document(image: bytes):
             rho_acc=1,
             theta_acc=180,
             thresh=100,
-            output_process=False
+            output_process=False,
+            recorder=recorder
         ),
+        recorder=recorder,
+        detection_height=1280,
+        max_page_side=max_page_side
     )
 
-    extracted = page_extractor(image)
 
-    if settings.vision_key is not None and settings.vision_endpoint is not None:
-        text = extract_text_from_image_azure(image)
+def detect_document(image: bytes | str, regions=None) -> DetectedDocument:
+    """Finds the page in the image and reads its text.
+
+    With regions, only those bands of the page are read first, and if they already contain
+    a document number the result is returned as incomplete without reading the whole page.
+    """
+    recorder = StageRecorder()
+    page_extractor = create_page_extractor(recorder)
+
+    extracted = page_extractor(load_image(image))
+
+    if regions:
+        text = recorder("RegionOCR", extract_text_from_regions, extracted, regions)
+        if contains_document_number(text):
+            return DetectedDocument(text=text, corners=page_extractor.corners, timings=recorder.timings,
+                                    complete=False)
+
+    text = recorder("OCR", extract_text_from_image_locally, extracted)
+
+    return DetectedDocument(text=text, corners=page_extractor.corners, timings=recorder.timings)
+
+
+def extract_page(image: bytes | str) -> ExtractedPage:
+    """Finds the page in the image and encodes it for a remote OCR service."""
+    recorder = StageRecorder()
+    page_extractor = create_page_extractor(recorder, max_page_side=settings.vision_page_max_side)
+
+    extracted = page_extractor(load_image(image))
+    page = recorder("Encode", encode_page, extracted, settings.vision_page_max_side, settings.vision_page_max_bytes,
+                    settings.vision_jpeg_quality)
+
+    return ExtractedPage(page=page, corners=page_extractor.corners, timings=recorder.timings)
+
+
+def read_page_text(image: bytes, corners=None) -> DetectedDocument:
+    """Reads the whole page of an image whose page corners are already known.
+
+    Without corners the image is taken to be the deskewed page itself.
+    """
+    recorder = StageRecorder()
+
+    if corners is None:
+        extracted = recorder("Decode", cv2.imdecode, np.frombuffer(load_image(image), np.uint8), cv2.IMREAD_COLOR)
+        corners = [[0, 0], [extracted.shape[1] - 1, 0], [extracted.shape[1] - 1, extracted.shape[0] - 1],
+                   [0, extracted.shape[0] - 1]]
     else:
-        text = extract_text_from_image_locally(extracted)
+        page_extractor = create_page_extractor(recorder)
+        extracted = page_extractor(load_image(image), corners=corners)
+        corners = page_extractor.corners
+
+    text = recorder("OCR", extract_text_from_image_locally, extracted)
+
+    return DetectedDocument(text=text, corners=corners, timings=recorder.timings)
+
+
+MASTER_ENCODINGS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+def transcode_page(image: bytes | str, corners, image_format: str, max_side: int, quality: int,
+                   grayscale: bool = False) -> bytes:
+    """Encodes the deskewed page at the given corners as the master kept in place of the upload."""
+    page = create_page_extractor(max_page_side=max_side)(load_image(image), corners=corners)
+    if grayscale:
+        page = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+
+    extension, quality_flag = MASTER_ENCODINGS[image_format]
+    _, encoded = cv2.imencode(extension, page, [quality_flag, quality])
+    return encoded.tobytes()
+
+
+def create_preview(image: bytes, max_side: int, quality: int) -> bytes:
+    """Encodes a JPEG of the image shrunk to max_side pixels on its longest side.
+
+    The image is decoded at the smallest JPEG scale that still is at least that large.
+    """
+    size = read_image_size(image)
+    factor = next(factor for factor in REDUCED_DECODE_FLAGS
+                  if factor == 1 or (size is not None and max(size) // factor >= max_side))
+    preview = cv2.imdecode(np.frombuffer(image, np.uint8), REDUCED_DECODE_FLAGS[factor])
+    if preview is None:
+        raise DocumentException.ImageNotDecodable()
+
+    scale = max_side / max(preview.shape[:2])
+    if scale < 1:
+        preview = cv2.resize(preview, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-    return text
+    _, encoded = cv2.imencode(".jpg", preview, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes()
 
 
 if __name__ == "__main__":
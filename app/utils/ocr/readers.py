@@ -0,0 +1,50 @@
+import threading
+
+import cv2
+import numpy as np
+from easyocr import easyocr
+
+
+class ReaderRegistry:
+    """Keeps one easyocr reader per language set for the lifetime of the process.
+
+    Creating a reader loads the detector and recognizer weights from disk and builds
+    the torch graphs, which takes seconds, so every reader is created once and shared.
+    A language set is reported as ready once its reader has finished a recognition pass.
+    """
+
+    def __init__(self):
+        self._readers = {}
+        self._ready = set()
+        self._lock = threading.Lock()
+
+    def get(self, languages) -> easyocr.Reader:
+        key = tuple(languages)
+        reader = self._readers.get(key)
+        if reader is None:
+            with self._lock:
+                reader = self._readers.get(key)
+                if reader is None:
+                    reader = easyocr.Reader(list(key))
+                    self._readers[key] = reader
+        return reader
+
+    def readtext(self, image, languages, **kwargs):
+        results = self.get(languages).readtext(image, **kwargs)
+        self._ready.add(tuple(languages))
+        return results
+
+    def warm_up(self, languages):
+        self.readtext(_warm_up_image(), languages)
+
+    def is_ready(self, languages) -> bool:
+        return tuple(languages) in self._ready
+
+
+def _warm_up_image():
+    image = np.full((64, 320, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "R123456", (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    return image
+
+
+readers = ReaderRegistry()
@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import Query
+
+from app.config.base import settings
+from app.utils.enums import SortOrderEnum
+from app.utils.exceptions.app_exceptions import AppException
+
+
+@dataclass
+class PageParams:
+    # next_cursor of the previous page, None for the first one
+    cursor: str | None = None
+    limit: int = settings.page_default_limit
+    order: SortOrderEnum = SortOrderEnum.DESC
+    # inclusive bounds on the date of the listed rows, rows without a date (pending audits, signatures
+    # and archives) are left out when either bound is set
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+
+
+def page_params(cursor: str | None = None,
+                limit: int = Query(settings.page_default_limit, ge=1, le=settings.page_max_limit),
+                order: SortOrderEnum = SortOrderEnum.DESC,
+                date_from: datetime | None = None,
+                date_to: datetime | None = None) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit, order=order, date_from=date_from, date_to=date_to)
+
+
+def undated_page_params(cursor: str | None = None,
+                        limit: int = Query(settings.page_default_limit, ge=1, le=settings.page_max_limit),
+                        order: SortOrderEnum = SortOrderEnum.DESC) -> PageParams:
+    """The page parameters of lists whose rows have no date to filter on."""
+    return PageParams(cursor=cursor, limit=limit, order=order)
+
+
+def encode_cursor(values: list) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: list[type]) -> list:
+    """Returns the key values of a cursor, converted to the python types of the key columns."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+                for value, value_type in zip(values, types)]
+    except (ValueError, TypeError, binascii.Error):
+        raise AppException.InvalidCursor({"cursor": cursor})
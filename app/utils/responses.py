@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Callable, AsyncIterable
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+IMAGE_CACHE_CONTROL = "private, max-age=86400"
+
+
+@dataclass
+class StoredImage:
+    content_type: str
+    size: int
+    content_hash: str
+    # yields the bytes in [offset, offset + length) in chunks, up to the end without length
+    read_range: Callable[[int, int | None], AsyncIterable[bytes]]
+    # set when the image is a file on the local disk, which is then sent as a file response
+    local_path: str | None = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash}"'
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Returns (start, end) of a single "bytes=" range, end inclusive and clamped to the size.
+
+    Returns None for malformed ranges and for several ranges at once, which are answered with
+    the whole image, and raises ValueError for ranges that can not be satisfied.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+
+    start, separator, end = (part.strip() for part in ranges.partition("-"))
+    if not separator or not (start or end) or not all(part.isdigit() for part in (start, end) if part):
+        return None
+
+    if not start:
+        # suffix range, the last `end` bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def image_response(request: Request, image: StoredImage) -> Response:
+    """Answers a GET of a stored image, honouring If-None-Match, Range and If-Range."""
+    headers = {"ETag": image.etag, "Cache-Control": IMAGE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == image.etag):
+        try:
+            byte_range = parse_range(range_header, image.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{image.size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{image.size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(image.read_range(start, end - start + 1), status_code=206,
+                                     media_type=image.content_type, headers=headers)
+
+    if image.local_path:
+        return FileResponse(image.local_path, media_type=image.content_type, headers=headers)
+
+    headers["Content-Length"] = str(image.size)
+    return StreamingResponse(image.read_range(0, None), media_type=image.content_type, headers=headers)
@@ -1,11 +1,13 @@
-from app.config.database import  engine, SessionLocal
-from app.config.database import Base
+from app.config.database import engine, SessionLocal
+from app.migrations.runner import migrate
+from app.migrations.versions import MIGRATIONS
 from app.models.users import RoleDB
+from app.utils.background import run_in_background
 from app.utils.enums import RolesEnum
 
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+def migrate_database():
+    migrate(engine, MIGRATIONS)
 
 
 def add_roles(db=SessionLocal()):
@@ -17,3 +19,23 @@ def add_roles(db=SessionLocal()):
             db.add(new_role)
 
     db.commit()
+
+
+def resume_document_jobs():
+    # jobs that were queued, or running in a process that stopped, are picked up again. Every worker
+    # process does this, run_job lets only one of them run each job
+    from app.services.documents import DocumentJobService, DocumentService, run_document_job, \
+        complete_document_summary
+
+    db = SessionLocal()
+    try:
+        job_ids = [job.id for job in DocumentJobService(db).get_unfinished_jobs()]
+        # so are the summaries whose full page read failed or was cut short, which every process reads again
+        partial_summaries = DocumentService(db).get_partial_summaries()
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        run_in_background(run_document_job(job_id))
+    for document_id, partial in partial_summaries:
+        run_in_background(complete_document_summary(document_id, partial))
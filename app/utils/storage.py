@@ -0,0 +1,373 @@
+import os
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator
+
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+
+from app.config.base import settings
+from app.config.database import IMAGE_STORAGE_CONNECTION_STRING
+from app.utils.blob_storage import blob_storage, stream_blob_range, BlobStorage
+from app.utils.metrics import ByteCacheMetrics, image_cache_metrics
+
+
+class StorageBackend(ABC):
+    """Where image bytes are kept, addressed by key.
+
+    All operations are async and never block the event loop. Missing keys raise
+    FileNotFoundError, whatever the backend.
+    """
+
+    chunk_size = 64 * 1024
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes):
+        """Stores data under key, replacing what was there."""
+
+    async def put_file(self, key: str, path: str, size: int):
+        """Stores the file at path under key. The file may be moved, so it must not be used afterwards."""
+        data = await run_in_threadpool(_read_file, path)
+        await self.put(key, data)
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def stream(self, key: str, offset: int = 0, length: int | None = None) -> AsyncIterator[bytes]:
+        """Yields the bytes in [offset, offset + length) in chunks, up to the end without length."""
+
+    @abstractmethod
+    async def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Removes the key, missing keys are ignored."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    def local_path(self, key: str) -> str | None:
+        """Path of the key on the local disk, if the backend keeps it there."""
+        return None
+
+    def object_key(self, name: str) -> str:
+        """The key a new object named name is stored under."""
+        return name
+
+    def spool_directory(self) -> str:
+        """Where uploads are written before they are stored."""
+        return tempfile.gettempdir()
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def read_file_range(path: str, offset: int, length: int | None, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as file:
+        file.seek(offset)
+        while length is None or length > 0:
+            chunk = file.read(chunk_size if length is None else min(chunk_size, length))
+            if not chunk:
+                break
+            if length is not None:
+                length -= len(chunk)
+            yield chunk
+
+
+class MemoryStorage(StorageBackend):
+    """Keeps everything in a dict, for tests and development."""
+
+    def __init__(self):
+        self.objects = {}
+
+    async def put(self, key: str, data: bytes):
+        self.objects[key] = bytes(data)
+
+    async def get(self, key: str) -> bytes:
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise FileNotFoundError(key)
+
+    async def stream(self, key: str, offset: int = 0, length: int | None = None) -> AsyncIterator[bytes]:
+        data = await self.get(key)
+        end = len(data) if length is None else min(offset + length, len(data))
+        for start in range(offset, end, self.chunk_size):
+            yield data[start:min(start + self.chunk_size, end)]
+
+    async def size(self, key: str) -> int:
+        return len(await self.get(key))
+
+    async def delete(self, key: str):
+        self.objects.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.objects
+
+
+class LocalDiskStorage(StorageBackend):
+    """Keeps every key as a file under root, all file operations run on the thread pool.
+
+    Images on disk have always been stored under keys that start with the root, e.g.
+    images/ab/cd/..., which are paths relative to the working directory. New objects get
+    such keys as well, and keys starting with the root are read from that path.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        if self.root and (key == self.root or key.startswith(os.path.join(self.root, ""))):
+            return key
+        return os.path.join(self.root, key)
+
+    def object_key(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def spool_directory(self) -> str:
+        # uploads are spooled next to the stored images, so storing one is a rename on the same disk
+        return self.root or "."
+
+    async def put(self, key: str, data: bytes):
+        await run_in_threadpool(self._write, self._path(key), data)
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # readers never see a half written file
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        with open(partial, "wb") as file:
+            file.write(data)
+        os.replace(partial, path)
+
+    async def put_file(self, key: str, path: str, size: int):
+        await run_in_threadpool(self._move, path, self._path(key))
+
+    @staticmethod
+    def _move(source: str, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        os.replace(source, path)
+
+    async def get(self, key: str) -> bytes:
+        return await run_in_threadpool(_read_file, self._path(key))
+
+    async def stream(self, key: str, offset: int = 0, length: int | None = None) -> AsyncIterator[bytes]:
+        path = self._path(key)
+        if not await run_in_threadpool(os.path.exists, path):
+            raise FileNotFoundError(key)
+        async for chunk in iterate_in_threadpool(read_file_range(path, offset, length, self.chunk_size)):
+            yield chunk
+
+    async def size(self, key: str) -> int:
+        return await run_in_threadpool(os.path.getsize, self._path(key))
+
+    async def delete(self, key: str):
+        try:
+            await run_in_threadpool(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.exists, self._path(key))
+
+    def local_path(self, key: str) -> str | None:
+        return self._path(key)
+
+
+class BlobStorageBackend(StorageBackend):
+    """Keeps every key as a blob, the blocking SDK calls run on the thread pool."""
+
+    def __init__(self, storage: BlobStorage, chunk_size: int, max_concurrency: int = 1):
+        self.storage = storage
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+
+    def _blob(self, key: str):
+        return self.storage.container_client.get_blob_client(key)
+
+    @staticmethod
+    async def _call(key: str, fn):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return await run_in_threadpool(fn)
+        except ResourceNotFoundError:
+            raise FileNotFoundError(key)
+
+    async def put(self, key: str, data: bytes):
+        await self._call(key, lambda: self._blob(key).upload_blob(data, overwrite=True))
+
+    async def put_file(self, key: str, path: str, size: int):
+        def upload():
+            with open(path, "rb") as file:
+                self._blob(key).upload_blob(file, length=size, overwrite=True, max_concurrency=self.max_concurrency)
+            os.remove(path)
+
+        await self._call(key, upload)
+
+    async def get(self, key: str) -> bytes:
+        return await self._call(key, lambda: self._blob(key).download_blob(
+            max_concurrency=self.max_concurrency).readall())
+
+    async def stream(self, key: str, offset: int = 0, length: int | None = None) -> AsyncIterator[bytes]:
+        if length is None:
+            length = await self.size(key) - offset
+        chunks = stream_blob_range(self._blob(key), offset, length, self.chunk_size, self.max_concurrency)
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+
+    async def size(self, key: str) -> int:
+        properties = await self._call(key, lambda: self._blob(key).get_blob_properties())
+        return properties.size
+
+    async def delete(self, key: str):
+        try:
+            await self._call(key, lambda: self._blob(key).delete_blob())
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, key: str) -> bool:
+        return await self._call(key, lambda: self._blob(key).exists())
+
+
+class CachedStorage(StorageBackend):
+    """Read-through cache of another backend, keeping the bytes of recently used keys in memory.
+
+    The cache holds at most max_bytes and evicts the least recently used keys first. Keys
+    larger than max_entry_bytes are never cached. Writes go to the backend and warm the
+    cache, deletes invalidate it.
+    """
+
+    def __init__(self, storage: StorageBackend, max_bytes: int, max_entry_bytes: int,
+                 metrics: ByteCacheMetrics | None = None):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.metrics = metrics if metrics is not None else ByteCacheMetrics()
+        self.cached_bytes = 0
+        self._entries = OrderedDict()
+        # bumped by every write and delete, a read that saw one while it was fetching is not cached
+        self._invalidations = 0
+
+    def _lookup(self, key: str) -> bytes | None:
+        data = self._entries.get(key)
+        if data is None:
+            self.metrics.miss()
+            return None
+        self._entries.move_to_end(key)
+        self.metrics.hit(len(data))
+        return data
+
+    def _add(self, key: str, data: bytes):
+        self._discard(key)
+        if len(data) > self.max_entry_bytes:
+            return
+
+        self._entries[key] = data
+        self.cached_bytes += len(data)
+        while self.cached_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.cached_bytes -= len(evicted)
+            self.metrics.evicted()
+
+    def _discard(self, key: str):
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self.cached_bytes -= len(data)
+
+    async def _fetch(self, key: str) -> bytes:
+        invalidations = self._invalidations
+        data = await self.storage.get(key)
+        if invalidations == self._invalidations:
+            self._add(key, data)
+        return data
+
+    async def put(self, key: str, data: bytes):
+        self._invalidations += 1
+        await self.storage.put(key, data)
+        self._add(key, bytes(data))
+
+    async def put_file(self, key: str, path: str, size: int):
+        # read before the backend takes the file
+        data = await run_in_threadpool(_read_file, path) if size <= self.max_entry_bytes else None
+        self._invalidations += 1
+        await self.storage.put_file(key, path, size)
+        if data is not None:
+            self._add(key, data)
+        else:
+            self._discard(key)
+
+    async def get(self, key: str) -> bytes:
+        data = self._lookup(key)
+        if data is None:
+            data = await self._fetch(key)
+        return data
+
+    async def stream(self, key: str, offset: int = 0, length: int | None = None) -> AsyncIterator[bytes]:
+        data = self._lookup(key)
+        if data is not None:
+            end = len(data) if length is None else min(offset + length, len(data))
+            for start in range(offset, end, self.chunk_size):
+                yield data[start:min(start + self.chunk_size, end)]
+            return
+
+        if offset or length is not None:
+            # ranged reads that miss go straight to the backend
+            async for chunk in self.storage.stream(key, offset, length):
+                yield chunk
+            return
+
+        # whole reads are sent as they arrive and cached once they are complete
+        invalidations = self._invalidations
+        chunks, size = [], 0
+        async for chunk in self.storage.stream(key):
+            if chunks is not None:
+                size += len(chunk)
+                if size <= self.max_entry_bytes:
+                    chunks.append(chunk)
+                else:
+                    chunks = None
+            yield chunk
+
+        if chunks is not None and invalidations == self._invalidations:
+            self._add(key, b"".join(chunks))
+
+    async def size(self, key: str) -> int:
+        data = self._entries.get(key)
+        return len(data) if data is not None else await self.storage.size(key)
+
+    async def delete(self, key: str):
+        self._invalidations += 1
+        self._discard(key)
+        await self.storage.delete(key)
+
+    async def exists(self, key: str) -> bool:
+        return key in self._entries or await self.storage.exists(key)
+
+    def local_path(self, key: str) -> str | None:
+        return self.storage.local_path(key)
+
+    def object_key(self, name: str) -> str:
+        return self.storage.object_key(name)
+
+    def spool_directory(self) -> str:
+        return self.storage.spool_directory()
+
+
+def create_image_storage() -> StorageBackend:
+    if "None" not in IMAGE_STORAGE_CONNECTION_STRING:
+        storage = BlobStorageBackend(blob_storage, settings.blob_chunk_size, settings.blob_max_concurrency)
+        if settings.image_cache_max_bytes:
+            storage = CachedStorage(storage, settings.image_cache_max_bytes, settings.image_cache_max_entry_bytes,
+                                    image_cache_metrics)
+        return storage
+    return LocalDiskStorage(settings.image_path)
+
+
+image_storage = create_image_storage()
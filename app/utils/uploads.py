@@ -0,0 +1,144 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+
+from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from app.utils.exceptions.app_exceptions import app_exception_handler
+from app.utils.exceptions.document_exceptions import DocumentException
+
+# magic bytes of the image formats OpenCV can decode, checked against the start of the upload
+IMAGE_SIGNATURES = {
+    "jpeg": [b"\xff\xd8\xff"],
+    "png": [b"\x89PNG\r\n\x1a\n"],
+    "bmp": [b"BM"],
+    "tiff": [b"II*\x00", b"MM\x00*"],
+}
+
+IMAGE_EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "bmp": "bmp", "tiff": "tif"}
+
+# longest prefix sniff_image_format needs to look at
+SNIFF_BYTES = 12
+
+# room for the multipart boundaries and part headers around an image of the largest allowed size
+MULTIPART_OVERHEAD = 64 * 2 ** 10
+
+
+def sniff_image_format(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if any(head.startswith(signature) for signature in signatures):
+            return image_format
+    return None
+
+
+@dataclass
+class SpooledUpload:
+    # file the upload was written to, it is moved or uploaded to its final place by ImageCRUD
+    path: str
+    content_hash: str
+    size: int
+    image_format: str
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as file:
+            return file.read()
+
+    def discard(self):
+        """Removes the spooled file unless it was already moved to its final place."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(upload: UploadFile, directory: str, max_bytes: int, chunk_size: int) -> SpooledUpload:
+    """Writes the upload to a file in directory chunk by chunk.
+
+    The upload is hashed while it is read, and it is rejected as soon as its first bytes are
+    not a known image format or it grows past max_bytes, without reading the rest of it.
+    By then the request body was already received, RequestSizeLimitMiddleware bounds that.
+    """
+    path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+    content_hash = hashlib.sha256()
+    head = b""
+    image_format = None
+    size = 0
+
+    await upload.seek(0)
+    file = open(path, "wb")
+    try:
+        while chunk := await upload.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise DocumentException.ImageTooLarge({"detail": f"Image is larger than {max_bytes} bytes"})
+
+            if image_format is None:
+                head += chunk[:SNIFF_BYTES]
+                if len(head) >= SNIFF_BYTES:
+                    image_format = sniff_image_format(head)
+                    if image_format is None:
+                        raise DocumentException.UnsupportedImageFormat()
+
+            content_hash.update(chunk)
+            await run_in_threadpool(file.write, chunk)
+
+        if image_format is None:
+            image_format = sniff_image_format(head)
+            if image_format is None:
+                raise DocumentException.UnsupportedImageFormat()
+    except BaseException:
+        file.close()
+        os.remove(path)
+        raise
+
+    file.close()
+    return SpooledUpload(path=path, content_hash=content_hash.hexdigest(), size=size, image_format=image_format)
+
+
+class _BodyTooLarge(DocumentException.ImageTooLarge, HTTPException):
+    """ImageTooLarge raised while FastAPI reads the request body, which only lets HTTPExceptions through."""
+
+    def __init__(self, context: dict):
+        DocumentException.ImageTooLarge.__init__(self, context)
+        self.exception_case = "ImageTooLarge"
+
+
+class RequestSizeLimitMiddleware:
+    """Rejects request bodies larger than max_bytes before they are parsed.
+
+    A Content-Length above the limit is answered with ImageTooLarge without reading the body, and
+    bodies without one (chunked uploads) are cut off as soon as they grow past the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        context = {"detail": f"Request body is larger than {self.max_bytes} bytes"}
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = await app_exception_handler(None, DocumentException.ImageTooLarge(context))
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge(context)
+            return message
+
+        await self.app(scope, limited_receive, send)
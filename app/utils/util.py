@@ -1,4 +1,4 @@
-from app.utils.enums import DocumentStatusEnum
+from app.utils.enums import DocumentStatusEnum, DocumentTypeEnum
 
 COMPATIBLE_STATUSES = {
     DocumentStatusEnum.SCANNED: [DocumentStatusEnum.APPROVED, DocumentStatusEnum.REFUSED, DocumentStatusEnum.AUDITED],
@@ -8,4 +8,11 @@ COMPATIBLE_STATUSES = {
     DocumentStatusEnum.SIGNED: [DocumentStatusEnum.SIGNED_AND_ARCHIVED],
     DocumentStatusEnum.SIGNED_AND_ARCHIVED: [],
     DocumentStatusEnum.ARCHIVED: [],
-}
\ No newline at end of file
+}
+
+# checked in this order, the first match decides the document type
+DOCUMENT_NUMBER_PATTERNS = {
+    DocumentTypeEnum.RECEIPT: r"\bR\d{6}\b",
+    DocumentTypeEnum.OFFER: r"\bP\d{9}\b",
+    DocumentTypeEnum.INTERNAL: r"\bINT\d{4}\b",
+}
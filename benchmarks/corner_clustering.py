@@ -0,0 +1,93 @@
+"""Compares the four-corner clusterer of HoughLineCornerDetector with scikit-learn KMeans.
+
+Synthetic intersection clouds are generated around the corners of randomly skewed pages,
+with pixel noise and uniformly scattered outliers, and both methods are scored on how far
+the found centers are from the true corners and how long they take.
+
+Usage: python -m benchmarks.corner_clustering [--samples 200] [--output results.json]
+KMeans is only measured when scikit-learn is installed (pip install scikit-learn).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.utils.ocr.hough_line_corner_detector import cluster_corners
+
+HEIGHT, WIDTH = 1280, 960
+
+
+def make_sample(rng, points_per_corner=60, outliers=40, noise=4.0):
+    margin = rng.uniform(0.05, 0.25, size=(4, 2)) * [WIDTH, HEIGHT] / 2
+    corners = np.array([
+        [margin[0, 0], margin[0, 1]],
+        [WIDTH - margin[1, 0], margin[1, 1]],
+        [WIDTH - margin[2, 0], HEIGHT - margin[2, 1]],
+        [margin[3, 0], HEIGHT - margin[3, 1]],
+    ])
+    clouds = [corner + rng.normal(0, noise, size=(points_per_corner, 2)) for corner in corners]
+    scattered = rng.uniform([0, 0], [WIDTH, HEIGHT], size=(outliers, 2))
+    points = np.round(np.concatenate(clouds + [scattered])).astype(int)
+    return points, corners
+
+
+def corner_error(centers, corners):
+    distances = np.linalg.norm(corners[:, np.newaxis, :] - np.asarray(centers)[np.newaxis, :, :], axis=2)
+    return float(distances.min(axis=1).mean())
+
+
+def kmeans_centers(points):
+    from sklearn.cluster import KMeans
+
+    return KMeans(n_clusters=4, init='k-means++', max_iter=100, n_init=10, random_state=0).fit(points).cluster_centers_
+
+
+def measure(method, samples):
+    errors, timings, undetected = [], [], 0
+    for points, corners in samples:
+        start = time.perf_counter()
+        centers = method(points)
+        timings.append(time.perf_counter() - start)
+        if centers is None:
+            undetected += 1
+        else:
+            errors.append(corner_error(centers, corners))
+
+    return {
+        "mean_error_px": float(np.mean(errors)),
+        "p95_error_px": float(np.percentile(errors, 95)),
+        "mean_ms": float(np.mean(timings) * 1000),
+        "p95_ms": float(np.percentile(timings, 95) * 1000),
+        "undetected": undetected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark four-corner clustering against KMeans.")
+    parser.add_argument('--samples', type=int, default=200, dest='samples')
+    parser.add_argument('--seed', type=int, default=0, dest='seed')
+    parser.add_argument('--output', help="Write the results to this JSON file", dest='output')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    samples = [make_sample(rng) for _ in range(args.samples)]
+
+    results = {"samples": args.samples, "seed": args.seed,
+               "cluster_corners": measure(lambda points: cluster_corners(points, (HEIGHT, WIDTH)), samples)}
+
+    try:
+        results["kmeans"] = measure(kmeans_centers, samples)
+        results["speedup"] = results["kmeans"]["mean_ms"] / results["cluster_corners"]["mean_ms"]
+    except ImportError:
+        results["kmeans"] = None
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
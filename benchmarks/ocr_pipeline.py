@@ -0,0 +1,199 @@
+"""Latency, throughput and memory benchmark of the OCR pipeline on synthetic scans.
+
+Every processor is timed in isolation on the input it gets inside the pipeline, followed by
+the whole PageExtractor and, with --with-ocr, detect_document including easyocr. Each case
+runs once untimed as a warm-up, then ``--repeats`` scans per resolution are timed, and a
+separate pass under tracemalloc records the peak of Python and numpy allocations (OpenCV
+buffers that never reach numpy are not included). Scans are generated from ``--seed``,
+so two runs on different commits see the same images and their JSON reports can be compared
+with --compare.
+
+Usage: python -m benchmarks.ocr_pipeline [--resolutions 0.5 2 5 12] [--repeats 5] [--with-ocr]
+                                         [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.utils.ocr.ocr import create_page_extractor, detect_document, read_image_size, reduction_factor, \
+    REDUCED_DECODE_FLAGS
+from app.utils.ocr.processors import Resizer, FastDenoiser, OtsuThresholder, Closer, EdgeDetector
+from benchmarks.synthetic import make_scan
+
+
+def summarize(latencies, peak_bytes) -> dict:
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "runs": len(latencies),
+        "throughput_per_s": float(len(latencies) / latencies_ms.sum() * 1000),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "peak_memory_mb": peak_bytes / 2 ** 20,
+    }
+
+
+def measure(fn, inputs) -> dict:
+    fn(inputs[0])
+
+    latencies = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        latencies.append(time.perf_counter() - start)
+
+    # memory is traced in a separate pass so tracing overhead does not skew the latencies
+    peak = 0
+    tracemalloc.start()
+    for value in inputs:
+        tracemalloc.reset_peak()
+        fn(value)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return summarize(latencies, peak)
+
+
+def decode(data):
+    """Decodes the scan the way PageExtractor does for corner detection."""
+    factor = reduction_factor(read_image_size(data), 1280)
+    return cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_DECODE_FLAGS[factor])
+
+
+def pipeline_inputs(scans):
+    """Returns the input every processor gets inside the pipeline, for each scan."""
+    stages = {"Decode": [], "Resizer": [], "FastDenoiser": [], "OtsuThresholder": [], "Closer": [],
+              "EdgeDetector": []}
+    for data, _, _ in scans:
+        stages["Decode"].append(data)
+        image = decode(data)
+        stages["Resizer"].append(image)
+        image = Resizer(height=1280)(image)
+        stages["FastDenoiser"].append(image)
+        image = FastDenoiser(strength=9)(image)
+        stages["OtsuThresholder"].append(image)
+        image = OtsuThresholder()(image)
+        stages["Closer"].append(image)
+        stages["EdgeDetector"].append(Closer()(image))
+    return stages
+
+
+def extraction_accuracy(scans) -> dict:
+    detected, errors = 0, []
+    for data, corners, _ in scans:
+        page_extractor = create_page_extractor()
+        try:
+            page_extractor(data)
+        except Exception:
+            continue
+        detected += 1
+        errors.append(float(np.linalg.norm(np.array(page_extractor.corners) - corners, axis=1).mean()))
+
+    return {"detected_ratio": detected / len(scans), "mean_corner_error_px": float(np.mean(errors)) if errors else None}
+
+
+def run(resolutions, repeats, seed, with_ocr) -> dict:
+    processors = {
+        "Decode": decode,
+        "Resizer": Resizer(height=1280),
+        "FastDenoiser": FastDenoiser(strength=9),
+        "OtsuThresholder": OtsuThresholder(),
+        "Closer": Closer(),
+        "EdgeDetector": EdgeDetector(),
+    }
+    results = {}
+
+    for megapixels in resolutions:
+        rng = np.random.default_rng([seed, int(megapixels * 1000)])
+        scans = [make_scan(megapixels, rng) for _ in range(repeats)]
+        inputs = pipeline_inputs(scans)
+        resolution = {name: measure(processor, inputs[name]) for name, processor in processors.items()}
+
+        def extract(data):
+            try:
+                create_page_extractor()(data)
+            except Exception:
+                pass
+
+        resolution["PageExtractor"] = measure(extract, [data for data, _, _ in scans])
+        resolution["PageExtractor"].update(extraction_accuracy(scans))
+
+        if with_ocr:
+            def detect(data):
+                try:
+                    detect_document(data)
+                except Exception:
+                    pass
+
+            resolution["detect_document"] = measure(detect, [data for data, _, _ in scans])
+
+        results[f"{megapixels}MP"] = resolution
+
+    return results
+
+
+def compare(results, baseline, threshold) -> list[dict]:
+    regressions = []
+    for resolution, cases in results.items():
+        for case, result in cases.items():
+            previous = baseline.get("results", {}).get(resolution, {}).get(case)
+            if not previous:
+                continue
+            ratio = result["p50_ms"] / previous["p50_ms"]
+            if ratio > 1 + threshold:
+                regressions.append({"resolution": resolution, "case": case, "p50_ratio": ratio})
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OCR pipeline on synthetic scans.")
+    parser.add_argument('--resolutions', type=float, nargs='+', default=[0.5, 2, 5, 12], dest='resolutions',
+                        help="Scan sizes in megapixels")
+    parser.add_argument('--repeats', type=int, default=5, dest='repeats', help="Scans per resolution")
+    parser.add_argument('--seed', type=int, default=0, dest='seed')
+    parser.add_argument('--with-ocr', action='store_true', dest='with_ocr',
+                        help="Also run detect_document, which needs the easyocr models")
+    parser.add_argument('--output', help="Write the report to this JSON file", dest='output')
+    parser.add_argument('--compare', help="Report from an earlier run to compare against", dest='compare')
+    parser.add_argument('--threshold', type=float, default=0.1, dest='threshold',
+                        help="Relative p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "cv2_threads": cv2.getNumThreads(),
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "results": run(args.resolutions, args.repeats, args.seed, args.with_ocr),
+    }
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            report["regressions"] = compare(report["results"], json.load(baseline), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Query plans and latency of the workflow queue queries with and without their indexes.
+
+A database is seeded with ``--documents`` documents owned by ``--users`` users, and about a
+third as many audits, archives and signatures each. Every queue query of the audit, archive,
+signature and document CRUDs is then explained and timed (median of ``--repeats`` runs)
+without the workflow indexes, the indexes are built the way migration 3 builds them, and the
+queries are explained and timed again. Without --database-url a temporary SQLite file is used;
+a PostgreSQL URL shows the plans of the production backend.
+
+Usage: python -m benchmarks.query_plans [--documents 1000000] [--users 50] [--repeats 5]
+                                        [--database-url postgresql://...] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text, select, func
+
+from app.config.database import Base
+from app.migrations.versions import WORKFLOW_INDEXES, add_workflow_indexes
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.documents import DocumentDB
+from app.models.signatures import SignatureDB
+from app.models.users import UserDB
+from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, ActionStatus, ArchiveStatus
+
+BATCH_SIZE = 50_000
+
+
+def seed(connection, documents, users, rng):
+    connection.execute(UserDB.__table__.insert(), [
+        {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com", "password": ""}
+        for user_id in range(1, users + 1)
+    ])
+
+    types, statuses = list(DocumentTypeEnum), list(DocumentStatusEnum)
+    scan_time = datetime.now()
+    for start in range(1, documents + 1, BATCH_SIZE):
+        ids = range(start, min(start + BATCH_SIZE, documents + 1))
+        connection.execute(DocumentDB.__table__.insert(), [
+            {"id": document_id, "owner_id": rng.randint(1, users), "document_type": rng.choice(types).value,
+             "document_status": rng.choice(statuses).value, "summary": "", "scan_time": scan_time}
+            for document_id in ids
+        ])
+        connection.execute(AuditDB.__table__.insert(), [
+            {"document_id": document_id, "audited_by": rng.randint(1, users),
+             "status": rng.choice(list(ActionStatus)).value}
+            for document_id in ids if document_id % 3 == 0
+        ])
+        connection.execute(ArchiveDB.__table__.insert(), [
+            {"document_id": document_id, "archive_by": rng.randint(1, users),
+             "status": rng.choice(list(ArchiveStatus)).value}
+            for document_id in ids if document_id % 3 == 1
+        ])
+        connection.execute(SignatureDB.__table__.insert(), [
+            {"document_id": document_id, "sign_by": rng.randint(1, users),
+             "status": rng.choice(list(ActionStatus)).value}
+            for document_id in ids if document_id % 3 == 2
+        ])
+        connection.commit()
+
+
+def queries(documents) -> dict:
+    document_id = documents // 2
+    return {
+        "audits_by_user_and_status": select(AuditDB).where(
+            AuditDB.audited_by == 7, AuditDB.status == ActionStatus.PENDING.value),
+        "audit_by_document": select(AuditDB).where(AuditDB.document_id == document_id),
+        "archives_by_user_and_status": select(ArchiveDB).where(
+            ArchiveDB.archive_by == 7, ArchiveDB.status == ArchiveStatus.PENDING.value),
+        "archive_by_document": select(ArchiveDB).where(ArchiveDB.document_id == document_id),
+        "signatures_by_user_and_status": select(SignatureDB).where(
+            SignatureDB.sign_by == 7, SignatureDB.status == ActionStatus.PENDING.value),
+        "signatures_by_document": select(SignatureDB).where(SignatureDB.document_id == document_id),
+        "documents_by_owner": select(func.count()).select_from(DocumentDB).where(DocumentDB.owner_id == 7),
+        "documents_by_type_and_status": select(DocumentDB).where(
+            DocumentDB.document_type == DocumentTypeEnum.RECEIPT.value,
+            DocumentDB.document_status == DocumentStatusEnum.SIGNED.value),
+        "documents_by_status": select(DocumentDB).where(
+            DocumentDB.document_status == DocumentStatusEnum.APPROVED.value),
+    }
+
+
+def explain(connection, statement) -> list[str]:
+    sql = str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "sqlite":
+        return [row.detail for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+
+
+def measure(connection, statements, repeats) -> dict:
+    results = {}
+    for name, statement in statements.items():
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            connection.execute(statement).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = {"median_ms": statistics.median(latencies), "plan": explain(connection, statement)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workflow queue queries with and without indexes.")
+    parser.add_argument('--documents', type=int, default=1_000_000, dest='documents')
+    parser.add_argument('--users', type=int, default=50, dest='users')
+    parser.add_argument('--repeats', type=int, default=5, dest='repeats')
+    parser.add_argument('--seed', type=int, default=0, dest='seed')
+    parser.add_argument('--database-url', dest='database_url', help="An empty database, SQLite by default")
+    parser.add_argument('--output', help="Write the report to this JSON file", dest='output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(args.database_url or f"sqlite:///{os.path.join(directory, 'benchmark.db')}")
+        Base.metadata.create_all(engine)
+
+        with engine.connect() as connection:
+            for table, names in WORKFLOW_INDEXES.items():
+                for name in names:
+                    connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            connection.commit()
+
+            start = time.perf_counter()
+            seed(connection, args.documents, args.users, random.Random(args.seed))
+            seed_seconds = time.perf_counter() - start
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+
+            statements = queries(args.documents)
+            before = measure(connection, statements, args.repeats)
+
+            start = time.perf_counter()
+            add_workflow_indexes(connection)
+            index_seconds = time.perf_counter() - start
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+
+            after = measure(connection, statements, args.repeats)
+
+        engine.dispose()
+
+    report = {
+        "backend": engine.dialect.name,
+        "documents": args.documents,
+        "users": args.users,
+        "seed_seconds": seed_seconds,
+        "index_build_seconds": index_seconds,
+        "queries": {
+            name: {
+                "before": before[name],
+                "after": after[name],
+                "speedup": before[name]["median_ms"] / max(after[name]["median_ms"], 1e-6),
+            }
+            for name in statements
+        },
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
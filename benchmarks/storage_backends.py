@@ -0,0 +1,96 @@
+"""Throughput of the image storage backends under the same workload.
+
+Every backend gets ``--objects`` random images of ``--size`` bytes, written, read whole,
+streamed, checked and deleted with ``--concurrency`` operations in flight, and each phase is
+reported in operations and megabytes per second. The blob backend only runs with
+--blob-connection-string, e.g. the one of a local Azurite emulator.
+
+Usage: python -m benchmarks.storage_backends [--objects 200] [--size 2000000] [--concurrency 16]
+                                             [--blob-connection-string ...] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from app.utils.blob_storage import BlobStorage
+from app.utils.storage import MemoryStorage, LocalDiskStorage, BlobStorageBackend
+
+
+async def run_phase(operation, keys, concurrency) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(key):
+        async with semaphore:
+            await operation(key)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(key) for key in keys))
+    return time.perf_counter() - start
+
+
+async def benchmark(storage, objects, size, concurrency) -> dict:
+    keys = [f"{i % 256:02x}/{i:08d}.jpg" for i in range(objects)]
+    data = os.urandom(size)
+
+    async def stream(key):
+        async for _ in storage.stream(key):
+            pass
+
+    phases = {
+        "put": lambda key: storage.put(key, data),
+        "get": storage.get,
+        "stream": stream,
+        "exists": storage.exists,
+        "delete": storage.delete,
+    }
+
+    results = {}
+    for name, operation in phases.items():
+        seconds = await run_phase(operation, keys, concurrency)
+        moved = size * objects if name in ("put", "get", "stream") else 0
+        results[name] = {
+            "seconds": seconds,
+            "ops_per_s": objects / seconds,
+            "mb_per_s": moved / seconds / 2 ** 20,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image storage backends.")
+    parser.add_argument('--objects', type=int, default=200, dest='objects')
+    parser.add_argument('--size', type=int, default=2_000_000, dest='size', help="Bytes per object")
+    parser.add_argument('--concurrency', type=int, default=16, dest='concurrency')
+    parser.add_argument('--blob-connection-string', dest='blob_connection_string')
+    parser.add_argument('--blob-container', default='benchmark', dest='blob_container')
+    parser.add_argument('--output', help="Write the report to this JSON file", dest='output')
+    args = parser.parse_args()
+
+    report = {"objects": args.objects, "size": args.size, "concurrency": args.concurrency, "results": {}}
+
+    report["results"]["memory"] = asyncio.run(benchmark(MemoryStorage(), args.objects, args.size, args.concurrency))
+
+    with tempfile.TemporaryDirectory() as root:
+        report["results"]["disk"] = asyncio.run(
+            benchmark(LocalDiskStorage(root), args.objects, args.size, args.concurrency))
+
+    if args.blob_connection_string:
+        blob_storage = BlobStorage(args.blob_connection_string, args.blob_container, chunk_size=4 * 2 ** 20,
+                                   pool_size=args.concurrency)
+        storage = BlobStorageBackend(blob_storage, chunk_size=4 * 2 ** 20, max_concurrency=4)
+        report["results"]["blob"] = asyncio.run(benchmark(storage, args.objects, args.size, args.concurrency))
+        report["blob_connections"] = blob_storage.metrics.to_dict()
+        blob_storage.close()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
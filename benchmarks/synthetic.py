@@ -0,0 +1,97 @@
+"""Synthetic document photos for the OCR benchmarks.
+
+A white page with a few lines of text and a document number (R######, P######### or
+INT####) is warped with a random perspective onto a cluttered background, then blurred,
+noised and JPEG encoded like a phone photo. Everything is driven by the given numpy
+random generator, so the same seed always produces the same scans.
+"""
+import math
+
+import cv2
+import numpy as np
+
+# A4 portrait
+PAGE_ASPECT = 297 / 210
+
+WORDS = ["racun", "ponuda", "iznos", "datum", "kolicina", "cijena", "ukupno", "PDV", "kupac", "adresa",
+         "napomena", "rok", "placanja", "broj", "artikl", "usluga", "popust", "EUR"]
+
+
+def document_number(rng) -> str:
+    kind = rng.integers(3)
+    if kind == 0:
+        return f"R{rng.integers(10 ** 6):06d}"
+    if kind == 1:
+        return f"P{rng.integers(10 ** 9):09d}"
+    return f"INT{rng.integers(10 ** 4):04d}"
+
+
+def _draw_page(height, number, rng):
+    width = int(height / PAGE_ASPECT)
+    page = np.full((height, width, 3), 245, dtype=np.uint8)
+    scale = height / 1000
+    thickness = max(1, int(round(2 * scale)))
+
+    cv2.putText(page, number, (int(60 * scale), int(90 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 1.4 * scale,
+                (20, 20, 20), thickness + 1)
+
+    y = 160 * scale
+    while y < height - 80 * scale:
+        line = " ".join(rng.choice(WORDS, size=rng.integers(3, 7)))
+        cv2.putText(page, line, (int(60 * scale), int(y)), cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale,
+                    (40, 40, 40), thickness)
+        y += 45 * scale
+
+    return page
+
+
+def _draw_background(height, width, rng):
+    background = rng.integers(60, 140, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    for _ in range(25):
+        color = tuple(int(c) for c in rng.integers(0, 200, size=3))
+        x1, x2 = sorted(rng.integers(0, width, size=2))
+        y1, y2 = sorted(rng.integers(0, height, size=2))
+        if rng.random() < 0.5:
+            cv2.rectangle(background, (int(x1), int(y1)), (int(x2), int(y2)), color, -1)
+        else:
+            cv2.line(background, (int(x1), int(y1)), (int(x2), int(y2)), color, max(1, width // 300))
+
+    return background
+
+
+def make_scan(megapixels: float, rng, quality: int = 90):
+    """Returns the JPEG bytes, the page corners and the document number of a synthetic scan."""
+    height = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    width = int(height * 3 / 4)
+    number = document_number(rng)
+
+    image = _draw_background(height, width, rng)
+
+    # the page covers most of the photo, with every corner pulled in by a random amount
+    page = _draw_page(int(height * 0.8), number, rng)
+    page_height, page_width = page.shape[:2]
+    left, top = (width - page_width) / 2, (height - page_height) / 2
+    jitter = rng.uniform(-0.06, 0.06, size=(4, 2)) * [page_width, page_height]
+    corners = np.float32([
+        [left, top],
+        [left + page_width, top],
+        [left + page_width, top + page_height],
+        [left, top + page_height],
+    ] + jitter)
+    corners[:, 0] = corners[:, 0].clip(0, width - 1)
+    corners[:, 1] = corners[:, 1].clip(0, height - 1)
+
+    source = np.float32([[0, 0], [page_width - 1, 0], [page_width - 1, page_height - 1], [0, page_height - 1]])
+    transform = cv2.getPerspectiveTransform(source, corners)
+    warped = cv2.warpPerspective(page, transform, (width, height))
+    mask = cv2.warpPerspective(np.full(page.shape[:2], 255, dtype=np.uint8), transform, (width, height))
+    image[mask > 0] = warped[mask > 0]
+
+    image = cv2.GaussianBlur(image, (3, 3), 0)
+    noise = rng.normal(0, 6, size=image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded.tobytes(), corners, number
@@ -56,7 +56,7 @@ def test_archive_document():
 
     with patch("app.services.archives.ArchiveCRUD", return_value=mock_archive_crud):
         with patch("app.services.archives.UserService", return_value=mock_user_service):
-            with patch("app.services.archives.DocumentService", return_value=mock_document_service):
+            with patch("app.services.documents.DocumentService", return_value=mock_document_service):
                 result = archive_service.archive_document(1, ArchiveStatus.DONE, "test")
 
     mock_archive_crud.get_archived_by_document_id.assert_called_once_with(1)
@@ -81,7 +81,7 @@ def test_archive_document_forbidden():
 
     with patch("app.services.archives.ArchiveCRUD", return_value=mock_archive_crud):
         with patch("app.services.archives.UserService", return_value=mock_user_service):
-            with patch("app.services.archives.DocumentService", return_value=mock_document_service):
+            with patch("app.services.documents.DocumentService", return_value=mock_document_service):
                 with raises(ArchiveException.IllegalArchiveStatus):
                     archive_service.archive_document(1, ArchiveStatus.DONE, "test")
 
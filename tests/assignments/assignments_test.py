@@ -0,0 +1,118 @@
+from unittest.mock import Mock
+
+from _pytest.python_api import raises
+from pydantic import ValidationError
+
+from app.config.base import Settings
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.users import UserDB, RoleDB
+from app.services.archives import ArchiveService
+from app.services.assignments import AssignmentService, AssignmentCRUD, LeastLoaded, RoundRobin, Weighted
+from app.utils.enums import RolesEnum, ActionStatus, ArchiveStatus, DocumentTypeEnum
+from app.utils.exceptions.user_exceptions import UserException
+from tests.util import count_queries, memory_session
+
+
+def auditors_session(audits: dict[int, list[ActionStatus]]):
+    """Auditors 1 to 3 with the given audits, and user 4, who is not an auditor, with two pending ones."""
+    engine, db = memory_session()
+    auditor, director = RoleDB(name=RolesEnum.AUDITOR.value), RoleDB(name=RolesEnum.DIRECTOR.value)
+    for user_id in range(1, 5):
+        db.add(UserDB(id=user_id, username=f"user{user_id}", email=f"user{user_id}@email.com",
+                      roles=[auditor if user_id < 4 else director]))
+    for user_id, statuses in {**audits, 4: [ActionStatus.PENDING] * 2}.items():
+        for status in statuses:
+            db.add(AuditDB(audited_by=user_id, document_id=1, status=status))
+    db.commit()
+    return engine, db
+
+
+def assign_auditor(db, strategy) -> int:
+    return AssignmentService(db, strategy).assign(RolesEnum.AUDITOR, AuditDB.audited_by, AuditDB.status,
+                                                  [ActionStatus.PENDING])
+
+
+def test_least_loaded_assignment_takes_one_query():
+    engine, db = auditors_session({
+        1: [ActionStatus.PENDING],
+        2: [ActionStatus.DONE] * 3,
+        3: [ActionStatus.PENDING] * 2,
+    })
+
+    with count_queries(engine) as statements:
+        # done audits do not count, user 2 has no pending audit
+        assert assign_auditor(db, LeastLoaded()) == 2
+    assert len(statements) == 1
+
+    workloads = AssignmentCRUD(db).get_workloads(RolesEnum.AUDITOR, AuditDB.audited_by, AuditDB.status,
+                                                 [ActionStatus.PENDING])
+    assert sorted((workload.user_id, workload.pending) for workload in workloads) == [(1, 1), (2, 0), (3, 2)]
+
+
+def test_round_robin_assignment():
+    engine, db = auditors_session({1: [ActionStatus.DONE], 3: [ActionStatus.PENDING]})
+    assert assign_auditor(db, RoundRobin()) == 2
+
+    db.add(AuditDB(audited_by=2, document_id=1, status=ActionStatus.PENDING))
+    db.commit()
+    # user 1 was assigned longest ago, although their audit is done
+    assert assign_auditor(db, RoundRobin()) == 1
+
+
+def test_weighted_assignment():
+    engine, db = auditors_session({
+        1: [ActionStatus.PENDING] * 3,
+        2: [ActionStatus.PENDING] * 2,
+        3: [ActionStatus.PENDING] * 2,
+    })
+
+    assert assign_auditor(db, Weighted({"user1": 2})) == 1
+    assert assign_auditor(db, Weighted({"user1": 1.4})) == 2
+
+
+def test_weights_must_be_positive():
+    with raises(ValueError):
+        Weighted({"user1": 0})
+    with raises(ValidationError):
+        Settings(assignment_weights={"user1": 0})
+
+
+def test_unknown_strategy_is_rejected():
+    with raises(ValidationError):
+        Settings(assignment_strategy="fewest")
+
+
+def test_assignment_without_users_of_the_role():
+    engine, db = auditors_session({})
+
+    with raises(UserException.NoUsersWithRole):
+        AssignmentService(db, LeastLoaded()).assign(RolesEnum.ACCOUNTANT_OFFER, AuditDB.audited_by,
+                                                    AuditDB.status, [ActionStatus.PENDING])
+
+
+def test_assignment_lock_on_postgresql():
+    db = Mock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+
+    AssignmentCRUD(db).lock(RolesEnum.AUDITOR, AuditDB.audited_by)
+
+    statement, params = db.execute.call_args.args
+    assert str(statement) == "SELECT pg_advisory_xact_lock(:key)"
+    AssignmentCRUD(db).lock(RolesEnum.DIRECTOR, AuditDB.audited_by)
+    assert db.execute.call_args.args[1] != params
+
+
+def test_archive_is_assigned_to_the_least_loaded_accountant():
+    engine, db = memory_session()
+    accountant = RoleDB(name=RolesEnum.ACCOUNTANT_OFFER.value)
+    for user_id in (1, 2):
+        db.add(UserDB(id=user_id, username=f"user{user_id}", email=f"user{user_id}@email.com", roles=[accountant]))
+    db.add(ArchiveDB(archive_by=1, document_id=1, status=ArchiveStatus.SIGNED_PENDING))
+    db.add(ArchiveDB(archive_by=2, document_id=2, status=ArchiveStatus.DONE))
+    db.add(ArchiveDB(archive_by=2, document_id=3, status=ArchiveStatus.DONE))
+    db.commit()
+
+    archive = ArchiveService(db).create_archive_for_document(4, DocumentTypeEnum.OFFER)
+
+    assert archive.archive_by == 2
@@ -4,6 +4,7 @@ from starlette.testclient import TestClient
 
 from app.main import app
 from app.services.audit import AuditService
+from app.utils.enums import ActionStatus, SortOrderEnum
 from tests.audit.util import audits, audit_create
 
 from tests.users.util import user_jwt, director_jwt, admin_jwt
@@ -22,117 +23,52 @@ def test_get_all_audits_not_authenticated():
 
 
 def test_get_all_audits():
+    page = {"items": [audits[0].model_dump(), audits[1].model_dump()], "next_cursor": "Wzld"}
     mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_all_audits.return_value = [audits[0].model_dump(), audits[1].model_dump()]
+    mock_audit_service.get_audits_page.return_value = page
 
     with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
         response = client.get("/audits/", headers={"Authorization": f"Bearer {director_jwt}"})
 
-    mock_audit_service.get_all_audits.assert_called_once()
+    page_params, user_id, status = mock_audit_service.get_audits_page.call_args.args
+    assert (page_params.cursor, page_params.limit, user_id, status) == (None, 50, None, None)
     assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
+    assert response.json() == page
 
 
 def test_get_all_usr_audits():
     mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_all_audits_for_user.return_value = [audits[0].model_dump(), audits[1].model_dump()]
+    mock_audit_service.get_audits_page.return_value = {"items": [audits[0].model_dump()], "next_cursor": None}
 
     with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/?user_id=1", headers={"Authorization": f"Bearer {director_jwt}"})
+        response = client.get("/audits/?user_id=1&status=pending&limit=1&cursor=Wzld&order=asc",
+                              headers={"Authorization": f"Bearer {director_jwt}"})
 
-    mock_audit_service.get_all_audits_for_user.assert_called_once()
+    page_params, user_id, status = mock_audit_service.get_audits_page.call_args.args
+    assert (page_params.cursor, page_params.limit, page_params.order) == ("Wzld", 1, SortOrderEnum.ASC)
+    assert (user_id, status) == (1, ActionStatus.PENDING)
     assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
+    assert response.json() == {"items": [audits[0].model_dump()], "next_cursor": None}
 
 
-def test_get_all_pending_audits_for_usr():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_pending_audits.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/?user_id=1&status=pending", headers={"Authorization": f"Bearer {director_jwt}"})
-
-    mock_audit_service.get_pending_audits.assert_called_once()
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
-
-
-def test_get_all_audited_audits_for_usr():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_audited_documents.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/?user_id=1&status=done", headers={"Authorization": f"Bearer {director_jwt}"})
-
-    mock_audit_service.get_audited_documents.assert_called_once()
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
-
-
-def test_get_all_pending_audits():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_all_pending_audits.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/?status=pending", headers={"Authorization": f"Bearer {director_jwt}"})
-
-    mock_audit_service.get_all_pending_audits.assert_called_once()
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
-
-
-def test_get_all_audited_audits():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_all_audited_documents.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/?status=done", headers={"Authorization": f"Bearer {director_jwt}"})
+def test_get_audits_limit_out_of_range():
+    response = client.get("/audits/?limit=100000", headers={"Authorization": f"Bearer {director_jwt}"})
 
-    mock_audit_service.get_all_audited_documents.assert_called_once()
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
+    assert response.status_code == 422
 
 
 def test_get_all_my_audits():
     mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_all_audits_for_user_by_username.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/me", headers={"Authorization": f"Bearer {user_jwt}"})
-
-    mock_audit_service.get_all_audits_for_user_by_username.assert_called_once()
-    mock_audit_service.get_all_audits_for_user.assert_not_called()
-
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
-
-
-def test_get_all_my_pending_audits():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_pending_audits_by_username.return_value = [audits[0].model_dump(), audits[1].model_dump()]
-
-    with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
-        response = client.get("/audits/me?status=pending", headers={"Authorization": f"Bearer {user_jwt}"})
-
-    mock_audit_service.get_pending_audits_by_username.assert_called_once()
-    mock_audit_service.get_pending_audits.assert_not_called()
-
-    assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
-
-
-def test_get_all_my_audited_audits():
-    mock_audit_service = Mock(spec=AuditService)
-    mock_audit_service.get_audited_documents_by_username.return_value = [audits[0].model_dump(), audits[1].model_dump()]
+    mock_audit_service.get_audits_page_by_username.return_value = {"items": [audits[0].model_dump()],
+                                                                   "next_cursor": None}
 
     with patch("app.routers.audit.AuditService", return_value=mock_audit_service):
         response = client.get("/audits/me?status=done", headers={"Authorization": f"Bearer {user_jwt}"})
 
-    mock_audit_service.get_audited_documents_by_username.assert_called_once()
-    mock_audit_service.get_audited_documents.assert_not_called()
-
+    username, _, status = mock_audit_service.get_audits_page_by_username.call_args.args
+    assert status == ActionStatus.DONE
     assert response.status_code == 200
-    assert response.json() == [audits[0].model_dump(), audits[1].model_dump()]
+    assert response.json() == {"items": [audits[0].model_dump()], "next_cursor": None}
 
 
 def test_create_audit_request():
@@ -1,7 +1,12 @@
+from datetime import datetime
 from unittest.mock import Mock, patch
 
-from app.services.audit import AuditService
+from app.models.audit import AuditDB
+from app.services.audit import AuditService, AuditCRUD
+from app.utils.enums import ActionStatus
+from app.utils.pagination import PageParams
 from tests.audit.util import audits
+from tests.util import seeded_session
 
 
 def test_get_all_audits():
@@ -100,3 +105,16 @@ def test_get_audit_by_document_id():
 
     mock_audit_crud.get_audit_by_document_id.assert_called_once()
     assert result == audits[0]
+
+
+def test_date_filter_leaves_out_pending_audits():
+    _, db = seeded_session(3)
+    db.get(AuditDB, 2).status = ActionStatus.DONE
+    db.get(AuditDB, 2).audited_at = datetime(2024, 1, 2)
+    db.commit()
+
+    unfiltered = AuditCRUD(db).get_audits_page(PageParams())
+    filtered = AuditCRUD(db).get_audits_page(PageParams(date_from=datetime(2024, 1, 1)))
+
+    assert [audit.audit_id for audit in unfiltered.items] == [3, 2, 1]
+    assert [audit.audit_id for audit in filtered.items] == [2]
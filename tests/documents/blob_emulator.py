@@ -0,0 +1,115 @@
+import base64
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ACCOUNT_NAME = "devstoreaccount1"
+ACCOUNT_KEY = base64.b64encode(b"emulator-key").decode()
+
+
+class BlobEmulator:
+    """In-memory stand-in for a blob storage emulator such as Azurite.
+
+    It understands just enough of the blob REST API for ImageCRUD: block blob uploads in a
+    single request, blob properties, ranged downloads and deletes, over keep-alive HTTP/1.1
+    connections. Request signatures are not checked.
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.connections = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def connection_string(self) -> str:
+        host, port = self._server.server_address
+        return (f"DefaultEndpointsProtocol=http;AccountName={ACCOUNT_NAME};AccountKey={ACCOUNT_KEY};"
+                f"BlobEndpoint=http://{host}:{port}/{ACCOUNT_NAME};")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                emulator.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _name(self):
+                return self.path.split("?")[0].split("/", 2)[2]
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("x-ms-request-id", "emulator")
+                self.send_header("x-ms-version", "2023-11-03")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _properties(self, data):
+                return {
+                    "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+                    "Last-Modified": formatdate(usegmt=True),
+                    "x-ms-blob-type": "BlockBlob",
+                    "Content-Type": "application/octet-stream",
+                }
+
+            def do_PUT(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                name = self._name()
+                if self.headers.get("If-None-Match") == "*" and name in emulator.blobs:
+                    return self._send(409, headers={"x-ms-error-code": "BlobAlreadyExists"})
+                emulator.blobs[name] = data
+                self._send(201, headers={"ETag": self._properties(data)["ETag"],
+                                         "Last-Modified": formatdate(usegmt=True)})
+
+            def do_HEAD(self):
+                data = emulator.blobs.get(self._name())
+                if data is None:
+                    self.send_response(404)
+                    self.send_header("x-ms-error-code", "BlobNotFound")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                for key, value in self._properties(data).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+
+            def do_GET(self):
+                data = emulator.blobs.get(self._name())
+                if data is None:
+                    return self._send(404, headers={"x-ms-error-code": "BlobNotFound"})
+
+                byte_range = self.headers.get("x-ms-range") or self.headers.get("Range")
+                if not byte_range:
+                    return self._send(200, data, self._properties(data))
+
+                start, end = byte_range.split("=")[1].split("-")
+                start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+                headers = {**self._properties(data), "Content-Range": f"bytes {start}-{end}/{len(data)}"}
+                self._send(206, data[start:end + 1], headers)
+
+            def do_DELETE(self):
+                if emulator.blobs.pop(self._name(), None) is None:
+                    return self._send(404, headers={"x-ms-error-code": "BlobNotFound"})
+                self._send(202)
+
+        return Handler
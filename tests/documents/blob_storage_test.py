@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from app.utils.blob_storage import stream_blob_range, BlobStorage
+from tests.documents.blob_emulator import BlobEmulator
+
+data = bytes(range(256)) * 40
+
+
+def fake_blob():
+    def download_blob(offset, length):
+        content = data[offset:offset + length]
+        return Mock(readall=Mock(return_value=content),
+                    chunks=Mock(return_value=iter([content[:100], content[100:]])))
+
+    return Mock(download_blob=Mock(side_effect=download_blob))
+
+
+def test_stream_blob_range_in_parallel_chunks():
+    blob = fake_blob()
+
+    chunks = list(stream_blob_range(blob, 10, 5000, chunk_size=1000, max_concurrency=3))
+
+    assert [len(chunk) for chunk in chunks] == [1000] * 5
+    assert b"".join(chunks) == data[10:5010]
+    assert blob.download_blob.call_count == 5
+
+
+def test_stream_blob_range_sequentially():
+    blob = fake_blob()
+
+    chunks = list(stream_blob_range(blob, 0, 5000, chunk_size=1000, max_concurrency=1))
+
+    assert b"".join(chunks) == data[:5000]
+    blob.download_blob.assert_called_once_with(offset=0, length=5000)
+
+
+def test_blob_storage_reuses_connections():
+    with BlobEmulator() as emulator:
+        storage = BlobStorage(emulator.connection_string, "images", chunk_size=1000)
+        blob = storage.container_client.get_blob_client("scan.png")
+
+        blob.upload_blob(data)
+        for _ in range(3):
+            assert storage.container_client.get_blob_client("scan.png").download_blob().readall() == data
+        assert b"".join(stream_blob_range(blob, 0, len(data), chunk_size=1000, max_concurrency=2)) == data
+
+        metrics = storage.metrics.to_dict()
+        storage.close()
+
+    assert metrics["requests"] >= 9
+    assert metrics["errors"] == 0
+    assert metrics["connections_opened"] <= 2
+    assert metrics["connection_reuse_ratio"] > 0.5
+    assert set(metrics["latency"]) == {"PUT", "GET"}
+
+    assert sum(latency["count"] for latency in metrics["latency"].values()) == metrics["requests"]
+
+
+def test_parallel_streams_share_one_pool():
+    threads = set()
+    blob = fake_blob()
+    download = blob.download_blob.side_effect
+
+    def download_blob(offset, length):
+        threads.add(threading.current_thread().name)
+        return download(offset, length)
+
+    blob.download_blob.side_effect = download_blob
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="test-download")
+
+    streams = [stream_blob_range(blob, 0, 5000, chunk_size=1000, max_concurrency=3, pool=pool) for _ in range(3)]
+    contents = [b"".join(chunks) for chunks in zip(*streams)]
+    pool.shutdown()
+
+    assert contents == [data[start:start + 1000] * 3 for start in range(0, 5000, 1000)]
+    assert len(threads) <= 2 and all(name.startswith("test-download") for name in threads)
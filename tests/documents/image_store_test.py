@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import os
+
+import cv2
+import numpy as np
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.models.documents import ImageObjectDB
+from app.services.documents import ImageCRUD
+from app.utils.enums import ImageSizeEnum
+from app.utils.blob_storage import BlobStorage
+from app.utils.storage import LocalDiskStorage, BlobStorageBackend, MemoryStorage
+from app.utils.uploads import SpooledUpload
+from tests.documents.blob_emulator import BlobEmulator
+
+data = bytes(range(256)) * 40
+content_hash = hashlib.sha256(data).hexdigest()
+
+
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def spool(directory) -> SpooledUpload:
+    path = os.path.join(directory, f"upload-{len(os.listdir(directory))}.part")
+    with open(path, "wb") as file:
+        file.write(data)
+    return SpooledUpload(path=path, content_hash=content_hash, size=len(data), image_format="png")
+
+
+def test_identical_scans_share_one_file(tmp_path):
+    db = session()
+    spool_directory = tmp_path / "spool"
+    spool_directory.mkdir()
+
+    storage = LocalDiskStorage(str(tmp_path))
+
+    first = asyncio.run(ImageCRUD(db, storage).create_image(spool(spool_directory), "scan.png"))
+    second = asyncio.run(ImageCRUD(db, storage).create_image(spool(spool_directory), "copy of scan.png"))
+
+    expected_path = f"{tmp_path}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png"
+    assert first.image_path == second.image_path == expected_path
+    assert (first.filename, second.filename) == ("scan.png", "copy of scan.png")
+    assert db.query(ImageObjectDB).one().ref_count == 2
+    with open(expected_path, "rb") as file:
+        assert file.read() == data
+
+    asyncio.run(ImageCRUD(db, storage).delete_image(first.id))
+    assert os.path.exists(expected_path)
+
+    asyncio.run(ImageCRUD(db, storage).delete_image(second.id))
+    assert not os.path.exists(expected_path)
+    assert db.query(ImageObjectDB).count() == 0
+
+
+def test_master_is_stored_in_place_of_the_upload(tmp_path):
+    db = session()
+    storage = MemoryStorage()
+    master = b"jpeg" * 100
+    master_hash = hashlib.sha256(master).hexdigest()
+
+    with patch("app.services.documents.settings.image_keep_original", False):
+        image = asyncio.run(ImageCRUD(db, storage).create_image(spool(tmp_path), "scan.png", master))
+        source = asyncio.run(ImageCRUD(db, storage).get_ocr_source(image.id))
+
+        assert image.image_path == f"{master_hash[:2]}/{master_hash[2:4]}/{master_hash}.jpg"
+        assert (image.content_type, image.size, image.original_size) == ("image/jpeg", len(master), len(data))
+        assert image.original_path is None
+        assert storage.objects == {image.image_path: master}
+        assert source == (master, True)
+
+        asyncio.run(ImageCRUD(db, storage).delete_image(image.id))
+        assert storage.objects == {}
+
+
+def test_master_of_a_stored_upload_keeps_the_original(tmp_path):
+    db = session()
+    storage = MemoryStorage()
+    master = b"jpeg" * 100
+
+    with patch("app.services.documents.settings.image_keep_original", True):
+        image = asyncio.run(ImageCRUD(db, storage).create_image(spool(tmp_path), "scan.png"))
+        original_path = image.image_path
+        image = asyncio.run(ImageCRUD(db, storage).store_master(image.id, master))
+        # a second run of the job leaves the master alone
+        image = asyncio.run(ImageCRUD(db, storage).store_master(image.id, b"webp"))
+        source = asyncio.run(ImageCRUD(db, storage).get_ocr_source(image.id))
+
+        assert image.original_path == original_path
+        assert storage.objects == {original_path: data, image.image_path: master}
+        assert source == (data, False)
+
+        asyncio.run(ImageCRUD(db, storage).delete_image(image.id))
+        assert storage.objects == {}
+        assert db.query(ImageObjectDB).count() == 0
+
+
+def test_previews_are_made_once_and_deleted_with_the_image(tmp_path):
+    db = session()
+    storage = MemoryStorage()
+    scan = cv2.imencode(".png", np.full((2000, 1500, 3), 255, dtype=np.uint8))[1].tobytes()
+    path = tmp_path / "upload.part"
+    path.write_bytes(scan)
+    upload = SpooledUpload(path=str(path), content_hash=hashlib.sha256(scan).hexdigest(), size=len(scan),
+                           image_format="png")
+
+    async def run():
+        image_crud = ImageCRUD(db, storage)
+        image = await image_crud.create_image(upload, "scan.png")
+        thumbnail = await image_crud.get_image_file(image.id, ImageSizeEnum.THUMBNAIL)
+        with patch("app.services.documents.create_preview") as mock_create_preview:
+            again = await image_crud.get_image_file(image.id, ImageSizeEnum.THUMBNAIL)
+        content = b"".join([chunk async for chunk in thumbnail.read_range(0, thumbnail.size)])
+        medium = await image_crud.get_image_file(image.id, ImageSizeEnum.MEDIUM)
+        full = await image_crud.get_image_file(image.id)
+        objects = set(storage.objects)
+        await image_crud.delete_image(image.id)
+        return image, thumbnail, again, content, medium, full, objects, mock_create_preview
+
+    image, thumbnail, again, content, medium, full, objects, mock_create_preview = asyncio.run(run())
+
+    mock_create_preview.assert_not_called()
+    assert cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR).shape == (256, 192, 3)
+    assert (thumbnail.content_type, thumbnail.size) == ("image/jpeg", again.size)
+    assert len({thumbnail.etag, medium.etag, full.etag}) == 3
+    assert full.size == len(scan)
+    assert objects == {image.image_path, ImageCRUD.preview_path(image.image_path, ImageSizeEnum.THUMBNAIL),
+                       ImageCRUD.preview_path(image.image_path, ImageSizeEnum.MEDIUM)}
+    assert storage.objects == {}
+
+
+def test_image_crud_against_blob_emulator(tmp_path):
+    db = session()
+
+    with BlobEmulator() as emulator:
+        storage = BlobStorage(emulator.connection_string, "images", chunk_size=1000)
+        image_crud = ImageCRUD(db, BlobStorageBackend(storage, chunk_size=1000, max_concurrency=2))
+
+        async def run():
+            first = await image_crud.create_image(spool(tmp_path), "scan.png")
+            second = await image_crud.create_image(spool(tmp_path), "scan.png")
+            image = await image_crud.get_image_file(second.id)
+            content = b"".join([chunk async for chunk in image.read_range(0, image.size)])
+            await image_crud.delete_image(first.id)
+            await image_crud.delete_image(second.id)
+            return first, image, content
+
+        first, image, content = asyncio.run(run())
+        puts = storage.metrics.to_dict()["latency"]["PUT"]["count"]
+        storage.close()
+
+    assert first.image_path == f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png"
+    assert puts == 1
+    assert image.size == len(data)
+    assert content == data
+    assert emulator.blobs == {}
+
+
+def test_objects_are_deleted_before_their_row(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+    Base.metadata.create_all(engine)
+    db, other = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+    rows_seen = []
+
+    class WatchedStorage(MemoryStorage):
+        async def delete(self, key: str):
+            # a concurrent upload of the same scan still sees the row, and waits for its lock
+            rows_seen.append(other.query(ImageObjectDB).count())
+            await super().delete(key)
+
+    storage = WatchedStorage()
+    image = asyncio.run(ImageCRUD(db, storage).create_image(spool(tmp_path), "scan.png"))
+    asyncio.run(ImageCRUD(db, storage).delete_image(image.id))
+
+    assert rows_seen == [1, 1, 1]
+    assert other.query(ImageObjectDB).count() == 0
+    assert storage.objects == {}
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from _pytest.python_api import raises
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+
+from app.config.database import Base, get_db
+from app.main import app
+from app.migrations.runner import migrate
+from app.migrations.versions import MIGRATIONS
+from app.models.documents import DocumentDB
+from app.models.users import UserDB
+from app.services.documents import DocumentCRUD
+from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, SortOrderEnum
+from app.utils.exceptions.app_exceptions import AppException
+from app.utils.pagination import PageParams, encode_cursor
+from tests.users.util import director_jwt
+
+start = datetime(2024, 1, 1)
+
+
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    db.add(UserDB(id=1, username="test", email="test@email.com", first_name="Test", last_name="Test"))
+    for document_id in range(1, 8):
+        db.add(DocumentDB(id=document_id, owner_id=1, image_id=document_id, summary="",
+                          document_type=DocumentTypeEnum.RECEIPT, document_status=DocumentStatusEnum.SCANNED,
+                          # documents 2 and 3, 4 and 5 were scanned at the same time
+                          scan_time=start + timedelta(days=document_id // 2)))
+    db.commit()
+    return db
+
+
+def walk(db, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        page = DocumentCRUD(db).get_documents_page(PageParams(cursor=cursor, limit=2, **params))
+        pages.append([document.id for document in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_pages_follow_scan_time_and_id():
+    db = session()
+
+    assert walk(db) == [[7, 6], [5, 4], [3, 2], [1]]
+    assert walk(db, order=SortOrderEnum.ASC) == [[1, 2], [3, 4], [5, 6], [7]]
+
+
+def test_pages_are_filtered_by_date():
+    db = session()
+
+    assert walk(db, date_from=start + timedelta(days=1), date_to=start + timedelta(days=2)) == [[5, 4], [3, 2]]
+
+
+def test_invalid_cursor():
+    db = session()
+
+    with raises(AppException.InvalidCursor):
+        DocumentCRUD(db).get_documents_page(PageParams(cursor="not a cursor"))
+    with raises(AppException.InvalidCursor):
+        DocumentCRUD(db).get_documents_page(PageParams(cursor="WzFd"))
+
+
+def test_documents_page_response():
+    db = session()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client = TestClient(app)
+        first = client.get("/documents/?limit=3", headers={"Authorization": f"Bearer {director_jwt}"}).json()
+        second = client.get(f"/documents/?limit=3&cursor={first['next_cursor']}",
+                            headers={"Authorization": f"Bearer {director_jwt}"}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [document["id"] for document in first["items"]] == [7, 6, 5]
+    assert first["items"][0]["owner"]["username"] == "test"
+    assert [document["id"] for document in second["items"]] == [4, 3, 2]
+
+
+def page_query_plans(tmp_path, **filters) -> str:
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+    migrate(engine, MIGRATIONS)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    cursor = encode_cursor([start, 3])
+    DocumentCRUD(Session(engine)).get_documents_page(PageParams(cursor=cursor, limit=2), **filters)
+    event.remove(engine, "before_cursor_execute", record)
+
+    with engine.connect() as connection:
+        return str([connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                    for statement, parameters in statements])
+
+
+def test_pages_are_read_in_index_order(tmp_path):
+    for filters in ({}, {"owner_id": 1}, {"document_status": DocumentStatusEnum.SCANNED},
+                    {"document_type": DocumentTypeEnum.RECEIPT},
+                    {"document_type": DocumentTypeEnum.RECEIPT, "document_status": DocumentStatusEnum.SCANNED}):
+        plan = page_query_plans(tmp_path, **filters)
+
+        assert "scan_time_id" in plan, filters
+        assert "TEMP B-TREE" not in plan, filters
@@ -1,12 +1,15 @@
 import os
-from unittest.mock import Mock, patch
+from datetime import datetime
+from unittest.mock import Mock, patch, AsyncMock
 
 import pytest
 from starlette.testclient import TestClient
 
 from app.main import app
-from app.services.documents import DocumentService, ImageService
-from tests.documents.util import documents, uploaded_image
+from app.schemas.documents import Document
+from app.services.documents import DocumentService, ImageService, DocumentJobService
+from app.utils.enums import ImageSizeEnum, DocumentStatusEnum
+from tests.documents.util import documents, queued_job, done_job, stored_image, image_data
 from tests.users.util import user_jwt, director_jwt
 
 client = TestClient(app)
@@ -24,14 +27,19 @@ def test_get_all_documents_not_approved():
 
 def test_get_all_documents():
     mock_document_service = Mock(spec=DocumentService)
-    mock_document_service.get_all_documents.return_value = [documents[0].model_dump(), documents[1].model_dump()]
+    page = {"items": [documents[0].model_dump(), documents[1].model_dump()], "next_cursor": "WyIyMDI0Il0="}
+    mock_document_service.get_documents_page.return_value = page
 
     with patch("app.routers.documents.DocumentService", return_value=mock_document_service):
-        response = client.get("/documents/", headers={"Authorization": f"Bearer {director_jwt}"})
+        response = client.get("/documents/?document_status=scanned&date_from=2024-01-01T00:00:00",
+                              headers={"Authorization": f"Bearer {director_jwt}"})
 
-    mock_document_service.get_all_documents.assert_called_once()
+    page_params, document_type, document_status = mock_document_service.get_documents_page.call_args.args
+    assert page_params.date_from == datetime(2024, 1, 1)
+    assert (document_type, document_status) == (None, DocumentStatusEnum.SCANNED)
     assert response.status_code == 200
-    assert response.json() == [documents[0].model_dump(), documents[1].model_dump()]
+    assert response.json() == page
+    assert [document["summary_complete"] for document in response.json()["items"]] == [True, False]
 
 
 def test_get_me_not_authenticated():
@@ -42,14 +50,15 @@ def test_get_me_not_authenticated():
 
 def test_get_me():
     mock_document_service = Mock(spec=DocumentService)
-    mock_document_service.get_documents.return_value = [documents[0].model_dump(), documents[1].model_dump()]
+    page = {"items": [documents[0].model_dump(), documents[1].model_dump()], "next_cursor": None}
+    mock_document_service.get_documents_page_by_username.return_value = page
 
     with patch("app.routers.documents.DocumentService", return_value=mock_document_service):
         response = client.get("/documents/me", headers={"Authorization": f"Bearer {user_jwt}"})
 
-    mock_document_service.get_documents.assert_called_once()
+    mock_document_service.get_documents_page_by_username.assert_called_once()
     assert response.status_code == 200
-    assert response.json() == [documents[0].model_dump(), documents[1].model_dump()]
+    assert response.json() == page
 
 
 def test_create_document():
@@ -68,6 +77,37 @@ def test_create_document():
         pytest.fail("Scratch file does not exists.")
 
 
+def test_create_document_job():
+    mock_job_service = Mock(spec=DocumentJobService)
+    mock_job_service.create_job.return_value = queued_job
+    mock_run_document_job = AsyncMock()
+
+    file_path = os.path.join(os.path.dirname(__file__), 'files', 'test_image.png')
+    with open(file_path, 'rb') as image, \
+            patch("app.routers.documents.DocumentJobService", return_value=mock_job_service), \
+            patch("app.routers.documents.run_document_job", mock_run_document_job):
+        response = client.post('/documents/jobs', headers={"Authorization": f"Bearer {user_jwt}"},
+                               files={'image': image})
+
+    mock_job_service.create_job.assert_called_once()
+    mock_run_document_job.assert_awaited_once_with(queued_job.id)
+    assert response.status_code == 202
+    assert response.json() == queued_job.model_dump()
+
+
+def test_get_document_job():
+    mock_job_service = Mock(spec=DocumentJobService)
+    mock_job_service.get_job.return_value = done_job
+
+    with patch("app.routers.documents.DocumentJobService", return_value=mock_job_service):
+        response = client.get("/documents/jobs/1", headers={"Authorization": f"Bearer {user_jwt}"})
+
+    mock_job_service.get_job.assert_called_once_with(1)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+    assert response.json()["document"] == documents[0].model_dump()
+
+
 def test_get_document():
     mock_document_service = Mock(spec=DocumentService)
     mock_document_service.get_document.return_value = documents[0].model_dump()
@@ -75,22 +115,95 @@ def test_get_document():
     with patch("app.routers.documents.DocumentService", return_value=mock_document_service):
         response = client.get("/documents/document/1", headers={"Authorization": f"Bearer {user_jwt}"})
 
-    mock_document_service.get_document.assert_called_once()
+    mock_document_service.get_document.assert_called_once_with(1, with_owner=True)
     assert response.status_code == 200
     assert response.json() == documents[0].model_dump()
+    assert response.json()["summary_complete"] is True
+
+
+def test_document_without_summary_state_is_complete():
+    document = Document.model_validate({**documents[0].model_dump(), "summary_complete": None})
+
+    assert document.model_dump()["summary_complete"] is True
 
 
 def test_get_image():
     mock_image_service = Mock(spec=ImageService)
-    mock_image_service.get_image.return_value = uploaded_image
+    mock_image_service.get_image_file.return_value = stored_image
 
     with patch("app.routers.documents.ImageService", return_value=mock_image_service):
         response = client.get("/documents/image/1", headers={"Authorization": f"Bearer {user_jwt}"})
 
-    mock_image_service.get_image.assert_called_once()
+    mock_image_service.get_image_file.assert_called_once()
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['etag'] == stored_image.etag
+    assert response.content == image_data
+
+
+def test_get_image_thumbnail():
+    mock_image_service = Mock(spec=ImageService)
+    mock_image_service.get_image_file.return_value = stored_image
+
+    with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+        response = client.get("/documents/image/1?size=thumbnail", headers={"Authorization": f"Bearer {user_jwt}"})
+
+    mock_image_service.get_image_file.assert_called_once_with(1, ImageSizeEnum.THUMBNAIL)
     assert response.status_code == 200
-    assert response.headers['content-type'] == 'image/jpeg'
-    assert response.iter_bytes()
+
+    with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+        response = client.get("/documents/image/1?size=huge", headers={"Authorization": f"Bearer {user_jwt}"})
+
+    assert response.status_code == 422
+
+
+def test_get_image_not_modified():
+    mock_image_service = Mock(spec=ImageService)
+    mock_image_service.get_image_file.return_value = stored_image
+
+    with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+        response = client.get("/documents/image/1", headers={"Authorization": f"Bearer {user_jwt}",
+                                                              "If-None-Match": stored_image.etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_get_image_range():
+    mock_image_service = Mock(spec=ImageService)
+    mock_image_service.get_image_file.return_value = stored_image
+
+    with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+        response = client.get("/documents/image/1", headers={"Authorization": f"Bearer {user_jwt}",
+                                                              "Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f"bytes 10-19/{len(image_data)}"
+    assert response.content == image_data[10:20]
+
+
+def test_get_image_range_not_satisfiable():
+    mock_image_service = Mock(spec=ImageService)
+    mock_image_service.get_image_file.return_value = stored_image
+
+    with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+        response = client.get("/documents/image/1", headers={"Authorization": f"Bearer {user_jwt}",
+                                                              "Range": f"bytes={len(image_data)}-"})
+
+    assert response.status_code == 416
+
+
+def test_get_image_malformed_range():
+    mock_image_service = Mock(spec=ImageService)
+    mock_image_service.get_image_file.return_value = stored_image
+
+    for range_header in ("bytes=abc", "bytes=5-2", "bytes=-", "bytes=1-x"):
+        with patch("app.routers.documents.ImageService", return_value=mock_image_service):
+            response = client.get("/documents/image/1", headers={"Authorization": f"Bearer {user_jwt}",
+                                                                  "Range": range_header})
+
+        assert response.status_code == 200
+        assert response.content == image_data
 
 
 def test_update_document():
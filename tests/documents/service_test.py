@@ -1,12 +1,22 @@
-from unittest.mock import Mock, patch
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch, AsyncMock, ANY
 
 from _pytest.python_api import raises
-
-from app.services.documents import DocumentService, ImageService, ImageCRUD, DocumentCRUD
-from app.utils.enums import DocumentStatusEnum
+from pydantic import ValidationError
+
+from app.config.base import settings, Settings
+from app.models.documents import DocumentJobDB, OCRResultDB, ImageDB
+from app.services.documents import DocumentService, ImageService, ImageCRUD, DocumentCRUD, DocumentJobService, \
+    DocumentJobCRUD, OCRResultCRUD
+from app.utils.ocr.azure import AzureVisionUnavailable
+from app.schemas.audit import DocumentSummary
+from app.utils.ocr.ocr import DetectedDocument, ExtractedPage, detect_document
+from app.utils.enums import DocumentStatusEnum, JobStatusEnum, DocumentTypeEnum
 from app.utils.exceptions.document_exceptions import DocumentException
 from tests.documents.util import document1, document2, documents, uploaded_image, imageDB, document3
 from tests.users.util import admin
+from tests.util import memory_session
 
 
 def test_get_all_documents():
@@ -37,8 +47,13 @@ def test_get_documents():
     assert result == documents
 
 
-@patch("app.services.documents.detect_document", return_value="R123456 text")
-def test_create_document(detect_document):
+def test_create_document():
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = None
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="R123456 text", corners=[]))
+
     mock_document_crud = Mock()
     mock_document_crud.create_document.return_value = document1
 
@@ -46,17 +61,20 @@ def test_create_document(detect_document):
     mock_user_service.get_user.return_value = admin
 
     mock_image_service = Mock()
-    mock_image_service.create_image.return_value = imageDB
+    mock_image_service.create_image = AsyncMock(return_value=imageDB)
+    mock_image_service.transcode = AsyncMock(return_value=None)
     db = Mock()
 
     document_service = DocumentService(db)
 
     with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
             patch("app.services.documents.ImageService", return_value=mock_image_service), \
-            patch("app.services.documents.UserService", return_value=mock_user_service):
-        result = document_service.create_document(uploaded_image, "username")
+            patch("app.services.documents.UserService", return_value=mock_user_service), \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud):
+        result = asyncio.run(document_service.create_document(uploaded_image, "username"))
 
-    detect_document.assert_called_once()
+    mock_ocr_executor.submit.assert_awaited_once()
     mock_user_service.get_user.assert_called_once()
     mock_image_service.create_image.assert_called_once()
 
@@ -81,13 +99,13 @@ def test_get_document():
 
 def test_get_image():
     mock_image_crud = Mock(spec=ImageCRUD)
-    mock_image_crud.get_image.return_value = uploaded_image
+    mock_image_crud.get_image = AsyncMock(return_value=uploaded_image)
     db = Mock()
 
     image_service = ImageService(db)
 
     with patch("app.services.documents.ImageCRUD", return_value=mock_image_crud):
-        result = image_service.get_image(1)
+        result = asyncio.run(image_service.get_image(1))
 
     mock_image_crud.get_image.assert_called_once()
     assert result == uploaded_image
@@ -121,3 +139,332 @@ def test_update_document_with_invalid_status():
     with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud):
         with raises(DocumentException.DocumentStatusNotCompatible):
             document_service.update_document(2, DocumentStatusEnum.ARCHIVED, None)
+
+
+def test_run_job():
+    job = Mock(id=1, image_id=1, owner_id=2)
+    mock_job_crud = Mock()
+    mock_job_crud.get_job.return_value = job
+    mock_job_crud.update_job.return_value = job
+
+    document = Mock(id=3)
+    mock_document_crud = Mock()
+    mock_document_crud.create_document.return_value = document
+
+    mock_image_service = Mock()
+    mock_image_service.get_ocr_source = AsyncMock(return_value=(b"image_data", False))
+    mock_image_service.transcode = AsyncMock(return_value=None)
+
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = None
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="P123456789 text", corners=[]))
+    db = Mock()
+
+    with patch("app.services.documents.DocumentJobCRUD", return_value=mock_job_crud), \
+            patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service), \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud):
+        asyncio.run(DocumentJobService(db).run_job(1))
+
+    mock_document_crud.create_document.assert_called_once()
+    mock_job_crud.update_job.assert_called_with(job, JobStatusEnum.DONE, document_id=document.id)
+
+
+def test_run_job_failed():
+    job = Mock(id=1, image_id=1, owner_id=2)
+    mock_job_crud = Mock()
+    mock_job_crud.get_job.return_value = job
+    mock_job_crud.update_job.return_value = job
+
+    mock_image_service = Mock()
+    mock_image_service.get_ocr_source = AsyncMock(return_value=(b"image_data", False))
+    mock_image_service.transcode = AsyncMock(return_value=None)
+    mock_image_service.delete_image = AsyncMock()
+
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = None
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="no document number", corners=[]))
+    db = Mock()
+
+    with patch("app.services.documents.DocumentJobCRUD", return_value=mock_job_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service), \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud):
+        asyncio.run(DocumentJobService(db).run_job(1))
+
+    mock_job_crud.update_job.assert_called_with(job, JobStatusEnum.FAILED, error="DocumentTypeNotRecognized")
+    mock_image_service.delete_image.assert_awaited_once_with(1)
+    assert job.image_id is None
+    # a rejected scan is read again next time
+    mock_ocr_result_crud.create_result.assert_not_called()
+
+
+def test_run_job_unexpected_error():
+    job = Mock(id=1, image_id=1, owner_id=2)
+    mock_job_crud = Mock()
+    mock_job_crud.get_job.return_value = job
+    mock_job_crud.update_job.return_value = job
+
+    mock_image_service = Mock()
+    mock_image_service.get_ocr_source = AsyncMock(return_value=(b"image_data", False))
+    mock_image_service.delete_image = AsyncMock()
+    db = Mock()
+
+    with patch("app.services.documents.DocumentJobCRUD", return_value=mock_job_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service), \
+            patch.object(DocumentService, "analyze_image", AsyncMock(side_effect=OSError("disk full"))):
+        asyncio.run(DocumentJobService(db).run_job(1))
+
+    db.rollback.assert_called_once()
+    mock_job_crud.update_job.assert_called_with(job, JobStatusEnum.FAILED, error="InternalError")
+    mock_image_service.delete_image.assert_awaited_once_with(1)
+
+
+def test_run_job_claimed_by_another_process():
+    mock_job_crud = Mock()
+    mock_job_crud.claim_job.return_value = False
+    mock_image_service = Mock()
+    db = Mock()
+
+    with patch("app.services.documents.DocumentJobCRUD", return_value=mock_job_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service):
+        asyncio.run(DocumentJobService(db).run_job(1))
+
+    mock_image_service.get_ocr_source.assert_not_called()
+    mock_job_crud.update_job.assert_not_called()
+
+
+def test_jobs_are_claimed_once_and_requeued_after_the_lease():
+    engine, db = memory_session()
+    now = datetime.now()
+    for job_id, status, updated_at in [(1, JobStatusEnum.QUEUED, now),
+                                       (2, JobStatusEnum.RUNNING, now),
+                                       (3, JobStatusEnum.RUNNING, now - timedelta(hours=1))]:
+        db.add(DocumentJobDB(id=job_id, owner_id=1, image_id=1, status=status, created_at=now, updated_at=updated_at))
+    db.commit()
+
+    assert [job.id for job in DocumentJobService(db).get_unfinished_jobs()] == [1, 3]
+
+    assert DocumentJobCRUD(db).claim_job(1)
+    assert not DocumentJobCRUD(db).claim_job(1)
+    assert not DocumentJobCRUD(db).claim_job(2)
+    assert DocumentJobCRUD(db).get_job(1).status == JobStatusEnum.RUNNING
+
+
+def test_create_document_from_cached_result():
+    mock_document_crud = Mock()
+    mock_document_crud.create_document.return_value = document1
+
+    mock_user_service = Mock()
+    mock_user_service.get_user.return_value = admin
+
+    mock_image_service = Mock()
+    mock_image_service.create_image = AsyncMock(return_value=imageDB)
+    mock_image_service.transcode = AsyncMock(return_value=None)
+
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = Mock(summary="P123456789 text", document_type="offer",
+                                                          corners="[[0, 0], [10, 0], [10, 10], [0, 10]]",
+                                                          summary_complete=True)
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock()
+    db = Mock()
+
+    document_service = DocumentService(db)
+
+    with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service), \
+            patch("app.services.documents.UserService", return_value=mock_user_service), \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud):
+        result = asyncio.run(document_service.create_document(uploaded_image, "username"))
+
+    mock_ocr_executor.submit.assert_not_awaited()
+    mock_document_crud.create_document.assert_called_once()
+    assert mock_document_crud.create_document.call_args.args[2] == DocumentTypeEnum.OFFER
+    assert result == document1
+
+
+def test_cached_rejection_is_read_again():
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = Mock(document_type=None)
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="P123456789 text", corners=[]))
+
+    with patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud):
+        detected, document_type = asyncio.run(DocumentService(Mock()).analyze_image(b"image_data", "hash"))
+
+    mock_ocr_executor.submit.assert_called_once()
+    mock_ocr_result_crud.create_result.assert_called_once_with("hash", detected, document_type)
+
+
+def test_ocr_results_are_evicted_least_recently_used_first():
+    engine, db = memory_session()
+    crud = OCRResultCRUD(db)
+    with patch("app.services.documents.settings.ocr_cache_max_entries", 10):
+        for index in range(4):
+            result = crud.create_result(f"hash{index}", DetectedDocument(text="P123456789", corners=[]),
+                                        DocumentTypeEnum.RECEIPT)
+            result.last_used_at = datetime(2024, 1, 1) + timedelta(minutes=index)
+    db.commit()
+    # hash0 is the oldest result, but was used last
+    crud.get_result("hash0")
+
+    assert crud.evict(2) == 2
+
+    assert {result.content_hash for result in db.query(OCRResultDB)} == {"hash0", "hash3"}
+    assert crud.evict(2) == 0
+
+
+def test_create_document_lazy_summary():
+    mock_document_crud = Mock()
+    mock_document_crud.create_document.return_value = Mock(id=3)
+
+    mock_user_service = Mock()
+    mock_user_service.get_user.return_value = admin
+
+    mock_image_service = Mock()
+    mock_image_service.create_image = AsyncMock(return_value=imageDB)
+    mock_image_service.transcode = AsyncMock(return_value=None)
+
+    mock_ocr_result_crud = Mock()
+    mock_ocr_result_crud.get_result.return_value = None
+
+    detected = DetectedDocument(text="R123456", corners=[[0, 0], [10, 0], [10, 10], [0, 10]], complete=False)
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=detected)
+    mock_run_in_background = Mock()
+    db = Mock()
+
+    document_service = DocumentService(db)
+
+    with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
+            patch("app.services.documents.ImageService", return_value=mock_image_service), \
+            patch("app.services.documents.UserService", return_value=mock_user_service), \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD", return_value=mock_ocr_result_crud), \
+            patch("app.services.documents.run_in_background", mock_run_in_background), \
+            patch("app.services.documents.complete_document_summary", Mock()) as mock_complete, \
+            patch("app.services.documents.settings.ocr_summary_mode", "lazy"):
+        asyncio.run(document_service.create_document(uploaded_image, "username"))
+
+    assert mock_ocr_executor.submit.call_args.args[2] == settings.ocr_classification_regions
+    assert mock_document_crud.create_document.call_args.args[2] == DocumentTypeEnum.RECEIPT
+    mock_complete.assert_called_once_with(3, detected, ANY)
+    mock_run_in_background.assert_called_once()
+
+
+def test_complete_summary():
+    document = Mock(summary="R123456")
+    mock_document_crud = Mock()
+    mock_document_crud.get_document.return_value = document
+    mock_document_crud.update_document.return_value = document
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="R123456 full page", corners=[]))
+    db = Mock()
+
+    partial = DetectedDocument(text="R123456", corners=[[0, 0], [10, 0], [10, 10], [0, 10]], complete=False)
+
+    with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
+            patch("app.services.documents.ImageService") as mock_image_service, \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD") as mock_ocr_result_crud:
+        mock_image_service.return_value.get_ocr_source = AsyncMock(return_value=(b"image_data", False))
+        asyncio.run(DocumentService(db).complete_summary(3, partial))
+
+    assert mock_ocr_executor.submit.call_args.args[1:] == (b"image_data", partial.corners)
+    assert document.summary == "R123456 full page"
+    mock_document_crud.update_document.assert_called_once_with(document)
+    mock_ocr_result_crud.return_value.complete_result.assert_called_once()
+
+
+def test_complete_summary_after_restart():
+    document = Mock(summary="R123456", summary_complete=False)
+    mock_document_crud = Mock()
+    mock_document_crud.get_document.return_value = document
+    mock_document_crud.update_document.return_value = document
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(return_value=DetectedDocument(text="R123456 full page", corners=[]))
+
+    partial = DetectedDocument(text="R123456", corners=None, complete=False)
+
+    with patch("app.services.documents.DocumentCRUD", return_value=mock_document_crud), \
+            patch("app.services.documents.ImageService") as mock_image_service, \
+            patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.OCRResultCRUD"):
+        mock_image_service.return_value.get_ocr_source = AsyncMock(return_value=(b"image_data", False))
+        asyncio.run(DocumentService(Mock()).complete_summary(3, partial))
+
+    # the corners are not known anymore, the page is detected again
+    assert mock_ocr_executor.submit.call_args.args == (detect_document, b"image_data")
+    assert (document.summary, document.summary_complete) == ("R123456 full page", True)
+
+
+def test_partial_summaries_are_read_until_complete():
+    _, db = memory_session()
+    image = ImageDB(image_path="scan.png")
+    db.add(image)
+    db.commit()
+
+    document_crud = DocumentCRUD(db)
+    partial = document_crud.create_document(image, 1, DocumentTypeEnum.RECEIPT, "R123456",
+                                            DocumentStatusEnum.SCANNED, summary_complete=False)
+    edited = document_crud.create_document(image, 1, DocumentTypeEnum.RECEIPT, "R654321",
+                                           DocumentStatusEnum.SCANNED, summary_complete=False)
+    document_crud.create_document(image, 1, DocumentTypeEnum.RECEIPT, "R111111 full page", DocumentStatusEnum.SCANNED)
+
+    DocumentService(db).update_document(edited.id, DocumentStatusEnum.APPROVED, DocumentSummary(summary="edited"))
+
+    assert DocumentService(db).get_partial_summaries() == [
+        (partial.id, DetectedDocument(text="R123456", corners=None, complete=False))]
+
+
+def test_read_with_azure_falls_back_to_local_ocr():
+    extracted = ExtractedPage(page=b"jpeg", corners=[[0, 0], [10, 0], [10, 10], [0, 10]])
+    local = DetectedDocument(text="R123456", corners=extracted.corners)
+
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(side_effect=[extracted, local])
+    mock_azure_vision = Mock()
+    mock_azure_vision.read = AsyncMock(side_effect=AzureVisionUnavailable("circuit breaker is open"))
+
+    with patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.azure_vision", mock_azure_vision):
+        result = asyncio.run(DocumentService.read_with_azure(b"image_data"))
+
+    mock_azure_vision.read.assert_awaited_once_with(b"jpeg")
+    assert mock_ocr_executor.submit.call_args.args[2] == extracted.corners
+    assert result.text == "R123456"
+
+
+def test_transcode():
+    corners = [[0, 0], [10, 0], [10, 10], [0, 10]]
+    mock_ocr_executor = Mock()
+    mock_ocr_executor.submit = AsyncMock(side_effect=[b"master", ValueError("broken image")])
+
+    with patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.settings.image_master_format", "webp"):
+        assert asyncio.run(ImageService.transcode("upload.part", corners)) == b"master"
+        assert asyncio.run(ImageService.transcode("upload.part", corners)) is None
+
+    with patch("app.services.documents.ocr_executor", mock_ocr_executor), \
+            patch("app.services.documents.settings.image_master_format", "original"):
+        assert asyncio.run(ImageService.transcode("upload.part", corners)) is None
+
+    assert mock_ocr_executor.submit.await_count == 2
+    assert mock_ocr_executor.submit.call_args_list[0].args[3] == "webp"
+
+
+def test_unknown_master_format_is_rejected():
+    with raises(ValidationError):
+        Settings(image_master_format="png")
@@ -0,0 +1,222 @@
+import asyncio
+
+import pytest
+from _pytest.python_api import raises
+
+from app.utils.blob_storage import BlobStorage
+from app.utils.storage import MemoryStorage, LocalDiskStorage, BlobStorageBackend, CachedStorage
+from tests.documents.blob_emulator import BlobEmulator
+
+data = bytes(range(256)) * 1000
+
+
+@pytest.fixture(params=["memory", "disk", "blob", "cached"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStorage()
+    elif request.param == "cached":
+        yield CachedStorage(LocalDiskStorage(str(tmp_path)), max_bytes=len(data) * 2, max_entry_bytes=len(data))
+    elif request.param == "disk":
+        yield LocalDiskStorage(str(tmp_path))
+    else:
+        with BlobEmulator() as emulator:
+            blob_storage = BlobStorage(emulator.connection_string, "images", chunk_size=64 * 1024)
+            yield BlobStorageBackend(blob_storage, chunk_size=64 * 1024, max_concurrency=2)
+            blob_storage.close()
+
+
+async def read_stream(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_put_and_get(storage):
+    async def run():
+        await storage.put("ab/cd/scan.png", data)
+        assert await storage.exists("ab/cd/scan.png")
+        assert await storage.size("ab/cd/scan.png") == len(data)
+        assert await storage.get("ab/cd/scan.png") == data
+
+        await storage.put("ab/cd/scan.png", b"replaced")
+        assert await storage.get("ab/cd/scan.png") == b"replaced"
+
+    asyncio.run(run())
+
+
+def test_put_file(storage, tmp_path):
+    path = tmp_path / "upload.part"
+    path.write_bytes(data)
+
+    async def run():
+        await storage.put_file("scan.png", str(path), len(data))
+        assert await storage.get("scan.png") == data
+
+    asyncio.run(run())
+
+
+def test_stream(storage):
+    async def run():
+        await storage.put("scan.png", data)
+        assert await read_stream(storage.stream("scan.png")) == data
+        assert await read_stream(storage.stream("scan.png", 1000, 100_000)) == data[1000:101_000]
+        assert await read_stream(storage.stream("scan.png", len(data) - 10)) == data[-10:]
+
+    asyncio.run(run())
+
+
+def test_delete(storage):
+    async def run():
+        await storage.put("scan.png", data)
+        await storage.delete("scan.png")
+        await storage.delete("scan.png")
+        assert not await storage.exists("scan.png")
+
+    asyncio.run(run())
+
+
+def test_missing_key(storage):
+    async def run():
+        with raises(FileNotFoundError):
+            await storage.get("missing.png")
+        with raises(FileNotFoundError):
+            await storage.size("missing.png")
+        with raises(FileNotFoundError):
+            await read_stream(storage.stream("missing.png"))
+
+    asyncio.run(run())
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.streams = []
+        self.release = None
+
+    async def get(self, key: str) -> bytes:
+        self.gets += 1
+        data = await super().get(key)
+        if self.release:
+            await self.release.wait()
+        return data
+
+    async def stream(self, key: str, offset: int = 0, length: int | None = None):
+        self.streams.append((offset, length))
+        async for chunk in super().stream(key, offset, length):
+            yield chunk
+
+
+def test_cache_evicts_least_recently_used():
+    backend = CountingStorage()
+    storage = CachedStorage(backend, max_bytes=3000, max_entry_bytes=2000)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await backend.put(key, bytes(1000))
+        await storage.get("a")
+        await storage.get("b")
+        await storage.get("a")
+        await storage.get("c")
+        await storage.get("a")
+        await storage.put("d", bytes(1000))
+        # b was used least recently and made room for d
+        await storage.get("b")
+
+    asyncio.run(run())
+
+    assert backend.gets == 4
+    assert storage.cached_bytes == 3000
+    assert storage.metrics.to_dict() == {"hits": 2, "misses": 4, "evictions": 2, "hit_ratio": 2 / 6,
+                                         "bytes_saved": 2000}
+
+
+def test_cache_is_warmed_on_upload_and_invalidated_on_delete(tmp_path):
+    backend = CountingStorage()
+    storage = CachedStorage(backend, max_bytes=len(data) * 2, max_entry_bytes=len(data))
+    path = tmp_path / "upload.part"
+    path.write_bytes(data)
+
+    async def run():
+        await storage.put_file("scan.png", str(path), len(data))
+        streamed = await read_stream(storage.stream("scan.png", 10, 100))
+        await storage.delete("scan.png")
+        with raises(FileNotFoundError):
+            await storage.get("scan.png")
+        return streamed
+
+    assert asyncio.run(run()) == data[10:110]
+    assert backend.gets == 1
+    assert storage.cached_bytes == 0
+
+
+def test_cache_misses_are_streamed():
+    backend = CountingStorage()
+    storage = CachedStorage(backend, max_bytes=len(data) * 2, max_entry_bytes=len(data))
+
+    async def run():
+        await backend.put("scan.png", data)
+        # a range that misses is read from the backend and not cached
+        assert await read_stream(storage.stream("scan.png", 10, 100)) == data[10:110]
+        assert storage.cached_bytes == 0
+
+        stream = storage.stream("scan.png")
+        first = await stream.__anext__()
+        # the first chunk is sent before the rest of the object is read
+        assert storage.cached_bytes == 0
+        assert first + await read_stream(stream) == data
+        assert await read_stream(storage.stream("scan.png", 10, 100)) == data[10:110]
+
+    asyncio.run(run())
+
+    assert backend.streams == [(10, 100), (0, None)]
+    assert storage.cached_bytes == len(data)
+    assert storage.metrics.hits == 1
+
+
+def test_cache_skips_large_objects():
+    backend = CountingStorage()
+    storage = CachedStorage(backend, max_bytes=len(data) * 2, max_entry_bytes=1000)
+
+    async def run():
+        await storage.put("scan.png", data)
+        assert await read_stream(storage.stream("scan.png")) == data
+        assert await storage.get("scan.png") == data
+
+    asyncio.run(run())
+
+    assert storage.cached_bytes == 0
+    assert storage.metrics.hits == 0
+
+
+def test_cache_drops_reads_that_raced_a_delete():
+    backend = CountingStorage()
+    storage = CachedStorage(backend, max_bytes=3000, max_entry_bytes=2000)
+
+    async def run():
+        await backend.put("scan.png", bytes(1000))
+        backend.release = asyncio.Event()
+        read = asyncio.create_task(storage.get("scan.png"))
+        await asyncio.sleep(0)
+        await storage.delete("scan.png")
+        backend.release.set()
+        assert await read == bytes(1000)
+
+    asyncio.run(run())
+
+    assert storage.cached_bytes == 0
+
+
+def test_disk_keys_include_the_root(tmp_path):
+    root = str(tmp_path / "images")
+    storage = LocalDiskStorage(root)
+    key = storage.object_key("ab/cd/scan.png")
+
+    async def run():
+        await storage.put(key, data)
+        # keys without the root are relative to it
+        return await storage.get("ab/cd/scan.png")
+
+    assert key == f"{root}/ab/cd/scan.png"
+    assert asyncio.run(run()) == data
+    assert storage.local_path(key) == key
+    assert storage.spool_directory() == root
+    assert MemoryStorage().object_key("ab/cd/scan.png") == "ab/cd/scan.png"
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import io
+import os
+
+from _pytest.python_api import raises
+from fastapi import UploadFile, FastAPI
+from starlette.testclient import TestClient
+
+from app.utils.exceptions.app_exceptions import AppExceptionCase, app_exception_handler
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.uploads import spool_upload, sniff_image_format, RequestSizeLimitMiddleware
+from tests.documents.util import image_path
+
+
+def test_sniff_image_format():
+    assert sniff_image_format(b"\xff\xd8\xff\xe0\x00\x10JFIF\x00") == "jpeg"
+    assert sniff_image_format(b"\x89PNG\r\n\x1a\n\x00\x00\x00\r") == "png"
+    assert sniff_image_format(b"RIFF\x00\x00\x00\x00WEBP") == "webp"
+    assert sniff_image_format(b"%PDF-1.7\n") is None
+
+
+def test_spool_upload(tmp_path):
+    with open(image_path, "rb") as file:
+        data = file.read()
+    upload = UploadFile(filename="test_image.png", file=io.BytesIO(data))
+
+    spooled = asyncio.run(spool_upload(upload, str(tmp_path), max_bytes=len(data), chunk_size=1000))
+
+    assert spooled.image_format == "png"
+    assert spooled.size == len(data)
+    assert spooled.content_hash == hashlib.sha256(data).hexdigest()
+    assert spooled.read() == data
+
+    spooled.discard()
+    assert not os.listdir(tmp_path)
+
+
+def test_spool_upload_rejects_other_files(tmp_path):
+    upload = UploadFile(filename="test.pdf", file=io.BytesIO(b"%PDF-1.7\n" + b"0" * 100))
+
+    with raises(DocumentException.UnsupportedImageFormat):
+        asyncio.run(spool_upload(upload, str(tmp_path), max_bytes=1000, chunk_size=10))
+
+    assert not os.listdir(tmp_path)
+
+
+def test_spool_upload_rejects_large_files(tmp_path):
+    upload = UploadFile(filename="test.jpg", file=io.BytesIO(b"\xff\xd8\xff" + b"0" * 100))
+
+    with raises(DocumentException.ImageTooLarge):
+        asyncio.run(spool_upload(upload, str(tmp_path), max_bytes=50, chunk_size=10))
+
+    assert not os.listdir(tmp_path)
+
+
+def limited_client(max_bytes: int) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=max_bytes)
+    app.add_exception_handler(AppExceptionCase, app_exception_handler)
+
+    @app.post("/upload")
+    async def upload(image: UploadFile) -> int:
+        return len(await image.read())
+
+    return TestClient(app)
+
+
+def test_request_size_limit():
+    client = limited_client(max_bytes=1000)
+
+    response = client.post("/upload", files={"image": ("scan.jpg", b"0" * 100)})
+    assert response.status_code == 200
+    assert response.json() == 100
+
+    response = client.post("/upload", files={"image": ("scan.jpg", b"0" * 2000)})
+    assert response.status_code == 413
+    assert response.json()["app_exception"] == "ImageTooLarge"
+
+
+def test_request_size_limit_without_content_length():
+    client = limited_client(max_bytes=1000)
+
+    # a generator body is sent chunked, without a Content-Length
+    body = (b"0" * 100 for _ in range(100))
+    response = client.post("/upload", content=body, headers={"Content-Type": "multipart/form-data; boundary=x"})
+
+    assert response.status_code == 413
+    assert response.json()["app_exception"] == "ImageTooLarge"
@@ -1,10 +1,13 @@
+import hashlib
 import os
 
 from fastapi import UploadFile
 
 from app.models.documents import ImageDB
-from app.schemas.documents import Document
-from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum
+from app.utils.storage import LocalDiskStorage
+from app.utils.responses import StoredImage
+from app.schemas.documents import Document, DocumentJob
+from app.utils.enums import DocumentTypeEnum, DocumentStatusEnum, JobStatusEnum
 from tests.users.util import admin, director
 
 
@@ -14,6 +17,17 @@ uploaded_image = UploadFile(
     filename="test_image",
     file=image_file,
 )
+
+with open(image_path, 'rb') as file:
+    image_data = file.read()
+
+stored_image = StoredImage(
+    content_type="image/png",
+    size=len(image_data),
+    content_hash=hashlib.sha256(image_data).hexdigest(),
+    read_range=lambda offset, length: LocalDiskStorage("").stream(image_path, offset, length),
+    local_path=image_path,
+)
 imageDB = ImageDB(
     id=1,
     image_path=image_path,
@@ -33,6 +47,7 @@ document2 = Document(
     owner=director,
     document_type=DocumentTypeEnum.INTERNAL,
     summary="test",
+    summary_complete=False,
     document_status=DocumentStatusEnum.APPROVED,
     scan_time="2021-01-01T00:00:00",
 )
@@ -46,3 +61,16 @@ document3 = Document(
     scan_time="2021-01-01T00:00:00",
 )
 documents = [document1, document2]
+queued_job = DocumentJob(
+    id=1,
+    status=JobStatusEnum.QUEUED,
+    created_at="2021-01-01T00:00:00",
+    updated_at="2021-01-01T00:00:00",
+)
+done_job = DocumentJob(
+    id=1,
+    status=JobStatusEnum.DONE,
+    document=document1,
+    created_at="2021-01-01T00:00:00",
+    updated_at="2021-01-01T00:00:10",
+)
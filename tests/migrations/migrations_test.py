@@ -0,0 +1,71 @@
+from unittest.mock import Mock, patch
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.migrations.runner import migrate, Migration, _lock
+from app.migrations.versions import MIGRATIONS
+from app.models.audit import AuditDB
+from app.utils.enums import ActionStatus
+
+
+def test_migrations_are_applied_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+
+    assert migrate(engine, MIGRATIONS) == [1, 2, 3, 4, 5]
+    assert migrate(engine, MIGRATIONS) == []
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("audits")}
+    assert {"ix_audits_audited_by_status", "ix_audits_document_id"} <= indexes
+
+
+def test_tables_created_before_migrations_are_brought_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE images (id INTEGER PRIMARY KEY, image_path VARCHAR)"))
+        connection.execute(text("INSERT INTO images (id, image_path) VALUES (1, 'images/scan.png')"))
+        connection.execute(text("CREATE TABLE audits (audit_id INTEGER PRIMARY KEY, audited_at DATETIME, "
+                                "status VARCHAR, audited_by INTEGER, document_id INTEGER)"))
+
+    migrate(engine, MIGRATIONS)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("images")}
+    assert {"content_hash", "content_type", "filename", "size", "original_path", "original_size"} <= columns
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT image_path FROM images")).scalar() == "images/scan.png"
+
+    query = (Session(engine).query(AuditDB)
+             .filter(AuditDB.audited_by == 1, AuditDB.status == ActionStatus.PENDING.value))
+    statement = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    assert "ix_audits_audited_by_status" in str(plan)
+
+
+def test_failed_migration_is_not_recorded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db")
+
+    def fail(connection):
+        raise RuntimeError("broken migration")
+
+    try:
+        migrate(engine, MIGRATIONS + [Migration(6, "Broken", fail)])
+    except RuntimeError:
+        pass
+
+    assert migrate(engine, MIGRATIONS + [Migration(6, "Fixed", lambda connection: None)]) == [6]
+
+
+def test_lock_is_polled_without_holding_a_transaction():
+    connection = Mock()
+    connection.dialect.name = "postgresql"
+    connection.scalar.side_effect = [False, False, True]
+
+    with patch("app.migrations.runner.time.sleep") as mock_sleep:
+        _lock(connection)
+
+    assert connection.scalar.call_count == 3
+    assert "pg_try_advisory_lock" in str(connection.scalar.call_args.args[0])
+    # every attempt ends its transaction before waiting for the next one
+    assert connection.commit.call_count == 3
+    assert mock_sleep.call_count == 2
@@ -0,0 +1,126 @@
+import asyncio
+
+import cv2
+import httpx
+import numpy as np
+from _pytest.python_api import raises
+
+from app.utils.ocr.azure import AzureVisionClient, AzureVisionUnavailable, CircuitBreaker
+from app.utils.ocr.ocr import encode_page
+
+READ_RESULT = {"readResult": {"blocks": [{"lines": [{"text": "R123456"}, {"text": "ukupno"}]}]}}
+
+
+def stub_client(handler, **kwargs) -> AzureVisionClient:
+    return AzureVisionClient("https://vision.test/", "key", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_read_returns_text():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=READ_RESULT)
+
+    client = stub_client(handler)
+
+    async def run():
+        texts = [await client.read(b"page"), await client.read(b"page")]
+        await client.close()
+        return texts
+
+    texts = asyncio.run(run())
+
+    assert texts == ["R123456\nukupno\n\n"] * 2
+    assert requests[0].url.path == "/computervision/imageanalysis:analyze"
+    assert requests[0].url.params["features"] == "read"
+    assert requests[0].headers["Ocp-Apim-Subscription-Key"] == "key"
+    assert requests[0].headers["Content-Type"] == "image/jpeg"
+    assert requests[0].content == b"page"
+
+
+def test_read_opens_circuit_breaker_after_failures():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = stub_client(handler, failure_threshold=2)
+
+    async def run():
+        for _ in range(3):
+            with raises(AzureVisionUnavailable):
+                await client.read(b"page")
+        await client.close()
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+    assert client.breaker.state == "open"
+
+
+def test_read_fails_on_timeout():
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = stub_client(handler)
+
+    with raises(AzureVisionUnavailable):
+        asyncio.run(client.read(b"page"))
+
+
+def test_circuit_breaker_lets_one_trial_through_after_reset_timeout():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_cancelled_read_is_not_a_failure():
+    async def handler(request):
+        await asyncio.sleep(10)
+
+    client = stub_client(handler)
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+
+    async def cancel_read():
+        task = asyncio.create_task(client.read(b"page"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_read())
+    assert client.breaker.state == "closed"
+
+    # a cancelled trial of a half-open breaker lets the next call through
+    client.breaker.record_failure()
+    assert client.breaker.state == "half-open"
+    asyncio.run(cancel_read())
+    assert client.breaker.allow()
+
+
+def test_encode_page_caps_size():
+    rng = np.random.default_rng(0)
+    page = rng.integers(0, 255, size=(3000, 2000, 3), dtype=np.uint8)
+
+    encoded = encode_page(page, max_side=1000, max_bytes=200_000)
+    decoded = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+
+    assert len(encoded) <= 200_000
+    assert max(decoded.shape[:2]) <= 1000
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from _pytest.python_api import raises
+
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.ocr.executor import OCRExecutor
+
+
+def test_submit_runs_job():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=5)
+
+    result = asyncio.run(executor.submit(sum, [1, 2, 3]))
+    executor.shutdown()
+
+    assert result == 6
+
+
+def test_submit_rejects_jobs_when_queue_is_full():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=5)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.create_task(executor.submit(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        with raises(DocumentException.OCRQueueFull):
+            await executor.submit(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(run())
+    executor.shutdown()
+
+
+def test_submit_times_out():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=0.1)
+    release = threading.Event()
+
+    with raises(DocumentException.OCRTimeout):
+        asyncio.run(executor.submit(release.wait))
+
+    release.set()
+    executor.shutdown()
+
+
+def test_ready_once_every_worker_started():
+    executor = OCRExecutor(max_workers=2, queue_size=1, timeout=5)
+    assert not executor.ready
+
+    executor.start()
+    try:
+        deadline = time.monotonic() + 120
+        while not executor.ready and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        assert executor.ready
+        assert executor._started.value == 2
+    finally:
+        executor.shutdown()
+
+    assert not executor.ready
+
+
+def test_failed_warm_up_leaves_the_pool_working():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=5, warm_up=True)
+
+    with patch("app.utils.ocr.executor.readers") as mock_readers:
+        mock_readers.warm_up.side_effect = RuntimeError("model download failed")
+        result = asyncio.run(executor.submit(sum, [1, 2, 3]))
+        ready = executor.ready
+    executor.shutdown()
+
+    assert result == 6
+    assert ready
+
+
+def test_broken_pool_is_replaced():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=5)
+
+    # the first pool breaks as its worker starts, the one replacing it works
+    with patch("app.utils.ocr.executor._init_worker", side_effect=[RuntimeError("worker died"), None]):
+        result = asyncio.run(executor.submit(sum, [1, 2, 3]))
+    executor.shutdown()
+
+    assert result == 6
+
+
+def test_pool_that_keeps_breaking_is_unavailable():
+    executor = OCRExecutor(max_workers=0, queue_size=1, timeout=5)
+
+    with patch("app.utils.ocr.executor._init_worker", side_effect=RuntimeError("worker died")):
+        with raises(DocumentException.OCRUnavailable):
+            asyncio.run(executor.submit(sum, [1, 2, 3]))
+    executor.shutdown()
+
+    assert executor._pending == 0
@@ -0,0 +1,137 @@
+from itertools import combinations
+
+import cv2
+import numpy as np
+from _pytest.python_api import raises
+
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.ocr.hough_line_corner_detector import HoughLineCornerDetector, cluster_corners
+
+
+def reference_intersections(lines, shape):
+    points = set()
+    for line_1, line_2 in combinations(lines[:, 0], 2):
+        difference = abs(line_1[1] - line_2[1]) % np.pi
+        if np.degrees(min(difference, np.pi - difference)) <= 80.0:
+            continue
+        a = np.array([[np.cos(line_1[1]), np.sin(line_1[1])], [np.cos(line_2[1]), np.sin(line_2[1])]])
+        x, y = np.linalg.solve(a, np.array([line_1[0], line_2[0]]))
+        x, y = int(np.round(x)), int(np.round(y))
+        if 0 <= x <= shape[1] and 0 <= y <= shape[0]:
+            points.add((x, y))
+    return points
+
+
+def test_intersections_match_pairwise_solution():
+    rng = np.random.default_rng(0)
+    horizontal = np.stack([rng.uniform(0, 600, 40), rng.normal(np.pi / 2, 0.05, 40)], axis=1)
+    vertical = np.stack([rng.uniform(0, 400, 40), np.abs(rng.normal(0, 0.05, 40))], axis=1)
+    lines = np.concatenate([horizontal, vertical]).astype(np.float32)[:, np.newaxis, :]
+
+    detector = HoughLineCornerDetector(output_process=False)
+    detector._image = np.zeros((600, 400), dtype=np.uint8)
+    detector._lines = lines
+
+    intersections = detector._get_intersections()
+
+    assert intersections.shape[1:] == (1, 2)
+    assert set(map(tuple, intersections[:, 0].tolist())) == reference_intersections(lines, (600, 400))
+
+
+def test_intersections_of_a_page_rotated_45_degrees():
+    # both families sit on one side of 90 degrees, one of them exactly on 45 degrees
+    lines = np.array([[300, np.pi / 4], [500, np.pi / 4], [0, 3 * np.pi / 4], [-200, 3 * np.pi / 4],
+                      [450, np.radians(48.7)], [-100, np.radians(130)]], dtype=np.float32)[:, np.newaxis, :]
+
+    detector = HoughLineCornerDetector(output_process=False)
+    detector._image = np.zeros((600, 600), dtype=np.uint8)
+    detector._lines = lines
+
+    intersections = detector._get_intersections()
+
+    assert len(intersections) > 4
+    assert set(map(tuple, intersections[:, 0].tolist())) == reference_intersections(lines, (600, 600))
+
+
+def test_finds_intersections_at_the_corners_of_a_page_rotated_45_degrees():
+    image = np.zeros((600, 600), dtype=np.uint8)
+    expected = [(300, 100), (500, 300), (300, 500), (100, 300)]
+    cv2.fillPoly(image, [np.array(expected)], 255)
+
+    detector = HoughLineCornerDetector(rho_acc=1, theta_acc=180, thresh=100, output_process=False)
+    # the corners lie on the quadrant borders, so they cannot be told apart by quadrant
+    with raises(DocumentException.DocumentNotDetected):
+        detector(image)
+    points = detector._intersections[:, 0]
+
+    for corner in expected:
+        assert np.abs(points - corner).sum(axis=1).min() <= 8
+
+
+def test_no_lines_give_no_intersections():
+    detector = HoughLineCornerDetector(output_process=False)
+    detector._image = np.zeros((600, 400), dtype=np.uint8)
+    detector._lines = None
+
+    assert detector._get_intersections().shape == (0, 1, 2)
+
+
+def test_detects_page_corners():
+    image = np.zeros((600, 400), dtype=np.uint8)
+    cv2.rectangle(image, (50, 80), (350, 520), 255, -1)
+
+    detector = HoughLineCornerDetector(rho_acc=1, theta_acc=180, thresh=100, output_process=False)
+    corners = sorted(tuple(round(c) for c in corner[0]) for corner in detector(image))
+
+    expected = [(50, 80), (50, 520), (350, 80), (350, 520)]
+    for corner, (x, y) in zip(corners, expected):
+        assert abs(corner[0] - x) <= 3 and abs(corner[1] - y) <= 3
+
+
+def test_cluster_corners_finds_each_corner():
+    rng = np.random.default_rng(0)
+    corners = np.array([[100, 120], [850, 90], [880, 1150], [70, 1200]], dtype=float)
+    points = np.concatenate([corner + rng.normal(0, 3, size=(30, 2)) for corner in corners])
+
+    centers = cluster_corners(points, (1280, 960))
+
+    assert centers.shape == (4, 2)
+    assert np.abs(centers - corners).max() < 3
+
+
+def test_cluster_corners_without_a_corner():
+    points = np.array([[10, 10], [12, 11], [900, 20], [905, 25], [890, 1200], [895, 1210]])
+
+    assert cluster_corners(points, (1280, 960)) is None
+
+
+def test_cluster_corners_ignores_scattered_intersections():
+    corners = np.array([[100, 120], [850, 90], [880, 1150], [70, 1180]])
+    rng = np.random.default_rng(1)
+    clouds = [corner + rng.normal(0, 2, size=(30, 2)) for corner in corners]
+    scattered = rng.uniform([0, 0], [960, 1280], size=(30, 2))
+
+    centers = cluster_corners(np.concatenate(clouds + [scattered]), (1280, 960))
+
+    assert np.abs(centers - corners).max() < 3
+
+
+def test_page_without_a_corner_is_not_a_document():
+    detector = HoughLineCornerDetector(output_process=False)
+    detector._image = np.zeros((1280, 960), dtype=np.uint8)
+    detector._lines = None
+    detector._intersections = np.array([[10, 10], [12, 11], [900, 20], [905, 25], [890, 1200],
+                                         [895, 1210]])[:, np.newaxis, :]
+
+    with raises(DocumentException.DocumentNotDetected):
+        detector._find_quadrilaterals()
+
+
+def test_too_few_intersections_are_not_a_document():
+    detector = HoughLineCornerDetector(output_process=False)
+    detector._image = np.zeros((600, 400), dtype=np.uint8)
+    detector._lines = None
+    detector._intersections = np.empty((0, 1, 2), dtype=int)
+
+    with raises(DocumentException.DocumentNotDetected):
+        detector._find_quadrilaterals()
@@ -0,0 +1,65 @@
+from unittest.mock import Mock
+
+import cv2
+import numpy as np
+
+from app.utils.metrics import StageHistograms
+from app.utils.ocr.hough_line_corner_detector import HoughLineCornerDetector
+from app.utils.ocr.instrumentation import StageRecorder, StageTiming, server_timing_header
+from app.utils.ocr.ocr import PageExtractor
+from app.utils.ocr.processors import Resizer, OtsuThresholder
+
+
+def test_recorder_records_stage_and_calls_hooks():
+    hook = Mock()
+    recorder = StageRecorder(hooks=[hook])
+
+    output = recorder("Zeros", np.zeros, (10, 10), dtype=np.uint8)
+
+    assert output.shape == (10, 10)
+    timing = recorder.timings[0]
+    assert timing.name == "Zeros"
+    assert timing.output_size == 100
+    assert timing.output_shape == (10, 10)
+    hook.assert_called_once_with(timing)
+
+
+def test_page_extractor_records_every_stage():
+    image = np.full((900, 700, 3), 40, dtype=np.uint8)
+    cv2.rectangle(image, (100, 120), (600, 780), (255, 255, 255), -1)
+    _, encoded = cv2.imencode(".png", image)
+
+    recorder = StageRecorder()
+    page_extractor = PageExtractor(
+        preprocessors=[Resizer(height=640), OtsuThresholder()],
+        corner_detector=HoughLineCornerDetector(rho_acc=1, theta_acc=180, thresh=100, output_process=False,
+                                                recorder=recorder),
+        recorder=recorder
+    )
+    page_extractor(encoded.tobytes())
+
+    assert [timing.name for timing in recorder.timings] == [
+        "Decode", "Resizer", "OtsuThresholder", "Closer", "EdgeDetector", "HoughLines", "Intersections",
+        "CornerClustering", "Warp"
+    ]
+
+
+def test_histograms_aggregate_stage_timings():
+    histograms = StageHistograms()
+
+    histograms.observe([StageTiming("OCR", 1500.0, 3000.0, 10), StageTiming("Warp", 3.0, 3.0, 100)])
+    histograms.observe([StageTiming("OCR", 500.0, 900.0, 20)])
+
+    result = histograms.to_dict()
+    assert result["OCR"]["count"] == 2
+    assert result["OCR"]["wall_ms_mean"] == 1000.0
+    assert result["OCR"]["max_output_size"] == 20
+    assert result["OCR"]["buckets"]["le_500"] == 1
+    assert result["OCR"]["buckets"]["le_2000"] == 1
+    assert result["Warp"]["buckets"]["le_5"] == 1
+
+
+def test_server_timing_header():
+    header = server_timing_header([StageTiming("Decode", 12.345, 10.0, 0), StageTiming("OCR", 800.0, 900.0, 0)])
+
+    assert header == "Decode;dur=12.3, OCR;dur=800.0"
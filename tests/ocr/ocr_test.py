@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+from _pytest.python_api import raises
+
+from app.utils.exceptions.document_exceptions import DocumentException
+from app.utils.ocr.instrumentation import StageRecorder
+from app.utils.ocr.ocr import read_image_size, reduction_factor, create_page_extractor, transcode_page, \
+    create_preview
+
+
+def encode(image, extension):
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+def test_read_image_size():
+    image = np.zeros((300, 200, 3), dtype=np.uint8)
+
+    assert read_image_size(encode(image, ".jpg")) == (300, 200)
+    assert read_image_size(encode(image, ".png")) == (300, 200)
+    assert read_image_size(encode(image, ".bmp")) is None
+
+
+def test_reduction_factor():
+    assert reduction_factor((4000, 3000), 1280) == 2
+    assert reduction_factor((12000, 11000), 1280) == 8
+    assert reduction_factor((1000, 800), 1280) == 1
+    assert reduction_factor(None, 1280) == 1
+
+
+def test_page_is_warped_from_reduced_decode():
+    image = np.full((4000, 3000, 3), 255, dtype=np.uint8)
+    corners = [[300, 400], [2700, 400], [2700, 3600], [300, 3600]]
+    recorder = StageRecorder()
+
+    page = create_page_extractor(recorder, max_page_side=800)(encode(image, ".jpg"), corners=corners)
+
+    assert max(page.shape[:2]) == 800
+    decodes = [timing for timing in recorder.timings if timing.name.startswith("Decode")]
+    assert [timing.name for timing in decodes] == ["DecodeWarp"]
+    assert decodes[0].output_shape == (1000, 750, 3)
+
+
+def test_page_is_warped_from_full_decode_without_limit():
+    image = np.full((400, 300, 3), 255, dtype=np.uint8)
+    corners = [[30, 40], [270, 40], [270, 360], [30, 360]]
+    recorder = StageRecorder()
+
+    page = create_page_extractor(recorder, max_page_side=0)(encode(image, ".jpg"), corners=corners)
+
+    assert page.shape[:2] == (320, 240)
+    assert [timing.name for timing in recorder.timings] == ["DecodeFull", "Warp"]
+
+
+def test_transcode_page():
+    image = np.random.default_rng(0).integers(0, 256, (2000, 1500, 3), dtype=np.uint8)
+    upload = encode(image, ".png")
+    corners = [[150, 200], [1350, 200], [1350, 1800], [150, 1800]]
+
+    master = transcode_page(upload, corners, "jpeg", max_side=800, quality=60, grayscale=True)
+
+    page = cv2.imdecode(np.frombuffer(master, np.uint8), cv2.IMREAD_UNCHANGED)
+    assert page.shape == (800, 600)
+    assert len(master) < len(upload)
+
+    master = transcode_page(upload, corners, "webp", max_side=800, quality=60)
+    assert master[8:12] == b"WEBP"
+
+
+def test_create_preview():
+    image = np.full((3000, 2000, 3), 255, dtype=np.uint8)
+
+    preview = create_preview(encode(image, ".jpg"), max_side=256, quality=75)
+    assert cv2.imdecode(np.frombuffer(preview, np.uint8), cv2.IMREAD_COLOR).shape == (256, 171, 3)
+
+    # images smaller than the preview keep their size
+    preview = create_preview(encode(image[:100, :80], ".png"), max_side=256, quality=75)
+    assert cv2.imdecode(np.frombuffer(preview, np.uint8), cv2.IMREAD_COLOR).shape == (100, 80, 3)
+
+
+def test_create_preview_of_undecodable_image():
+    with raises(DocumentException.ImageNotDecodable):
+        create_preview(b"\xff\xd8\xff\xe0 not really a jpeg", max_side=256, quality=75)
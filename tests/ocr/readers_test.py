@@ -0,0 +1,30 @@
+from unittest.mock import Mock, patch
+
+from app.utils.ocr.readers import ReaderRegistry
+
+
+def test_reader_is_created_once_per_language_set():
+    registry = ReaderRegistry()
+
+    with patch("app.utils.ocr.readers.easyocr.Reader", side_effect=lambda languages: Mock()) as reader:
+        first = registry.get(["hr", "en"])
+        second = registry.get(["hr", "en"])
+        other = registry.get(["en"])
+
+    assert first is second
+    assert first is not other
+    assert reader.call_count == 2
+
+
+def test_warm_up_marks_languages_ready():
+    registry = ReaderRegistry()
+    mock_reader = Mock()
+    mock_reader.readtext.return_value = []
+
+    with patch("app.utils.ocr.readers.easyocr.Reader", return_value=mock_reader):
+        assert not registry.is_ready(["hr", "en"])
+        registry.warm_up(["hr", "en"])
+
+    mock_reader.readtext.assert_called_once()
+    assert registry.is_ready(["hr", "en"])
+    assert not registry.is_ready(["en"])
@@ -0,0 +1,57 @@
+from starlette.testclient import TestClient
+
+from app.config.database import get_db
+from app.main import app
+from app.services.documents import DocumentCRUD
+from tests.users.util import director_jwt
+from tests.util import count_queries, seeded_session
+
+# list endpoints and the statements they take, the same for a page of one row and a page of fifty
+ENDPOINTS = {
+    "/documents/": 2,
+    "/documents/me": 3,
+    "/audits/": 3,
+    "/audits/me": 4,
+    "/signatures/": 3,
+    "/signatures/me": 4,
+    "/archives/": 3,
+    "/archives/me": 4,
+    "/users/": 2,
+}
+
+
+def count_endpoint_queries(size: int) -> dict:
+    engine, db = seeded_session(size)
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client = TestClient(app)
+        counts = {}
+        for path in ENDPOINTS:
+            db.expunge_all()
+            with count_queries(engine) as statements:
+                response = client.get(f"{path}?limit=50", headers={"Authorization": f"Bearer {director_jwt}"})
+            assert response.status_code == 200, path
+            assert response.json()["items"], path
+            counts[path] = len(statements)
+        return counts
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_list_endpoints_take_a_fixed_number_of_queries():
+    assert count_endpoint_queries(2) == ENDPOINTS
+    assert count_endpoint_queries(50) == ENDPOINTS
+
+
+def test_only_returned_documents_load_their_owner():
+    engine, db = seeded_session(2)
+
+    with count_queries(engine) as statements:
+        DocumentCRUD(db).get_document(1)
+    assert len(statements) == 1 and "users" not in statements[0]
+
+    db.expunge_all()
+    with count_queries(engine) as statements:
+        document = DocumentCRUD(db).get_document(1, with_owner=True)
+        [role.name for role in document.owner.roles]
+    assert len(statements) == 2
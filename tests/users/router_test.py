@@ -48,15 +48,22 @@ def test_register_not_authorized():
 # Success
 def test_get_all_users():
     mock_user_service = Mock(spec=UserService)
-    mock_user_service.get_users.return_value = [user.model_dump()]
+    mock_user_service.get_users_page.return_value = {"items": [user.model_dump()], "next_cursor": None}
 
     with patch("app.routers.users.UserService", return_value=mock_user_service):
         response = client.get("/users/", headers={"Authorization": f"Bearer {admin_jwt}"})
 
-    mock_user_service.get_users.assert_called_once()
+    mock_user_service.get_users_page.assert_called_once()
 
     assert response.status_code == 200
-    assert response.json() == mock_user_service.get_users.return_value
+    assert response.json() == mock_user_service.get_users_page.return_value
+
+
+def test_users_have_no_date_filter():
+    parameters = client.get("/openapi.json").json()["paths"]["/users/"]["get"]["parameters"]
+
+    assert {"cursor", "limit", "order"} <= {parameter["name"] for parameter in parameters}
+    assert not {"date_from", "date_to"} & {parameter["name"] for parameter in parameters}
 
 
 def test_register():
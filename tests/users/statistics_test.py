@@ -0,0 +1,90 @@
+from _pytest.python_api import raises
+from starlette.testclient import TestClient
+
+from app.config.database import get_db
+from app.main import app
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.documents import DocumentDB
+from app.models.signatures import SignatureDB
+from app.models.users import UserDB, RoleDB
+from app.services.statistics import StatisticsService
+from app.utils.enums import RolesEnum, DocumentTypeEnum, DocumentStatusEnum, ActionStatus, ArchiveStatus
+from app.utils.exceptions.user_exceptions import UserException
+from tests.users.util import director_jwt
+from tests.util import count_queries, memory_session
+
+
+def session():
+    """User 1 ("test") scans documents, user 2 audits, signs and archives offers and receipts."""
+    engine, db = memory_session()
+    db.add(UserDB(id=1, username="test", email="test@email.com", roles=[RoleDB(name=RolesEnum.EMPLOYEE.value)]))
+    db.add(UserDB(id=2, username="worker", email="worker@email.com", roles=[
+        RoleDB(name=role.value) for role in (RolesEnum.AUDITOR, RolesEnum.DIRECTOR, RolesEnum.ACCOUNTANT_OFFER,
+                                             RolesEnum.ACCOUNTANT_RECEIPT)]))
+
+    types = [DocumentTypeEnum.OFFER, DocumentTypeEnum.OFFER, DocumentTypeEnum.RECEIPT, DocumentTypeEnum.INTERNAL]
+    for document_id, document_type in enumerate(types, start=1):
+        db.add(DocumentDB(id=document_id, owner_id=1, document_type=document_type,
+                          document_status=DocumentStatusEnum.APPROVED))
+        db.add(AuditDB(audited_by=2, document_id=document_id,
+                       status=ActionStatus.DONE if document_id < 4 else ActionStatus.PENDING))
+        db.add(SignatureDB(sign_by=2, document_id=document_id, status=ActionStatus.DONE))
+        db.add(ArchiveDB(archive_by=2, document_id=document_id,
+                         status=ArchiveStatus.DONE if document_id != 2 else ArchiveStatus.PENDING))
+    db.commit()
+    return engine, db
+
+
+def test_get_user_statistics():
+    engine, db = session()
+
+    assert StatisticsService(db).get_user_statistics("test") == {"scanned_documents": 4}
+    assert StatisticsService(db).get_user_statistics("worker") == {
+        "scanned_documents": 0,
+        "audited_documents": 3,
+        "signed_documents": 4,
+        "archived_offers": 1,
+        "archived_receipts": 1,
+    }
+
+    with raises(UserException.UserNotFound):
+        StatisticsService(db).get_user_statistics("nobody")
+
+
+def test_get_organization_statistics_takes_one_query():
+    engine, db = session()
+
+    with count_queries(engine) as statements:
+        statistics = StatisticsService(db).get_organization_statistics()
+    assert len(statements) == 1
+
+    assert [(row.username, row.document_type, row.status, row.count) for row in statistics.documents] == [
+        ("test", "internal", "approved", 1),
+        ("test", "offer", "approved", 2),
+        ("test", "receipt", "approved", 1),
+    ]
+    assert [(row.document_type, row.status, row.count) for row in statistics.archives] == [
+        ("internal", "done", 1),
+        ("offer", "done", 1),
+        ("offer", "pending", 1),
+        ("receipt", "done", 1),
+    ]
+    assert sum(row.count for row in statistics.audits) == 4
+    assert sum(row.count for row in statistics.signatures) == 4
+
+
+def test_organization_statistics_response():
+    engine, db = session()
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        response = TestClient(app).get("/users/statistics", headers={"Authorization": f"Bearer {director_jwt}"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["signatures"] == [
+        {"username": "worker", "document_type": "internal", "status": "done", "count": 1},
+        {"username": "worker", "document_type": "offer", "status": "done", "count": 2},
+        {"username": "worker", "document_type": "receipt", "status": "done", "count": 1},
+    ]
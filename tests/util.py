@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config.database import Base
+from app.models.archives import ArchiveDB
+from app.models.audit import AuditDB
+from app.models.documents import DocumentDB
+from app.models.signatures import SignatureDB
+from app.models.users import UserDB, RoleDB
+from app.utils.enums import RolesEnum, DocumentTypeEnum, DocumentStatusEnum, ActionStatus, ArchiveStatus
+
+
+@contextmanager
+def count_queries(engine):
+    """Collects the statements the engine executes inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def memory_session():
+    """An empty in-memory database, shared by every connection of the engine."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def seeded_session(size: int):
+    """An in-memory database with ``size`` users, each owning a document that is audited, signed and
+    archived by the user after them. The first user is called "test", like the users of the test tokens."""
+    engine, db = memory_session()
+
+    roles = [RoleDB(name=role.value) for role in RolesEnum]
+    for user_id in range(1, size + 1):
+        db.add(UserDB(id=user_id, username="test" if user_id == 1 else f"user{user_id}",
+                      email=f"user{user_id}@email.com", first_name="Test", last_name="Test",
+                      roles=roles[user_id % len(roles):][:2]))
+    for document_id in range(1, size + 1):
+        worker_id = document_id % size + 1
+        db.add(DocumentDB(id=document_id, owner_id=document_id, image_id=document_id, summary="",
+                          document_type=DocumentTypeEnum.RECEIPT, document_status=DocumentStatusEnum.SCANNED,
+                          scan_time=datetime(2024, 1, 1) + timedelta(hours=document_id)))
+        db.add(AuditDB(audited_by=worker_id, document_id=document_id, status=ActionStatus.PENDING))
+        db.add(SignatureDB(sign_by=worker_id, document_id=document_id, status=ActionStatus.PENDING))
+        db.add(ArchiveDB(archive_by=worker_id, document_id=document_id, status=ArchiveStatus.PENDING))
+    db.commit()
+    # nothing is left in the identity map, every endpoint loads what it returns
+    db.expunge_all()
+    return engine, db